@@ -0,0 +1,299 @@
+import os
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# 加载环境变量
+load_dotenv()
+
+# 批处理请求文件的默认位置（与 <文件名>.meta.json 配套）
+BATCH_REQUESTS_PATH = "./output/batch/requests.jsonl"
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_COMPLETION_WINDOW = "24h"
+BATCH_POLL_INTERVAL = 60
+_FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+_ROLES = {"human": "user", "system": "system", "ai": "assistant"}
+
+
+def render_messages(prompt_template: str, inputs: Dict[str, Any]) -> List[Dict[str, str]]:
+    """用与在线调用相同的提示词模板渲染出 OpenAI 格式的消息"""
+    from langchain_core.prompts import ChatPromptTemplate
+
+    messages = ChatPromptTemplate.from_template(prompt_template).format_messages(**inputs)
+    return [{"role": _ROLES.get(message.type, "user"), "content": message.content} for message in messages]
+
+
+class BatchRequestWriter:
+    """把待执行的 LLM 调用序列化为 OpenAI 兼容的批处理 JSONL
+
+    每行是一个 /v1/chat/completions 请求；custom_id 对应的流水线去向（阶段、输出文件等）
+    保存在同名的 .meta.json 中，结果回来后据此写回各阶段的输出。
+    请求文件只保存尚未提交的请求，提交后即移走；已排队或已提交、尚未写回的 custom_id 不会重复加入。
+    """
+
+    def __init__(self, requests_path: str = BATCH_REQUESTS_PATH, model_override: Optional[str] = None):
+        self.requests_path = Path(requests_path)
+        self.meta_path = meta_path_for(requests_path)
+        self.model_override = model_override
+        self.meta = load_meta(requests_path)
+
+    def add(self, custom_id: str, model, prompt_template: str, inputs: Dict[str, Any], target: Dict[str, Any]):
+        """追加一个请求；model 为 ChatOpenAI 实例，沿用其模型名和 temperature"""
+        if custom_id in self.meta["requests"]:
+            return
+        body: Dict[str, Any] = {
+            "model": self.model_override or model.model_name,
+            "messages": render_messages(prompt_template, inputs),
+        }
+        if getattr(model, "temperature", None) is not None:
+            body["temperature"] = model.temperature
+        self.requests_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.requests_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body},
+                               ensure_ascii=False) + "\n")
+        self.meta["requests"][custom_id] = target
+
+    def save(self):
+        save_meta(self.requests_path, self.meta)
+        print(f"批处理请求已写入: {self.requests_path}（共 {len(self.meta['requests'])} 个）")
+
+
+def meta_path_for(requests_path: str) -> Path:
+    path = Path(requests_path)
+    return path.with_name(path.stem + ".meta.json")
+
+
+def load_meta(requests_path: str) -> Dict[str, Any]:
+    """读取 meta：requests 为 custom_id -> 去向，batches 为 batch id -> 其中的 custom_id 列表"""
+    meta: Dict[str, Any] = {"requests": {}, "batches": {}}
+    meta_path = meta_path_for(requests_path)
+    if meta_path.exists():
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta.update(json.load(f))
+    return meta
+
+
+def save_meta(requests_path: str, meta: Dict[str, Any]):
+    meta_path = meta_path_for(requests_path)
+    meta_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+
+def submitted_path_for(requests_path: str, batch_id: str) -> Path:
+    """已提交的请求文件改名保存的位置，便于追查"""
+    path = Path(requests_path)
+    return path.with_name(f"{path.stem}.{batch_id}{path.suffix}")
+
+
+def enqueue_chunk_summaries(writer: BatchRequestWriter, pdf_paths: List[str], manifest_path: str,
+                            chunk_tokens: Optional[int] = None):
+    """把尚未完成的块总结加入批处理，结果写回 summary_generate 的断点清单"""
+    from summary_generate import (SUMMARIZE_CHUNK_PROMPT, OUTPUT_LENGTH, CHUNK_TOKENS, get_gemini_model,
+                                  iter_book_pages, iter_token_chunks)
+    from summary_checkpoint import SummaryCheckpoint, file_hash
+
+    checkpoint = SummaryCheckpoint(manifest_path)
+    for pdf_path in pdf_paths:
+        keys = []
+        for chunk in iter_token_chunks(iter_book_pages(pdf_path), chunk_tokens or CHUNK_TOKENS):
+            key = checkpoint.chunk_key(chunk, OUTPUT_LENGTH)
+            keys.append(key)
+            if checkpoint.get_chunk_summary(key) is not None:
+                continue
+            writer.add(f"chunk-{key[:32]}", get_gemini_model(), SUMMARIZE_CHUNK_PROMPT,
+                       {"text": chunk, "target_length": OUTPUT_LENGTH},
+                       {"stage": "chunk_summary", "manifest": manifest_path, "pdf": pdf_path, "key": key})
+        # 先登记各书的块列表，写回结果时这些块总结才会保留在清单中
+        checkpoint.set_book_chunks(pdf_path, file_hash(pdf_path), keys)
+    checkpoint.save()
+
+
+def enqueue_core_topics(writer: BatchRequestWriter, input_file: str, output_file: str):
+    """把 main3_1 的核心话题提取加入批处理"""
+    from main3_1 import CORE_TOPICS_PROMPT, get_model, read_text_file
+
+    content = read_text_file(input_file)
+    if content:
+        writer.add(f"topics-{Path(output_file).stem}", get_model(), CORE_TOPICS_PROMPT, {"text_content": content},
+                   {"stage": "core_topics", "output": output_file})
+
+
+def enqueue_scripts(writer: BatchRequestWriter, manifest_path: str):
+    """把 batch_episodes 清单中的脚本生成任务加入批处理"""
+    from main3_2 import PODCAST_SCRIPT_PROMPT, get_model, script_inputs
+    from batch_episodes import load_jobs, load_input, load_ip_setting
+
+    for job in load_jobs(manifest_path):
+        inputs = script_inputs(load_input(job.book_summary), load_input(job.core_topics), job.selected_topic,
+                               load_ip_setting(job.ip_setting), job.duration_minutes)
+        writer.add(f"script-{job.id}", get_model(), PODCAST_SCRIPT_PROMPT, inputs,
+                   {"stage": "script", "output": job.output_path})
+
+
+def batch_client():
+    """批处理 API 客户端；OpenRouter 不提供批处理接口，需单独配置 BATCH_BASE_URL/BATCH_API_KEY"""
+    from openai import OpenAI
+
+    return OpenAI(
+        api_key=os.getenv("BATCH_API_KEY") or os.getenv("OPENAI_API_KEY"),
+        base_url=os.getenv("BATCH_BASE_URL") or None,
+    )
+
+
+def submit_batch(client, requests_path: str = BATCH_REQUESTS_PATH) -> str:
+    """上传请求文件并创建批处理任务，返回 batch id（同时记入 meta）
+
+    提交后请求文件改名为 <文件名>.<batch id>.jsonl，之后加入的请求写入新的请求文件，
+    不会随下一次提交重复上传。
+    """
+    if not os.path.exists(requests_path) or os.path.getsize(requests_path) == 0:
+        raise ValueError(f"没有待提交的批处理请求: {requests_path}")
+    with open(requests_path, "r", encoding="utf-8") as f:
+        custom_ids = [json.loads(line)["custom_id"] for line in f if line.strip()]
+    with open(requests_path, "rb") as f:
+        input_file = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(input_file_id=input_file.id, endpoint=BATCH_ENDPOINT,
+                                  completion_window=BATCH_COMPLETION_WINDOW)
+    os.replace(requests_path, submitted_path_for(requests_path, batch.id))
+    meta = load_meta(requests_path)
+    meta["batch_id"] = batch.id
+    meta["batches"][batch.id] = custom_ids
+    save_meta(requests_path, meta)
+    print(f"批处理已提交: {batch.id}（{len(custom_ids)} 个请求）")
+    return batch.id
+
+
+def wait_for_batch(client, batch_id: str, poll_interval: float = BATCH_POLL_INTERVAL):
+    """轮询直到批处理结束"""
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = getattr(batch, "request_counts", None)
+        progress = f"{counts.completed}/{counts.total}" if counts else ""
+        print(f"批处理 {batch_id} 状态: {batch.status} {progress}")
+        if batch.status in _FINAL_STATUSES:
+            return batch
+        time.sleep(poll_interval)
+
+
+def download_results(client, batch) -> Dict[str, str]:
+    """下载结果文件，返回 custom_id -> 模型输出文本；失败的请求只打印错误"""
+    results: Dict[str, str] = {}
+    for file_id in (batch.output_file_id, getattr(batch, "error_file_id", None)):
+        if not file_id:
+            continue
+        for line in client.files.content(file_id).text.splitlines():
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code", 200) != 200:
+                print(f"请求 {record['custom_id']} 失败: {record.get('error') or response.get('body')}")
+                continue
+            results[record["custom_id"]] = response["body"]["choices"][0]["message"]["content"]
+    return results
+
+
+def scatter_results(results: Dict[str, str], requests_path: str = BATCH_REQUESTS_PATH,
+                    batch_id: Optional[str] = None) -> int:
+    """把结果写回各阶段的输出，返回写回数量
+
+    写回后从 meta 中删除该批次的全部 custom_id（包括失败或没有结果的），
+    失败的请求下次运行入队命令时会重新加入。
+    """
+    meta = load_meta(requests_path)
+    targets = meta["requests"]
+
+    checkpoints = {}
+    written = 0
+    for custom_id, text in results.items():
+        target = targets.get(custom_id)
+        if target is None:
+            print(f"未知的 custom_id: {custom_id}")
+            continue
+        stage = target["stage"]
+        if stage == "chunk_summary":
+            from summary_checkpoint import SummaryCheckpoint
+
+            checkpoint = checkpoints.setdefault(target["manifest"], SummaryCheckpoint(target["manifest"]))
+            checkpoint.set_chunk_summary(target["key"], text, save=False)
+        elif stage == "core_topics":
+            from main3_1 import save_topics_to_text
+
+            save_topics_to_text(text, target["output"])
+        elif stage == "script":
+            from main3_2 import save_script_to_file
+
+            save_script_to_file(text, target["output"])
+        else:
+            print(f"未知的阶段: {stage}")
+            continue
+        written += 1
+    for checkpoint in checkpoints.values():
+        checkpoint.save()
+
+    batch_ids = meta["batches"].pop(batch_id, None) if batch_id else None
+    finished = set(results) | set(batch_ids or [])
+    for custom_id in finished:
+        targets.pop(custom_id, None)
+    save_meta(requests_path, meta)
+    failed = len(finished) - len(results)
+    print(f"已写回 {written}/{len(results)} 个结果" + (f"，{failed} 个请求失败，可重新入队" if failed > 0 else ""))
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description='通过批处理 API 执行流水线中的 LLM 调用')
+    parser.add_argument('--requests', default=BATCH_REQUESTS_PATH, help='批处理请求文件路径')
+    parser.add_argument('--model', default=None, help='覆盖请求中的模型名（批处理服务商的模型 ID）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    summaries_parser = subparsers.add_parser('summaries', help='加入尚未完成的块总结')
+    summaries_parser.add_argument('--pdf_dir', required=True, help='PDF 所在目录')
+    summaries_parser.add_argument('--manifest', required=True,
+                                  help='断点清单路径，如 output/book_summary/self_improvement/manifest.json')
+    summaries_parser.add_argument('--chunk_tokens', type=int, default=None,
+                                  help='每个文本块的 token 数，需与 summary_generate 运行时一致')
+
+    topics_parser = subparsers.add_parser('topics', help='加入核心话题提取')
+    topics_parser.add_argument('--input_file', required=True)
+    topics_parser.add_argument('--output_file', required=True)
+
+    scripts_parser = subparsers.add_parser('scripts', help='加入 batch_episodes 清单中的脚本生成')
+    scripts_parser.add_argument('--manifest', required=True)
+
+    run_parser = subparsers.add_parser('run', help='提交、等待完成并写回结果')
+    run_parser.add_argument('--poll_interval', type=float, default=BATCH_POLL_INTERVAL)
+
+    collect_parser = subparsers.add_parser('collect', help='写回已提交批处理的结果')
+    collect_parser.add_argument('--batch_id', default=None, help='默认使用 meta 中记录的 batch id')
+    collect_parser.add_argument('--poll_interval', type=float, default=BATCH_POLL_INTERVAL)
+
+    args = parser.parse_args()
+    if args.command in ('summaries', 'topics', 'scripts'):
+        writer = BatchRequestWriter(args.requests, args.model)
+        if args.command == 'summaries':
+            pdf_paths = sorted(str(p) for p in Path(args.pdf_dir).glob('*.pdf'))
+            enqueue_chunk_summaries(writer, pdf_paths, args.manifest, args.chunk_tokens)
+        elif args.command == 'topics':
+            enqueue_core_topics(writer, args.input_file, args.output_file)
+        else:
+            enqueue_scripts(writer, args.manifest)
+        writer.save()
+        return
+
+    client = batch_client()
+    if args.command == 'run':
+        batch_id = submit_batch(client, args.requests)
+    else:
+        batch_id = args.batch_id or load_meta(args.requests)["batch_id"]
+    batch = wait_for_batch(client, batch_id, args.poll_interval)
+    scatter_results(download_results(client, batch), args.requests, batch_id)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import asyncio
+import argparse
+from pathlib import Path
+from functools import lru_cache
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+# 批量生成的默认并发数（单次请求的限流与重试由模型的共享调度器负责）
+BATCH_CONCURRENCY = 4
+BATCH_OUTPUT_DIR = "./output/batch_scripts"
+
+
+@dataclass
+class EpisodeJob:
+    """批量清单中的一集：书籍摘要 × 核心话题 × 选定话题 × 人设 × 时长"""
+    id: str
+    book_summary: str
+    core_topics: str
+    selected_topic: str
+    ip_setting: str = "ip_setting1"
+    duration_minutes: int = 5
+    output: Optional[str] = None
+
+    @property
+    def output_path(self) -> str:
+        return self.output or os.path.join(BATCH_OUTPUT_DIR, f"{self.id}.txt")
+
+
+def load_jobs(manifest_path: str) -> List[EpisodeJob]:
+    """读取 JSONL 清单，每行一个任务；缺少 id 时按行号生成"""
+    jobs = []
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            data = json.loads(line)
+            data.setdefault("id", f"job{line_no:04d}")
+            jobs.append(EpisodeJob(**data))
+    return jobs
+
+
+class JobStatusLog:
+    """逐行追加的任务状态日志（JSONL），重新运行时据此跳过已完成的任务"""
+
+    def __init__(self, status_path: str):
+        self.status_path = status_path
+        self.latest: Dict[str, Dict[str, Any]] = {}
+        if os.path.exists(status_path):
+            with open(status_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        self.latest[record["id"]] = record
+
+    def is_done(self, job: EpisodeJob) -> bool:
+        record = self.latest.get(job.id)
+        return bool(record and record["status"] == "done" and os.path.exists(job.output_path))
+
+    def record(self, job: EpisodeJob, status: str, **fields: Any):
+        record = {"id": job.id, "status": status, "time": time.strftime("%Y-%m-%d %H:%M:%S"), **fields}
+        self.latest[job.id] = record
+        Path(self.status_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(self.status_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+@lru_cache(maxsize=None)
+def load_input(path: str) -> str:
+    """读取摘要/话题文件，同一批次内多个任务共享同一份内容"""
+    from main3_2 import read_text_file
+
+    return read_text_file(path)
+
+
+@lru_cache(maxsize=None)
+def load_ip_setting(name_or_path: str) -> str:
+    """人设可以是 main3_2 中的变量名（如 ip_setting1），也可以是文本文件路径"""
+    if os.path.exists(name_or_path):
+        with open(name_or_path, "r", encoding="utf-8") as f:
+            return f.read()
+    import main3_2
+
+    setting = getattr(main3_2, name_or_path, None)
+    if not isinstance(setting, str):
+        raise ValueError(f"未知的人设: {name_or_path}")
+    return setting
+
+
+async def run_job(job: EpisodeJob, status_log: JobStatusLog) -> bool:
+    """生成一集脚本，返回是否成功
+
+    可重试的请求错误已由调度器重试；仍然失败的任务记为 failed，重新运行清单时会再次执行。
+    """
+    from main3_2 import agenerate_podcast_script, save_script_to_file
+
+    book_summary = load_input(job.book_summary)
+    core_topics = load_input(job.core_topics)
+    if not book_summary or not core_topics:
+        status_log.record(job, "failed", error="无法读取书籍摘要或核心话题")
+        return False
+    ip_setting = load_ip_setting(job.ip_setting)
+
+    status_log.record(job, "running")
+    start = time.perf_counter()
+    try:
+        script = await agenerate_podcast_script(book_summary, core_topics, job.selected_topic,
+                                                ip_setting, job.duration_minutes)
+        if not save_script_to_file(script, job.output_path):
+            raise OSError(f"保存失败: {job.output_path}")
+    except Exception as e:
+        print(f"任务 {job.id} 失败: {str(e)}")
+        status_log.record(job, "failed", error=str(e))
+        return False
+    status_log.record(job, "done", output=job.output_path, seconds=round(time.perf_counter() - start, 1))
+    return True
+
+
+async def run_batch(jobs: List[EpisodeJob], status_path: str, concurrency: int = BATCH_CONCURRENCY) -> Dict[str, Any]:
+    """以有界并发运行所有未完成的任务，返回统计信息（含每小时集数）"""
+    status_log = JobStatusLog(status_path)
+    pending = [job for job in jobs if not status_log.is_done(job)]
+    print(f"共 {len(jobs)} 个任务，已完成 {len(jobs) - len(pending)} 个，待运行 {len(pending)} 个，并发数 {concurrency}")
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(job: EpisodeJob) -> bool:
+        async with semaphore:
+            return await run_job(job, status_log)
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(run(job) for job in pending))
+    elapsed = time.perf_counter() - start
+
+    done = sum(results)
+    stats = {
+        "total": len(jobs),
+        "run": len(pending),
+        "done": done,
+        "failed": len(pending) - done,
+        "seconds": round(elapsed, 1),
+        "episodes_per_hour": round(done / elapsed * 3600, 1) if elapsed > 0 else 0.0,
+    }
+    print(f"批量生成完成: 成功 {done}，失败 {stats['failed']}，用时 {elapsed:.1f} 秒，"
+          f"吞吐 {stats['episodes_per_hour']} 集/小时")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='按 JSONL 清单批量生成播客脚本')
+    parser.add_argument('--manifest', required=True,
+                        help='任务清单（每行一个 JSON：id, book_summary, core_topics, selected_topic, '
+                             'ip_setting, duration_minutes, output）')
+    parser.add_argument('--status', default=None,
+                        help='状态日志路径，默认为清单同目录的 <清单名>.status.jsonl')
+    parser.add_argument('--concurrency', type=int, default=BATCH_CONCURRENCY,
+                        help='同时生成的任务数')
+
+    args = parser.parse_args()
+    status_path = args.status or str(Path(args.manifest).with_suffix(".status.jsonl"))
+    jobs = load_jobs(args.manifest)
+    stats = asyncio.run(run_batch(jobs, status_path, args.concurrency))
+    print(json.dumps(stats, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+import os
+import sys
+import time
+import argparse
+import subprocess
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+
+def _timed(func, *args, **kwargs):
+    """执行函数并返回 (结果, 耗时秒数)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def bench_pdf(args):
+    """对比PDF文本提取方式：逐页 += 拼接、生成器 join、进程池并行"""
+    import fitz
+    from summary_generate import extract_text_from_pdf
+
+    def concat_extract(pdf_path):
+        # 原实现：每页都复制一次已有的整段字符串
+        doc = fitz.open(pdf_path)
+        text = ""
+        for page in doc:
+            text += page.get_text()
+        return text
+
+    pdf_paths = sorted(Path(args.input_dir).glob('*.pdf'))
+    if not pdf_paths:
+        print(f"警告：在目录 '{args.input_dir}' 中没有找到pdf文件")
+        return
+
+    print(f"{'文件':<40} {'页数':>6} {'+= 拼接':>10} {'join':>10} {f'并行x{args.workers}':>10}")
+    totals = [0.0, 0.0, 0.0]
+    for pdf_path in pdf_paths:
+        with fitz.open(str(pdf_path)) as doc:
+            page_count = doc.page_count
+        baseline, t_concat = _timed(concat_extract, str(pdf_path))
+        streamed, t_join = _timed(extract_text_from_pdf, str(pdf_path))
+        parallel, t_parallel = _timed(extract_text_from_pdf, str(pdf_path), workers=args.workers)
+        if not (baseline == streamed == parallel):
+            print(f"错误：{pdf_path.name} 的提取结果不一致")
+        for i, t in enumerate((t_concat, t_join, t_parallel)):
+            totals[i] += t
+        print(f"{pdf_path.name[:40]:<40} {page_count:>6} {t_concat:>9.2f}s {t_join:>9.2f}s {t_parallel:>9.2f}s")
+    print(f"{'合计':<40} {'':>6} {totals[0]:>9.2f}s {totals[1]:>9.2f}s {totals[2]:>9.2f}s")
+
+
+def _measured(func, *args):
+    """执行函数并返回 (耗时秒数, Python 内存峰值 MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / (1024 * 1024)
+
+
+def bench_audio(args):
+    """对比 pydub 逐段 += 拼接与流式拼接在 10/30/60 分钟合成节目上的耗时和内存"""
+    from pydub import AudioSegment
+    from pydub.generators import Sine
+    from podcast_audio import assemble_podcast, PAUSE_MS
+
+    def concat_assemble(files, speakers, output_path):
+        # 原实现：每次 += 都复制已拼接的全部 PCM
+        combined = AudioSegment.empty()
+        for i, file in enumerate(files):
+            if i > 0:
+                combined += AudioSegment.silent(duration=PAUSE_MS)
+            combined += AudioSegment.from_file(file)
+        combined.export(output_path, format="wav")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # 预先生成少量不同的片段文件，循环使用组成任意长度的节目
+        segment_files = []
+        for i in range(8):
+            path = os.path.join(temp_dir, f"segment_{i}.wav")
+            tone = Sine(220 + 40 * i).to_audio_segment(duration=args.segment_seconds * 1000)
+            tone.set_channels(1).set_frame_rate(44100).export(path, format="wav")
+            segment_files.append(path)
+
+        print(f"{'时长':>6} {'片段数':>6} {'+= 耗时':>10} {'+= 峰值':>10} {'流式耗时':>10} {'流式峰值':>10}")
+        for minutes in args.minutes:
+            count = int(minutes * 60 / (args.segment_seconds + PAUSE_MS / 1000))
+            files = [segment_files[i % len(segment_files)] for i in range(count)]
+            speakers = ["A" if i % 2 == 0 else "B" for i in range(count)]
+            t_concat, m_concat = _measured(concat_assemble, files, speakers, os.path.join(temp_dir, "concat.wav"))
+            t_stream, m_stream = _measured(assemble_podcast, files, speakers, os.path.join(temp_dir, "stream.wav"))
+            print(f"{minutes:>4}分 {count:>6} {t_concat:>9.2f}s {m_concat:>8.1f}MB {t_stream:>9.2f}s {m_stream:>8.1f}MB")
+
+
+def _parse_importtime(output: str, module: str):
+    """解析 -X importtime 的输出，返回 (模块累计导入秒数, [(累计秒数, 直接依赖名)])
+
+    输出按导入完成的顺序排列，子模块的行在父模块之前；名称前每两个空格为一层嵌套。
+    解释器启动时（site 等）也有第 0 层条目，因此第 1 层的行先暂存，
+    遇到被测模块自己的第 0 层条目时才归为它的直接依赖，遇到其他第 0 层条目则丢弃。
+    """
+    total = 0.0
+    dependencies = []
+    children = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not cumulative.strip().isdigit():
+            continue
+        level = (len(name) - len(name.lstrip()) - 1) // 2
+        seconds = int(cumulative) / 1e6
+        if level == 1:
+            children.append((seconds, name.strip()))
+        elif level == 0:
+            if name.strip() == module:
+                total = seconds
+                dependencies = children
+            children = []
+    return total, dependencies
+
+
+def _import_profile(module: str):
+    """在新进程中以 -X importtime 导入模块，返回 (模块累计导入秒数, [(累计秒数, 直接依赖名)])"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else "导入失败")
+    return _parse_importtime(result.stderr, module)
+
+
+def bench_importtime(args):
+    """各入口模块的导入耗时（python -X importtime），以及命令行 --help 的启动耗时"""
+    print(f"{'模块':<20} {'导入耗时':>10}   最重的直接依赖")
+    for module in args.modules:
+        try:
+            total, dependencies = _import_profile(module)
+        except RuntimeError as e:
+            print(f"{module:<20} {'失败':>10}   {e}")
+            continue
+        heaviest = sorted(dependencies, reverse=True)[:args.top]
+        details = ", ".join(f"{name} {seconds:.2f}s" for seconds, name in heaviest)
+        print(f"{module:<20} {total:>9.2f}s   {details}")
+
+    timings = []
+    for _ in range(args.repeat):
+        _, elapsed = _timed(subprocess.run, [sys.executable, "cli.py", "--help"], capture_output=True)
+        timings.append(elapsed)
+    print(f"{'cli.py --help':<20} {min(timings):>9.2f}s   （{args.repeat} 次中最快）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='流水线各环节的性能基准')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    pdf_parser = subparsers.add_parser('pdf', help='PDF文本提取基准')
+    pdf_parser.add_argument('--input_dir',
+                            default='./data/books/self_improvement',
+                            help='PDF所在目录')
+    pdf_parser.add_argument('--workers', type=int, default=os.cpu_count() or 4,
+                            help='并行提取的进程数')
+    pdf_parser.set_defaults(func=bench_pdf)
+
+    audio_parser = subparsers.add_parser('audio', help='播客音频拼接基准')
+    audio_parser.add_argument('--minutes', type=int, nargs='+', default=[10, 30, 60],
+                              help='合成节目的时长（分钟）')
+    audio_parser.add_argument('--segment_seconds', type=float, default=8.0,
+                              help='每个片段的时长（秒）')
+    audio_parser.set_defaults(func=bench_audio)
+
+    importtime_parser = subparsers.add_parser('importtime', help='入口模块导入耗时基准')
+    importtime_parser.add_argument('--modules', nargs='+',
+                                   default=['cli', 'main1', 'main2', 'main3_1', 'main3_2', 'summary_generate'],
+                                   help='要测量的模块')
+    importtime_parser.add_argument('--top', type=int, default=3, help='每个模块列出最重的几个依赖')
+    importtime_parser.add_argument('--repeat', type=int, default=3, help='cli.py --help 的测量次数')
+    importtime_parser.set_defaults(func=bench_importtime)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
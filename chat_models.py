@@ -0,0 +1,150 @@
+import os
+import asyncio
+import weakref
+import threading
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import openai
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+from langchain_openai import ChatOpenAI
+
+from llm_cache import enable_llm_cache, cached_stream, acached_stream
+from rate_limit import get_scheduler
+
+
+class ScheduledChatOpenAI(ChatOpenAI):
+    """经共享调度器发出请求的 ChatOpenAI
+
+    同一模型名的所有实例共用一个调度器（令牌桶限速、自适应并发、遵循 Retry-After 的重试）。
+    调度发生在 LLM 缓存之后，命中缓存的调用不消耗配额；SDK 自带的重试默认关闭，避免重复退避。
+    流式调用同样读写 LLM 缓存（与 invoke 共用缓存条目），流式生成的脚本重复运行时不再重新请求。
+    """
+
+    max_retries: int = 0
+
+    @property
+    def scheduler(self):
+        return get_scheduler(self.model_name)
+
+    def _generate(self, *args: Any, **kwargs: Any) -> ChatResult:
+        generate = super()._generate
+        return self.scheduler.run_sync(lambda: generate(*args, **kwargs))
+
+    async def _agenerate(self, *args: Any, **kwargs: Any) -> ChatResult:
+        agenerate = super()._agenerate
+        return await self.scheduler.run(lambda: agenerate(*args, **kwargs))
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager: Any = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        stream = super()._stream
+        yield from cached_stream(self, messages, stop, kwargs, lambda: self.scheduler.stream_sync(
+            lambda: stream(messages, stop=stop, run_manager=run_manager, **kwargs)))
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        astream = super()._astream
+        async for chunk in acached_stream(self, messages, stop, kwargs, lambda: self.scheduler.stream(
+                lambda: astream(messages, stop=stop, run_manager=run_manager, **kwargs))):
+            yield chunk
+
+
+# 默认的 OpenAI 兼容服务地址与对应的密钥环境变量
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+API_KEY_ENV = {OPENROUTER_BASE_URL: "OPENROUTER_API_KEY"}
+
+
+class LoopLocalAsyncHttpxClient(openai.DefaultAsyncHttpxClient):
+    """为每个事件循环维护独立连接池的异步 HTTP 客户端
+
+    异步连接绑定在创建它的事件循环上，流水线中多次 asyncio.run 时复用同一连接池会报
+    "Event loop is closed"；这里按当前事件循环分派到各自的连接池，对外仍是一个共享客户端。
+    """
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        self._client_kwargs = kwargs
+        self._loop_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+        self._loop_lock = threading.Lock()
+
+    def _client_for_loop(self):
+        loop = asyncio.get_running_loop()
+        with self._loop_lock:
+            client = self._loop_clients.get(loop)
+            if client is None:
+                client = self._loop_clients[loop] = openai.DefaultAsyncHttpxClient(**self._client_kwargs)
+            return client
+
+    async def send(self, request, **kwargs: Any):
+        return await self._client_for_loop().send(request, **kwargs)
+
+    async def aclose(self):
+        client = self._loop_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+        await super().aclose()
+
+
+_http_clients: Dict[str, Tuple[Any, Any]] = {}
+_models: Dict[Tuple[str, Optional[float], str], ScheduledChatOpenAI] = {}
+_autogen_clients: Dict[Tuple[str, str], Any] = {}
+_registry_lock = threading.RLock()
+
+
+def get_http_clients(base_url: str = OPENROUTER_BASE_URL) -> Tuple[Any, Any]:
+    """取某个服务地址共享的 (同步, 异步) HTTP 客户端，首次使用时创建，连接保持复用"""
+    with _registry_lock:
+        clients = _http_clients.get(base_url)
+        if clients is None:
+            clients = _http_clients[base_url] = (openai.DefaultHttpxClient(), LoopLocalAsyncHttpxClient())
+        return clients
+
+
+def _api_key(base_url: str, api_key: Optional[str]) -> Optional[str]:
+    return api_key or os.getenv(API_KEY_ENV.get(base_url, "OPENAI_API_KEY"))
+
+
+def get_chat_model(model: str, temperature: Optional[float] = None, base_url: str = OPENROUTER_BASE_URL,
+                   api_key: Optional[str] = None) -> ScheduledChatOpenAI:
+    """按 (模型, temperature, 服务地址) 取共享的 LangChain 模型实例
+
+    实例在首次使用时才创建，可在线程和协程间共享；同一服务地址的所有模型共用一个连接池。
+    首次创建时同时启用 LLM 磁盘缓存。
+    """
+    key = (model, temperature, base_url)
+    with _registry_lock:
+        chat_model = _models.get(key)
+        if chat_model is None:
+            # 相同模型参数与提示词的调用直接命中磁盘缓存（在首次创建模型时启用，导入时不做 I/O）
+            enable_llm_cache()
+            http_client, http_async_client = get_http_clients(base_url)
+            kwargs: Dict[str, Any] = {} if temperature is None else {"temperature": temperature}
+            chat_model = _models[key] = ScheduledChatOpenAI(
+                model=model,
+                api_key=_api_key(base_url, api_key),
+                base_url=base_url,
+                http_client=http_client,
+                http_async_client=http_async_client,
+                **kwargs,
+            )
+        return chat_model
+
+
+def get_autogen_client(model: str, model_info: Optional[Dict[str, Any]] = None,
+                       base_url: str = OPENROUTER_BASE_URL, api_key: Optional[str] = None):
+    """按模型取共享的 autogen OpenAIChatCompletionClient，与 LangChain 模型共用连接池"""
+    from autogen_ext.models.openai import OpenAIChatCompletionClient
+
+    key = (model, base_url)
+    with _registry_lock:
+        client = _autogen_clients.get(key)
+        if client is None:
+            _, http_async_client = get_http_clients(base_url)
+            client = _autogen_clients[key] = OpenAIChatCompletionClient(
+                model=model,
+                api_key=_api_key(base_url, api_key),
+                base_url=base_url,
+                model_info=model_info,
+                http_client=http_async_client,
+            )
+        return client
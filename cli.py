@@ -0,0 +1,124 @@
+import os
+import sys
+import glob
+import argparse
+
+
+# 只导入标准库；各子命令在运行时才导入自己需要的模块（langchain、autogen、fitz 等），
+# 因此 `python cli.py --help` 和不相关的子命令不会为用不到的依赖付出导入时间。
+
+
+def resolve_ip_setting(value: str, module) -> str:
+    """人设可以是文本文件路径，也可以是模块中的变量名（如 ip_setting1）"""
+    if os.path.exists(value):
+        with open(value, "r", encoding="utf-8") as f:
+            return f.read()
+    setting = getattr(module, value, None)
+    if not isinstance(setting, str):
+        raise SystemExit(f"未知的人设: {value}")
+    return setting
+
+
+def run_summarize(args):
+    from summary_generate import generate_book_summary
+
+    pdf_paths = args.pdfs or sorted(glob.glob(os.path.join(args.pdf_dir, "*.pdf")))
+    if not pdf_paths:
+        raise SystemExit(f"没有找到 PDF 文件: {args.pdf_dir}")
+    generate_book_summary(pdf_paths, args.output, target_length=args.target_length,
+                          max_concurrency=args.concurrency, extract_workers=args.workers,
+                          resume=not args.no_resume, chunk_tokens=args.chunk_tokens)
+
+
+def run_topics(args):
+    from main3_1 import process_book_summary
+
+    process_book_summary(args.input, args.output)
+
+
+def run_script(args):
+    import main3_2
+
+    ip_setting = resolve_ip_setting(args.ip_setting, main3_2)
+    main3_2.generate_podcast_from_topic(args.summary, args.topics, args.output, args.duration,
+                                        selected_topic=args.topic, ip_setting=ip_setting, stream=not args.no_stream)
+
+
+def run_audio(args):
+    import asyncio
+    import main1
+
+    ip_setting = resolve_ip_setting(args.ip_setting, main1)
+    result = asyncio.run(main1.create_podcast(args.theme, args.summary_dir, ip_setting, args.duration,
+                                              args.output, pipelined=not args.sequential,
+                                              segmented=args.segmented))
+    print(f"播客已生成: {result['audio_path']}")
+
+
+def run_chat(args):
+    import asyncio
+    import main2
+
+    asyncio.run(main2.main(args.duration, args.theme, args.categories, bounded_context=args.bounded_context,
+                           speculative=args.speculative))
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='播客生成流水线命令行入口')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    summarize_parser = subparsers.add_parser('summarize', help='把 PDF 书籍总结为摘要（summary_generate）')
+    summarize_parser.add_argument('--pdf_dir', default='./books/test', help='PDF 所在目录')
+    summarize_parser.add_argument('--pdfs', nargs='+', default=None, help='直接指定 PDF 文件，优先于 --pdf_dir')
+    summarize_parser.add_argument('--output', default='output/book_summary/self_improvement/book_summary.txt')
+    summarize_parser.add_argument('--target_length', type=int, default=5000, help='每本书摘要的目标字符数')
+    summarize_parser.add_argument('--concurrency', type=int, default=8, help='同时在途的总结请求数')
+    summarize_parser.add_argument('--workers', type=int, default=1, help='并行提取 PDF 的进程数')
+    summarize_parser.add_argument('--chunk_tokens', type=int, default=6000, help='每个文本块的 token 数')
+    summarize_parser.add_argument('--no_resume', action='store_true', help='忽略断点清单，全部重新总结')
+    summarize_parser.set_defaults(func=run_summarize)
+
+    topics_parser = subparsers.add_parser('topics', help='从书籍摘要提取核心话题（main3_1）')
+    topics_parser.add_argument('--input', required=True, help='书籍摘要文件')
+    topics_parser.add_argument('--output', required=True, help='核心话题输出文件')
+    topics_parser.set_defaults(func=run_topics)
+
+    script_parser = subparsers.add_parser('script', help='按选定话题生成播客脚本（main3_2）')
+    script_parser.add_argument('--summary', required=True, help='书籍摘要文件')
+    script_parser.add_argument('--topics', required=True, help='核心话题文件')
+    script_parser.add_argument('--output', required=True, help='脚本输出文件')
+    script_parser.add_argument('--topic', default=None, help='选定的话题，默认使用 main3_2 中的示例话题')
+    script_parser.add_argument('--ip_setting', default='ip_setting1', help='人设文件路径或 main3_2 中的变量名')
+    script_parser.add_argument('--duration', type=int, default=5, help='播客时长（分钟）')
+    script_parser.add_argument('--no_stream', action='store_true', help='等完整结果返回后再写文件')
+    script_parser.set_defaults(func=run_script)
+
+    audio_parser = subparsers.add_parser('audio', help='生成话题、对话脚本并合成播客音频（main1）')
+    audio_parser.add_argument('--theme', required=True, help='播客主题')
+    audio_parser.add_argument('--summary_dir', required=True, help='书籍摘要目录')
+    audio_parser.add_argument('--ip_setting', default='ip_setting2', help='人设文件路径或 main1 中的变量名')
+    audio_parser.add_argument('--duration', type=int, default=3, help='播客时长（分钟）')
+    audio_parser.add_argument('--output', default='./output/podcast.mp3')
+    audio_parser.add_argument('--sequential', action='store_true', help='先生成完整脚本再合成音频')
+    audio_parser.add_argument('--segmented', action='store_true', help='按核心话题并发分段生成脚本，适合长节目')
+    audio_parser.set_defaults(func=run_audio)
+
+    chat_parser = subparsers.add_parser('chat', help='两个 agent 多轮对话模拟主播（main2）')
+    chat_parser.add_argument('--duration', type=int, default=3, help='播客时长（分钟）')
+    chat_parser.add_argument('--theme', default='How Social Media Ruined My Life (self-doubt)', help='播客主题')
+    chat_parser.add_argument('--categories', nargs='+', default=None, help='检索的摘要分类，默认 self_improvement')
+    chat_parser.add_argument('--bounded_context', action='store_true',
+                             help='只发送最近几条消息和更早对话的滚动摘要，控制每轮提示词大小')
+    chat_parser.add_argument('--speculative', action='store_true',
+                             help='当前主播说到接近结尾时预取下一位的回复，并报告节省的延迟')
+    chat_parser.set_defaults(func=run_chat)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
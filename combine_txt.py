@@ -2,6 +2,8 @@ import os
 import argparse
 from pathlib import Path
 
+from summary_store import resolve_summary_path
+
 def combine_txt_files(input_dir, output_file):
     """
     合并指定目录下所有txt文件的内容到一个新的文件中
@@ -15,25 +17,24 @@ def combine_txt_files(input_dir, output_file):
         print(f"错误：目录 '{input_dir}' 不存在")
         return
 
-    # 获取所有txt文件
-    txt_files = list(Path(input_dir).glob('*.txt'))
+    # 获取所有txt文件（经索引，未变化的文件不会重复读取），跳过输出文件自身
+    store, category = resolve_summary_path(input_dir)
+    output_name = Path(os.path.abspath(output_file))
+    documents = [doc for doc in store.documents(category)
+                 if Path(os.path.abspath(store.root / doc["path"])) != output_name]
     
-    if not txt_files:
+    if not documents:
         print(f"警告：在目录 '{input_dir}' 中没有找到txt文件")
         return
     
     # 合并文件内容
     with open(output_file, 'w', encoding='utf-8') as outfile:
-        for txt_file in sorted(txt_files):
-            print(f"正在处理文件: {txt_file}")
-            outfile.write(f"\n--- 来自文件: {txt_file.name} ---\n\n")
-            
-            try:
-                with open(txt_file, 'r', encoding='utf-8') as infile:
-                    outfile.write(infile.read())
-                outfile.write('\n')
-            except Exception as e:
-                print(f"处理文件 '{txt_file}' 时出错: {str(e)}")
+        for doc in documents:
+            file_name = os.path.basename(doc["path"])
+            print(f"正在处理文件: {file_name}")
+            outfile.write(f"\n--- 来自文件: {file_name} ---\n\n")
+            outfile.write(doc["text"])
+            outfile.write('\n')
 
     print(f"\n合并完成！输出文件: {output_file}")
 
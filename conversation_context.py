@@ -0,0 +1,152 @@
+import asyncio
+import hashlib
+from typing import Dict, List, Optional, Sequence
+
+from autogen_core.model_context import ChatCompletionContext
+from autogen_core.models import ChatCompletionClient, LLMMessage, SystemMessage, UserMessage
+
+# 原样保留的最近消息数，以及摘要落后多少条消息时触发刷新
+KEEP_MESSAGES = 6
+FOLD_EVERY = 2
+
+SUMMARY_PROMPT = """You maintain a running summary of a two-host podcast conversation.
+Merge the earlier summary with the new messages into one concise summary (at most 150 words).
+Keep: which core topics have been covered and their key points, stories or examples already told,
+open questions, and roughly how far the episode has progressed. Write plain text only."""
+
+
+def _message_text(message: LLMMessage) -> str:
+    source = getattr(message, "source", None) or type(message).__name__
+    content = message.content if isinstance(message.content, str) else str(message.content)
+    return f"{source}: {content}"
+
+
+class ConversationSummarizer:
+    """滚动摘要的生成者，可由多个智能体的上下文共用
+
+    各智能体看到的是同一段对话，摘要按已折叠的对话前缀缓存：同一前缀只调用一次摘要模型，
+    并发请求同一前缀时共用同一次调用；新前缀从缓存中最长的已摘要前缀增量折叠。
+    """
+
+    def __init__(self, summary_client: ChatCompletionClient):
+        self._summary_client = summary_client
+        self._summaries: Dict[str, str] = {}
+        self._pending: Dict[str, asyncio.Task] = {}
+        self.requests = 0
+
+    @staticmethod
+    def _prefix_keys(texts: Sequence[str]) -> List[str]:
+        """每个前缀的键：逐条累积的哈希，前 i+1 条消息相同则键相同"""
+        keys, digest = [], hashlib.sha256()
+        for text in texts:
+            digest.update(text.encode("utf-8") + b"\0")
+            keys.append(digest.copy().hexdigest())
+        return keys
+
+    async def summarize(self, messages: Sequence[LLMMessage]) -> Optional[str]:
+        """返回 messages（待折叠的全部对话消息，不含第一条任务消息）的摘要；模型未返回文本时为 None"""
+        texts = [_message_text(m) for m in messages]
+        keys = self._prefix_keys(texts)
+        if not keys:
+            return ""
+        key = keys[-1]
+        if key in self._summaries:
+            return self._summaries[key]
+        task = self._pending.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fold(texts, keys))
+            self._pending[key] = task
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        # 一个上下文被取消时不影响共用同一次调用的其他上下文
+        return await asyncio.shield(task)
+
+    async def _fold(self, texts: List[str], keys: List[str]) -> Optional[str]:
+        start = next((i for i in range(len(keys) - 1, 0, -1) if keys[i - 1] in self._summaries), 0)
+        earlier = self._summaries[keys[start - 1]] if start else ""
+        self.requests += 1
+        result = await self._summary_client.create([
+            SystemMessage(content=SUMMARY_PROMPT),
+            UserMessage(content=f"Earlier summary:\n{earlier or '(none)'}\n\nNew messages:\n" + "\n".join(texts[start:]),
+                        source="user"),
+        ])
+        if not isinstance(result.content, str):
+            return None
+        summary = result.content.strip()
+        self._summaries[keys[-1]] = summary
+        return summary
+
+
+class RollingSummaryContext(ChatCompletionContext):
+    """有界的对话上下文：保留第一条消息（任务）和最近 keep_messages 条消息，更早的折叠进滚动摘要
+
+    摘要在后台任务中异步刷新，不阻塞当前轮次；刷新完成前尚未折叠的消息仍原样发送，不会丢失。
+    多个智能体传入同一个 summarizer 时共用摘要，同一段历史只摘要一次。检索记忆每轮注入的系统消息只保留最新一轮，旧的不再重复发送。
+    这样每轮提示词的大小不再随对话轮数线性增长。
+    """
+
+    def __init__(self, summary_client: Optional[ChatCompletionClient] = None, keep_messages: int = KEEP_MESSAGES,
+                 fold_every: int = FOLD_EVERY, initial_messages: Optional[List[LLMMessage]] = None,
+                 summarizer: Optional[ConversationSummarizer] = None):
+        super().__init__(initial_messages)
+        if keep_messages <= 0:
+            raise ValueError("keep_messages 必须大于 0")
+        if summarizer is None and summary_client is None:
+            raise ValueError("需要 summary_client 或 summarizer")
+        self._summarizer = summarizer or ConversationSummarizer(summary_client)
+        self._keep_messages = keep_messages
+        self._fold_every = fold_every
+        self._summary = ""
+        self._summarized = 1  # 对话消息中已折叠进摘要的位置（第一条消息始终原样保留）
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @property
+    def summary(self) -> str:
+        return self._summary
+
+    def _conversation(self) -> List[LLMMessage]:
+        return [message for message in self._messages if not isinstance(message, SystemMessage)]
+
+    def _fold_target(self) -> int:
+        """应折叠到的位置：窗口之前的所有对话消息"""
+        return max(self._summarized, len(self._conversation()) - self._keep_messages)
+
+    async def add_message(self, message: LLMMessage) -> None:
+        await super().add_message(message)
+        if self._refresh_task is None and self._fold_target() - self._summarized >= self._fold_every:
+            self._refresh_task = asyncio.create_task(self._refresh())
+
+    async def _refresh(self):
+        try:
+            while self._fold_target() - self._summarized >= self._fold_every:
+                target = self._fold_target()
+                summary = await self._summarizer.summarize(self._conversation()[1:target])
+                if summary is None:
+                    break
+                self._summary = summary
+                self._summarized = target
+        except Exception as e:
+            # 刷新失败时未折叠的消息继续原样发送，下次添加消息时再试
+            print(f"对话摘要刷新失败: {e}")
+        finally:
+            self._refresh_task = None
+
+    async def get_messages(self) -> List[LLMMessage]:
+        conversation = self._conversation()
+        # 最后一条对话消息之后的系统消息是本轮检索注入的段落
+        last = max((i for i, m in enumerate(self._messages) if not isinstance(m, SystemMessage)), default=-1)
+        current_system = [m for m in self._messages[last + 1:] if isinstance(m, SystemMessage)]
+
+        messages: List[LLMMessage] = conversation[:1]
+        if self._summary:
+            messages.append(SystemMessage(content=f"Summary of the earlier conversation:\n{self._summary}"))
+        # 摘要尚未追上时，从已折叠的位置开始原样发送
+        start = max(1, min(self._summarized, len(conversation) - self._keep_messages))
+        return messages + conversation[start:] + current_system
+
+    async def clear(self) -> None:
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            self._refresh_task = None
+        await super().clear()
+        self._summary = ""
+        self._summarized = 1
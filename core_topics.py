@@ -0,0 +1,231 @@
+import json
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+
+# 核心话题的结构，与 ref/m.json 一致；duration_minutes 为模型给每个话题分配的时长
+CORE_TOPICS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "core_topics": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "core_topic": {"type": "string"},
+                    "explanation": {"type": "string"},
+                    "transition": {"type": "string"},
+                    "logical_structure": {"type": "string"},
+                    "duration_minutes": {"type": "number"},
+                },
+                "required": ["core_topic", "explanation", "transition", "logical_structure", "duration_minutes"],
+                "additionalProperties": False,
+            },
+        },
+        "summary": {"type": "string"},
+    },
+    "required": ["core_topics", "summary"],
+    "additionalProperties": False,
+}
+
+# 传给 ChatOpenAI 的 response_format（OpenAI 兼容的 JSON Schema 结构化输出）
+CORE_TOPICS_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "core_topics", "strict": True, "schema": CORE_TOPICS_SCHEMA},
+}
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+@dataclass
+class CoreTopic:
+    """单个核心话题"""
+    core_topic: str
+    explanation: str = ""
+    transition: str = ""
+    logical_structure: str = ""
+    duration_minutes: Optional[float] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CoreTopic":
+        # main3_1 的旧提示词使用 "topic" 作为标题字段
+        duration = data.get("duration_minutes")
+        return cls(
+            core_topic=str(data.get("core_topic") or data.get("topic") or ""),
+            explanation=str(data.get("explanation") or ""),
+            transition=str(data.get("transition") or ""),
+            logical_structure=str(data.get("logical_structure") or ""),
+            duration_minutes=float(duration) if isinstance(duration, (int, float)) and duration > 0 else None,
+        )
+
+
+@dataclass
+class CoreTopics:
+    """一期播客的核心话题列表；duration_minutes 为请求的总时长，用于模型未分配时长时兜底"""
+    core_topics: List[CoreTopic] = field(default_factory=list)
+    summary: str = ""
+    duration_minutes: Optional[int] = None
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], duration_minutes: Optional[int] = None) -> "CoreTopics":
+        topics = data.get("core_topics") or []
+        return cls(
+            core_topics=[CoreTopic.from_dict(topic) for topic in topics if isinstance(topic, dict)],
+            summary=str(data.get("summary") or ""),
+            duration_minutes=duration_minutes,
+        )
+
+    @classmethod
+    def from_json(cls, text: str, duration_minutes: Optional[int] = None) -> "CoreTopics":
+        """解析模型输出；截断的 JSON 在本地补全，不需要重新生成"""
+        return cls.from_dict(parse_partial_json(text), duration_minutes)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "core_topics": [asdict(topic) for topic in self.core_topics],
+            "summary": self.summary,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict(), ensure_ascii=False, indent=4)
+
+    def total_minutes(self, default: int = 20) -> int:
+        """各话题分配时长之和；缺少分配时使用请求的总时长"""
+        allotted = [topic.duration_minutes for topic in self.core_topics if topic.duration_minutes]
+        if allotted and len(allotted) == len(self.core_topics):
+            return max(1, round(sum(allotted)))
+        return self.duration_minutes or default
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.to_json())
+
+    @classmethod
+    def load(cls, path: str, duration_minutes: Optional[int] = None) -> "CoreTopics":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_json(f.read(), duration_minutes)
+
+
+class IncrementalJSONParser:
+    """逐块接收模型输出的 JSON，随时可以把已收到的前缀补全为合法 JSON
+
+    只维护容器栈和字符串状态，每个分块只扫描一遍。每当一个值完整结束，就记下此处的
+    截断位置和需要补上的括号；repair() 从最近的截断位置闭合所有容器。正在输出的字符串值
+    会被保留并补上引号，未写完的键、数字和 true/false/null 则被丢弃。第一个 { 或 [ 之前
+    的文字（如 ```json 代码围栏）和顶层值结束之后的内容会被忽略。
+    """
+
+    def __init__(self):
+        self._chunks: List[str] = []
+        self._length = 0
+        self._start: Optional[int] = None
+        self._end: Optional[int] = None
+        self._stack: List[str] = []
+        self._expect: List[str] = []
+        self._in_string = False
+        self._string_is_key = False
+        self._escape = False
+        self._escape_at = 0
+        self._unicode_left = 0
+        self._in_literal = False
+        self._safe_end: Optional[int] = None
+        self._safe_closers = ""
+
+    @property
+    def text(self) -> str:
+        return "".join(self._chunks)
+
+    @property
+    def complete(self) -> bool:
+        """顶层值是否已经完整结束"""
+        return self._end is not None
+
+    def feed(self, chunk: str):
+        offset = self._length
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+        if self._end is not None:
+            return
+        for i, char in enumerate(chunk, offset):
+            if self._start is None:
+                if char in _CLOSERS:
+                    self._start = i
+                else:
+                    continue
+            if self._in_string:
+                if self._unicode_left:
+                    self._unicode_left -= 1
+                elif self._escape:
+                    self._escape = False
+                    if char == "u":
+                        self._unicode_left = 4
+                elif char == "\\":
+                    self._escape = True
+                    self._escape_at = i
+                elif char == '"':
+                    self._in_string = False
+                    if self._string_is_key:
+                        self._expect[-1] = "colon"
+                    else:
+                        self._value_done(i + 1)
+                continue
+            if self._in_literal:
+                if char.isalnum() or char in "+-.":
+                    continue
+                self._in_literal = False
+                self._value_done(i)
+            if char in _CLOSERS:
+                self._stack.append(char)
+                self._expect.append("key" if char == "{" else "value")
+                self._mark_safe(i + 1)
+            elif char in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                self._expect.pop()
+                if not self._stack:
+                    self._end = i + 1
+                    return
+                self._value_done(i + 1)
+            elif char == '"':
+                self._in_string = True
+                self._string_is_key = self._stack[-1] == "{" and self._expect[-1] == "key"
+            elif char == ":":
+                self._expect[-1] = "value"
+            elif char == ",":
+                self._expect[-1] = "key" if self._stack[-1] == "{" else "value"
+            elif not char.isspace():
+                self._in_literal = True
+
+    def _closers(self) -> str:
+        return "".join(_CLOSERS[opener] for opener in reversed(self._stack))
+
+    def _mark_safe(self, end: int):
+        self._safe_end = end
+        self._safe_closers = self._closers()
+
+    def _value_done(self, end: int):
+        self._expect[-1] = "comma"
+        self._mark_safe(end)
+
+    def repair(self) -> str:
+        """返回补全后的 JSON 文本；尚未收到任何容器开头时抛出 ValueError"""
+        if self._start is None:
+            raise ValueError("输出中没有 JSON 对象")
+        text = self.text
+        if self._end is not None:
+            return text[self._start:self._end]
+        if self._in_string and not self._string_is_key:
+            # 保留正在输出的字符串值，去掉未写完的转义序列
+            end = self._escape_at if self._escape or self._unicode_left else len(text)
+            return text[self._start:end] + '"' + self._closers()
+        return text[self._start:self._safe_end] + self._safe_closers
+
+    def parse(self) -> Any:
+        return json.loads(self.repair())
+
+
+def parse_partial_json(text: str) -> Any:
+    """解析可能被截断或带有代码围栏的 JSON 文本"""
+    parser = IncrementalJSONParser()
+    parser.feed(text)
+    return parser.parse()
@@ -0,0 +1,125 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Optional
+
+
+class DiskCache:
+    """以内容哈希为键的磁盘缓存，可按总大小（LRU）或存活时间淘汰"""
+
+    def __init__(self, cache_dir: str, max_bytes: Optional[int] = None,
+                 max_age_seconds: Optional[float] = None, suffix: str = ".bin"):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None  # 首次写入时才统计
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        """对任意可 JSON 序列化的参数计算 sha256 键"""
+        payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        """键对应的文件路径，按前两位分目录避免单目录文件过多"""
+        return self.cache_dir / key[:2] / f"{key}{self.suffix}"
+
+    def _expired(self, path: Path, now: float) -> bool:
+        return self.max_age_seconds is not None and now - path.stat().st_mtime > self.max_age_seconds
+
+    def get(self, key: str) -> Optional[bytes]:
+        """读取缓存，未命中或已过期返回 None"""
+        path = self.path_for(key)
+        try:
+            if self._expired(path, time.time()):
+                self._remove(path)
+                return None
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+        if self.max_bytes is not None:
+            # 按大小淘汰时用 mtime 记录最近使用时间
+            os.utime(path)
+        return data
+
+    def contains(self, key: str) -> bool:
+        path = self.path_for(key)
+        try:
+            return path.is_file() and not self._expired(path, time.time())
+        except FileNotFoundError:
+            return False
+
+    def put(self, key: str, data: bytes) -> Path:
+        """写入缓存（先写临时文件再原子替换），必要时触发淘汰"""
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            # 覆盖已有条目时，总大小只增加新旧内容的差值
+            previous_size = path.stat().st_size
+        except FileNotFoundError:
+            previous_size = 0
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+        if self.max_bytes is not None:
+            with self._lock:
+                if self._total_bytes is None:
+                    self._total_bytes = sum(size for _, _, size in self._entries())
+                else:
+                    self._total_bytes += len(data) - previous_size
+                if self._total_bytes > self.max_bytes:
+                    self.evict()
+        return path
+
+    def _entries(self):
+        """遍历缓存文件，产出 (路径, mtime, 大小)"""
+        if not self.cache_dir.exists():
+            return
+        for path in self.cache_dir.glob(f"*/*{self.suffix}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            yield path, stat.st_mtime, stat.st_size
+
+    def _remove(self, path: Path):
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def evict(self) -> int:
+        """删除过期条目，再按最近最少使用删除直到总大小不超过上限，返回删除数量"""
+        now = time.time()
+        removed = 0
+        entries = []
+        for path, mtime, size in self._entries():
+            if self.max_age_seconds is not None and now - mtime > self.max_age_seconds:
+                self._remove(path)
+                removed += 1
+            else:
+                entries.append((mtime, size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if self.max_bytes is not None and total > self.max_bytes:
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                self._remove(path)
+                total -= size
+                removed += 1
+        self._total_bytes = total
+        return removed
+
+    def clear(self):
+        """清空缓存目录下的所有条目"""
+        for path, _, _ in list(self._entries()):
+            self._remove(path)
+        self._total_bytes = 0
@@ -0,0 +1,196 @@
+import os
+import json
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# 未校准时的朗读语速（词/分钟）
+DEFAULT_WORDS_PER_MINUTE = 130
+# 校准结果保存位置
+DURATION_MODEL_PATH = ".cache/duration_model.json"
+# 校准时先验所占的词数：实测样本越多，越接近实测语速
+PRIOR_WORDS = 200
+# 太短的请求（如一两个词的插话）时长主要由停顿决定，不参与校准
+MIN_CALIBRATION_WORDS = 3
+# 脚本预计时长与目标时长的允许偏差，以及估算成品时长时每两段之间的平均停顿（秒）
+BUDGET_TOLERANCE = 0.15
+SEGMENT_PAUSE_SECONDS = 0.25
+
+
+@dataclass
+class CalibrationSample:
+    """一次 TTS 请求的实测结果：说话者、请求中各部分的 (词数, 情绪)，以及合成音频的实际秒数
+
+    成品的时间戳只在请求边界上是准确的，校准以整个请求为单位，不把请求按预计时长拆回段落。
+    """
+    speaker: str
+    parts: List[Tuple[int, Optional[str]]]
+    seconds: float
+
+    @property
+    def words(self) -> int:
+        return sum(words for words, _ in self.parts)
+
+    @property
+    def emotion(self) -> Optional[str]:
+        """请求内所有部分都是同一种情绪时返回该情绪，混合或没有情绪时为 None"""
+        emotions = {emotion.strip().lower() if emotion else None for _, emotion in self.parts}
+        return emotions.pop() if len(emotions) == 1 else None
+
+
+class DurationModel:
+    """按说话者与情绪预测朗读时长的模型
+
+    每位说话者有自己的语速（词/分钟），每种情绪有相对语速的时长系数（如激动时更快、
+    低沉时更慢）。可以用合成后各 TTS 请求的实测时长校准：实测与预测的比值按词数加权并入已有估计。
+    """
+
+    def __init__(self, words_per_minute: float = DEFAULT_WORDS_PER_MINUTE,
+                 speaker_rates: Optional[Dict[str, List[float]]] = None,
+                 emotion_factors: Optional[Dict[str, List[float]]] = None, total_words: float = 0):
+        self.words_per_minute = words_per_minute
+        self.total_words = total_words
+        # 说话者 -> [语速, 样本词数]；情绪 -> [时长系数, 样本词数]
+        self.speaker_rates: Dict[str, List[float]] = speaker_rates or {}
+        self.emotion_factors: Dict[str, List[float]] = emotion_factors or {}
+
+    def rate(self, speaker: Optional[str] = None) -> float:
+        if speaker in self.speaker_rates:
+            return self.speaker_rates[speaker][0]
+        return self.words_per_minute
+
+    def factor(self, emotion: Optional[str] = None) -> float:
+        if emotion:
+            key = emotion.strip().lower()
+            if key in self.emotion_factors:
+                return self.emotion_factors[key][0]
+        return 1.0
+
+    def estimate(self, words: int, speaker: Optional[str] = None, emotion: Optional[str] = None) -> float:
+        """预计朗读秒数"""
+        return words * 60.0 / self.rate(speaker) * self.factor(emotion)
+
+    def words_for_minutes(self, minutes: float) -> int:
+        """给定时长大约能说多少词，用于提示词中的字数要求"""
+        return round(minutes * self.words_per_minute)
+
+    @staticmethod
+    def _blend(entry: Optional[List[float]], prior: float, observed: float, words: float) -> List[float]:
+        value, weight = entry if entry else (prior, PRIOR_WORDS)
+        return [(value * weight + observed * words) / (weight + words), weight + words]
+
+    def calibrate(self, samples: Sequence[CalibrationSample]):
+        """用各 TTS 请求的实测时长校准语速与情绪系数
+
+        说话者语速：实测秒数除以请求内各部分情绪系数的词数加权平均，还原为该说话者的基准语速。
+        情绪系数：只用整个请求都是同一情绪的样本，比较实测时长与按说话者语速的预测值；
+        混合情绪的合并请求分不出各情绪各占多少时长，不参与情绪校准。
+        """
+        samples = [sample for sample in samples if sample.words >= MIN_CALIBRATION_WORDS and sample.seconds > 0]
+        if not samples:
+            return
+
+        by_speaker: Dict[str, List[float]] = {}
+        for sample in samples:
+            factor = sum(words * self.factor(emotion) for words, emotion in sample.parts) / sample.words
+            totals = by_speaker.setdefault(sample.speaker, [0.0, 0.0])
+            totals[0] += sample.words
+            totals[1] += sample.seconds / factor
+
+        all_words = sum(words for words, _ in by_speaker.values())
+        all_seconds = sum(seconds for _, seconds in by_speaker.values())
+        weight = self.total_words + PRIOR_WORDS
+        self.words_per_minute = ((self.words_per_minute * weight + all_words * 60.0 / all_seconds * all_words)
+                                 / (weight + all_words))
+        self.total_words += all_words
+        for speaker, (words, seconds) in by_speaker.items():
+            self.speaker_rates[speaker] = self._blend(self.speaker_rates.get(speaker), self.words_per_minute,
+                                                      words * 60.0 / seconds, words)
+
+        # 情绪系数：实测时长相对于该说话者语速预测值的比例
+        by_emotion: Dict[str, List[float]] = {}
+        for sample in samples:
+            if sample.emotion:
+                totals = by_emotion.setdefault(sample.emotion, [0.0, 0.0, 0.0])
+                totals[0] += sample.seconds
+                totals[1] += sample.words * 60.0 / self.rate(sample.speaker)
+                totals[2] += sample.words
+        for emotion, (seconds, predicted, words) in by_emotion.items():
+            self.emotion_factors[emotion] = self._blend(self.emotion_factors.get(emotion), 1.0,
+                                                        seconds / predicted, words)
+
+    def to_dict(self) -> Dict:
+        return {
+            "words_per_minute": self.words_per_minute,
+            "total_words": self.total_words,
+            "speaker_rates": self.speaker_rates,
+            "emotion_factors": self.emotion_factors,
+        }
+
+    def save(self, path: str = DURATION_MODEL_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = DURATION_MODEL_PATH) -> "DurationModel":
+        """加载校准结果，文件不存在或损坏时返回未校准的模型"""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return cls(**json.load(f))
+        except (OSError, ValueError, TypeError):
+            return cls()
+
+
+class ScriptBudget:
+    """检查流式生成中的脚本是否超出或不足目标时长
+
+    reserve_seconds 为超出预算后还要补上的内容（如固定结尾）预留的时长。
+    """
+
+    def __init__(self, target_seconds: float, tolerance: float = BUDGET_TOLERANCE,
+                 model: Optional[DurationModel] = None, reserve_seconds: float = 0.0):
+        self.target_seconds = target_seconds
+        self.tolerance = tolerance
+        self.model = model or get_duration_model()
+        self.reserve_seconds = reserve_seconds
+
+    def estimate(self, table) -> float:
+        """段落表的预计成品时长（秒），含段间停顿"""
+        return table.total_duration + SEGMENT_PAUSE_SECONDS * max(0, len(table) - 1)
+
+    def exceeded(self, table, pending_words: int = 0) -> bool:
+        """pending_words 为尚未成为完整段落、但已经生成的词数"""
+        estimated = self.estimate(table) + self.model.estimate(pending_words) + self.reserve_seconds
+        return estimated > self.target_seconds * (1 + self.tolerance)
+
+    def shortfall_words(self, table) -> int:
+        """低于目标下限时还差多少词（按目标时长补足），否则为 0"""
+        estimated = self.estimate(table)
+        if estimated >= self.target_seconds * (1 - self.tolerance):
+            return 0
+        return self.model.words_for_minutes((self.target_seconds - estimated) / 60.0)
+
+
+_model: Optional[DurationModel] = None
+_model_lock = threading.Lock()
+
+
+def get_duration_model() -> DurationModel:
+    """进程内共享的时长模型（首次使用时加载校准结果）"""
+    global _model
+    with _model_lock:
+        if _model is None:
+            _model = DurationModel.load()
+    return _model
+
+
+def calibrate_duration_model(samples: Sequence[CalibrationSample]):
+    """用一期成品各 TTS 请求的实测时长校准共享模型并保存"""
+    model = get_duration_model()
+    model.calibrate(samples)
+    model.save()
+    print(f"时长模型已校准：平均语速 {model.words_per_minute:.0f} 词/分钟")
@@ -0,0 +1,141 @@
+import os
+import warnings
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional, Tuple
+
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.globals import get_llm_cache, set_llm_cache
+from langchain_core.load import dumps, loads
+from langchain_core.messages import AIMessageChunk, BaseMessage, message_chunk_to_message
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk
+
+from disk_cache import DiskCache
+
+# 默认缓存目录，可通过环境变量 LLM_CACHE_DIR 覆盖
+LLM_CACHE_DIR = ".cache/llm"
+
+
+class DiskLLMCache(BaseCache):
+    """LangChain 的磁盘 LLM 缓存
+
+    键为 llm_string（模型名、temperature 等调用参数）与渲染后的完整提示词
+    （已包含全部输入）的哈希，因此提示词或模型参数任一变化都会重新请求。
+    """
+
+    def __init__(self, cache_dir: str = LLM_CACHE_DIR, max_bytes: Optional[int] = None,
+                 max_age_seconds: Optional[float] = None):
+        self._store = DiskCache(cache_dir, max_bytes=max_bytes, max_age_seconds=max_age_seconds, suffix=".json")
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        data = self._store.get(DiskCache.make_key(llm_string, prompt))
+        if data is None:
+            return None
+        try:
+            with warnings.catch_warnings():
+                # loads 仍处于 beta，缓存内容由本进程写入，忽略其提示
+                warnings.simplefilter("ignore")
+                return loads(data.decode("utf-8"))
+        except Exception as e:
+            print(f"读取 LLM 缓存失败，将重新请求: {str(e)}")
+            return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        self._store.put(DiskCache.make_key(llm_string, prompt), dumps(return_val).encode("utf-8"))
+
+    def clear(self, **kwargs: Any) -> None:
+        self._store.clear()
+
+
+def enable_llm_cache(cache_dir: Optional[str] = None) -> Optional[DiskLLMCache]:
+    """为所有 ChatOpenAI 链启用全局磁盘缓存（重复调用不会重复设置）
+
+    环境变量（在 load_dotenv 之后读取）：
+    LLM_CACHE_DIR 缓存目录，LLM_CACHE_MAX_MB 总大小上限，
+    LLM_CACHE_MAX_AGE_DAYS 条目存活天数，LLM_CACHE_DISABLED=1 关闭缓存。
+    """
+    if os.getenv("LLM_CACHE_DISABLED", "").lower() in ("1", "true", "yes"):
+        return None
+    current = get_llm_cache()
+    if isinstance(current, DiskLLMCache):
+        return current
+
+    max_mb = os.getenv("LLM_CACHE_MAX_MB")
+    max_age_days = os.getenv("LLM_CACHE_MAX_AGE_DAYS")
+    cache = DiskLLMCache(
+        cache_dir or os.getenv("LLM_CACHE_DIR", LLM_CACHE_DIR),
+        max_bytes=int(float(max_mb) * 1024 * 1024) if max_mb else None,
+        max_age_seconds=float(max_age_days) * 86400 if max_age_days else None,
+    )
+    set_llm_cache(cache)
+    return cache
+
+
+def _stream_cache_key(model, messages: List[BaseMessage], stop: Optional[List[str]],
+                      kwargs: dict) -> Optional[Tuple[BaseCache, str, str]]:
+    """与 invoke 相同的缓存键（规范化后的消息 + llm_string），流式与非流式调用共用缓存条目"""
+    if model.cache is False:
+        return None
+    llm_cache = model.cache if isinstance(model.cache, BaseCache) else get_llm_cache()
+    if llm_cache is None:
+        return None
+    normalized = [message.model_copy(update={"id": None}) if getattr(message, "id", None) is not None else message
+                  for message in messages]
+    return llm_cache, dumps(normalized), model._get_llm_string(stop=stop, **kwargs)
+
+
+def _cached_chunk(model, cached: RETURN_VAL_TYPE) -> Optional[ChatGenerationChunk]:
+    generations = model._convert_cached_generations(cached)
+    if not generations:
+        return None
+    message = generations[0].message
+    return ChatGenerationChunk(message=AIMessageChunk(content=message.content,
+                                                      response_metadata=message.response_metadata),
+                               generation_info=generations[0].generation_info)
+
+
+def _store_stream(cache_key: Tuple[BaseCache, str, str], generation: Optional[ChatGenerationChunk]):
+    if generation is None:
+        return
+    llm_cache, prompt, llm_string = cache_key
+    llm_cache.update(prompt, llm_string, [ChatGeneration(message=message_chunk_to_message(generation.message),
+                                                         generation_info=generation.generation_info)])
+
+
+def cached_stream(model, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: dict,
+                  open_stream: Callable[[], Iterator[ChatGenerationChunk]]) -> Iterator[ChatGenerationChunk]:
+    """让模型的 _stream 也读写 LLM 缓存（LangChain 的 stream() 本身不查缓存）
+
+    命中时把缓存的完整结果作为一个分块产出，不发请求；未命中时照常流式产出，
+    流正常结束后把拼接好的完整结果写入缓存。被调用方提前关闭或出错的流不会写入缓存。
+    """
+    cache_key = _stream_cache_key(model, messages, stop, kwargs)
+    if cache_key is not None:
+        cached = cache_key[0].lookup(cache_key[1], cache_key[2])
+        chunk = _cached_chunk(model, cached) if isinstance(cached, list) else None
+        if chunk is not None:
+            yield chunk
+            return
+    generation: Optional[ChatGenerationChunk] = None
+    for chunk in open_stream():
+        generation = chunk if generation is None else generation + chunk
+        yield chunk
+    if cache_key is not None:
+        _store_stream(cache_key, generation)
+
+
+async def acached_stream(model, messages: List[BaseMessage], stop: Optional[List[str]], kwargs: dict,
+                         open_stream: Callable[[], AsyncIterator[ChatGenerationChunk]]
+                         ) -> AsyncIterator[ChatGenerationChunk]:
+    """cached_stream 的异步版本"""
+    cache_key = _stream_cache_key(model, messages, stop, kwargs)
+    if cache_key is not None:
+        cached = cache_key[0].lookup(cache_key[1], cache_key[2])
+        chunk = _cached_chunk(model, cached) if isinstance(cached, list) else None
+        if chunk is not None:
+            yield chunk
+            return
+    generation: Optional[ChatGenerationChunk] = None
+    async for chunk in open_stream():
+        generation = chunk if generation is None else generation + chunk
+        yield chunk
+    if cache_key is not None:
+        _store_stream(cache_key, generation)
@@ -1,526 +1,786 @@
-from email import generator
-import os
-import json
-import time
-from typing import List, Dict, Any
-from pathlib import Path
-import asyncio
-
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
-from langchain_core.output_parsers import StrOutputParser
-from dotenv import load_dotenv
-
-import json
-from elevenlabs import generate as generator, save  # 添加 save 导入
-
-
-# 加载环境变量
-load_dotenv()
-
-# 设置 ElevenLabs API 密钥
-
-
-# 设置 OpenRouter API
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-
-# 定义模型
-DEEPSEEK_MODEL = "google/gemini-2.0-flash-001"
-GEMINI_MODEL = "google/gemini-2.0-flash-001"
-
-# 创建 LangChain 模型实例
-deepseek_model = ChatOpenAI(
-    model=DEEPSEEK_MODEL,
-    api_key=OPENROUTER_API_KEY,
-    base_url="https://openrouter.ai/api/v1",
-)
-
-gemini_model = ChatOpenAI(
-    model=GEMINI_MODEL,
-    api_key=OPENROUTER_API_KEY,
-    base_url="https://openrouter.ai/api/v1",
-)
-
-
-
-def read_text_file(directory_path: str) -> str:
-    """读取目录下所有文本文件的内容并合并"""
-    combined_text = []
-    
-    # 确保路径存在
-    if not os.path.exists(directory_path):
-        raise FileNotFoundError(f"目录不存在: {directory_path}")
-    
-    # 获取所有txt文件
-    txt_files = [f for f in os.listdir(directory_path) if f.endswith('.txt')]
-    print(f"发现 {len(txt_files)} 个txt文件")
-    
-    # 按文件名排序
-    txt_files.sort()
-    
-    # 读取每个文件
-    for filename in txt_files:
-        file_path = os.path.join(directory_path, filename)
-        print(f"正在读取文件: {filename}")
-        try:
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read().strip()
-                combined_text.append(content)
-        except Exception as e:
-            print(f"读取文件 {filename} 时出错: {str(e)}")
-    
-    # 用换行符合并所有文本
-    final_text = "\n\n".join(combined_text)
-    print(f"合并后的文本总长度: {len(final_text)} 字符")
-    
-    return final_text
-
-def generate_core_topics(podcast_theme: str, book_summary: str, duration_minutes: int) -> str:
-    """使用DeepSeek生成核心话题"""
-    prompt_template = """You are a professional podcast content strategist. Generate core topics for a two-person dialogue podcast based on the following inputs.
-
-    Podcast Theme:
-    {podcast_theme}
-
-    Book Summary:
-    {book_summary}
-
-    Expected Duration: {duration_minutes} minutes
-
-    Instructions:
-    1. If duration is under 5 minutes, generate 3 topics. Otherwise, generate 5 topics.
-    2. Topics should follow a logical progression from basics to practical applications to broader perspectives.
-    3. Ensure topics are interconnected and flow naturally.
-    4. Each topic must include a title and detailed explanation.
-
-    Output format: Required JSON Structure:
-    - Root object must contain "core_topics" array 
-    - Each topic in core_topics must have:
-      * core_topic (main topic title)
-      * explanation (detailed description)
-
-    Response must be valid JSON only, no additional text.
-    Focus on creating engaging, discussion-worthy topics that match the theme and book content."""
-    
-    prompt = ChatPromptTemplate.from_template(prompt_template)
-    chain = prompt | deepseek_model | StrOutputParser()
-    
-    result = chain.invoke({
-        "book_summary": book_summary,
-        "podcast_theme": podcast_theme,
-        "duration_minutes": duration_minutes
-    })
-    
-    # 打印API返回结果，用于调试
-    print("API返回结果：")
-    print(result)
-    
-    # 确保输出目录存在
-    os.makedirs("output/core_topics", exist_ok=True)
-    
-    # 尝试解析JSON并保存
-    try:
-        # 解析JSON字符串
-        topics_data = json.loads(result)
-        # 保存到文件
-        with open("output/core_topics/core_topics.json", "w", encoding="utf-8") as f:
-            json.dump(topics_data, f, ensure_ascii=False, indent=4)
-    except json.JSONDecodeError:
-        # 如果不是有效的JSON，则直接保存文本
-        with open("output/core_topics/core_topics.txt", "w", encoding="utf-8") as f:
-            f.write(result)
-    
-    return result
-
-def generate_podcast_transcript(book_summary: str, core_topics: str, ip_setting: str) -> str:
-    """使用Gemini生成播客对话脚本"""
-    prompt_template = """
-    You are a professional podcast script writer. Based on the following book summary, core topics, character profiles, and conversation duration, please create a natural, engaging, and informative two-person dialogue podcast script.
-    Requirements: Ensure the dialogue reflects each character's personality traits, and the conversation focuses on the book's content.
-
-    Book Summary:
-    {book_summary}
-
-    Core Topics:
-    {core_topics}
-
-    Character Profiles:
-    {ip_setting}
-
-    Conversation Duration: {duration_minutes} minutes
-
-    A's name: {SPEAKER_1}
-    B's name: {SPEAKER_2}
-
-    Please create the dialogue script in the following format (in actual dialogue, A and B should be replaced with their respective names):
-    ****** opening ******
-    A : (opening remarks)
-    B : (response)
-    ...
-
-    ****** content ******
-    A : (discussing first topic)
-    B : (responding and deepening discussion)
-    A : (raising questions or new perspectives)
-    B : (responding)
-    ...
-
-    ****** content ******
-    (continuing to next topic)
-    ...
-
-    ****** closing ******
-    A : (summarizing discussion)
-    B : (closing remarks)
-
-    Requirements:
-    1. The dialogue should flow naturally, like real people conversing
-    2. Include opening remarks, multiple content sections, and closing remarks
-    3. Ensure coverage of all core topics
-    4. Avoid lengthy monologues, maintain interactivity
-    5. Total dialogue length and depth should be appropriate for a {duration_minutes} minute podcast
-    6. Use simple txt format without any markdown formatting or additional text
-    7. Start directly with the dialogue, without any introduction or explanation    
-    """
-    
-    prompt = ChatPromptTemplate.from_template(prompt_template)
-    chain = prompt | gemini_model | StrOutputParser()
-    
-    # 生成对话脚本
-    transcript = chain.invoke({
-        "book_summary": book_summary,
-        "core_topics": core_topics,
-        "ip_setting": ip_setting,
-        "duration_minutes": calculate_duration_from_topics(core_topics),
-        "SPEAKER_1": SPEAKER_1,
-        "SPEAKER_2": SPEAKER_2
-    })
-    
-    # 确保输出目录存在
-    output_dir = os.path.join(".", "output", "transcript")
-    os.makedirs(output_dir, exist_ok=True)
-    
-    # 保存对话脚本
-    output_file = os.path.join(output_dir, "demo1_1.txt")
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write(transcript)
-    
-    print(f"对话脚本已保存至: {output_file}")
-    
-    return transcript
-
-def calculate_duration_from_topics(core_topics: str) -> int:
-    """从核心话题估算总时长"""
-    # 简单实现，实际应用中可能需要更复杂的解析
-    try:
-        # 尝试找出所有包含"分钟"的行并提取数字
-        import re
-        minutes = re.findall(r'(\d+)\s*minutes', core_topics)
-        if minutes:
-            return sum(map(int, minutes))
-        return 20  # 默认20分钟
-    except:
-        return 20  # 默认20分钟
-
-def parse_transcript(transcript: str) -> List[Dict[str, Any]]:
-    """解析生成的脚本为结构化数据"""
-    segments = []
-    lines = transcript.strip().split('\n')
-    
-    current_speaker = None
-    current_emotion = None
-    current_text = ""
-    
-    for line in lines:
-        line = line.strip()
-        if not line or "******" in line:
-            # 保存当前段落并重置
-            if current_speaker and current_text:
-                segments.append({
-                    "speaker": current_speaker,
-                    "emotion": current_emotion,
-                    "text": current_text.strip()
-                })
-                current_text = ""
-            continue
-            
-        # 尝试解析说话者和情感
-        import re
-        match = re.match(r'([AB])\s*\[(.*?)\]:\s*(.*)', line)
-        if match:
-            # 保存之前的段落
-            if current_speaker and current_text:
-                segments.append({
-                    "speaker": current_speaker,
-                    "emotion": current_emotion,
-                    "text": current_text.strip()
-                })
-            
-            current_speaker = match.group(1)
-            current_emotion = match.group(2)
-            current_text = match.group(3)
-        else:
-            # 继续当前段落
-            current_text += " " + line
-    
-    # 添加最后一个段落
-    if current_speaker and current_text:
-        segments.append({
-            "speaker": current_speaker,
-            "emotion": current_emotion,
-            "text": current_text.strip()
-        })
-    
-    return segments
-
-async def generate_audio_segment(segment: Dict[str, Any], output_dir: Path) -> str:
-    """为单个对话段落生成音频"""
-    speaker = segment["speaker"]
-    text = segment["text"]
-    emotion = segment["emotion"]
-    
-    # 选择声音
-    voice = VOICE_A if speaker == "SPEAKER_1" else VOICE_B
-    
-    # 根据情感调整语音参数
-    stability = 0.5
-    similarity_boost = 0.5
-    
-    if emotion.lower() in ["兴奋", "激动", "热情"]:
-        stability = 0.3
-    elif emotion.lower() in ["平静", "思考", "严肃"]:
-        stability = 0.7
-    
-
-
-    # 生成音频
-    audio = generator(
-        text=text,
-        voice=voice,
-        model="eleven_multilingual_v2",
-        stability=stability,
-        similarity_boost=similarity_boost
-    )
-    
-    # 保存音频片段
-    filename = f"{output_dir / speaker}_{int(time.time())}.mp3"
-    save(audio, filename)
-    
-    return filename
-
-async def generate_full_podcast(segments: List[Dict[str, Any]], output_path: str):
-    """生成完整的播客音频"""
-    output_dir = Path(output_path).parent
-    output_dir.mkdir(exist_ok=True, parents=True)
-    
-    # 创建临时目录存放音频片段
-    temp_dir = output_dir / "temp"
-    temp_dir.mkdir(exist_ok=True)
-    
-    # 生成所有音频片段
-    audio_files = []
-    for segment in segments:
-        filename = await generate_audio_segment(segment, temp_dir)
-        audio_files.append(filename)
-    
-    # 合并音频文件
-    from pydub import AudioSegment
-    
-    combined = AudioSegment.empty()
-    for file in audio_files:
-        audio_segment = AudioSegment.from_mp3(file)
-        combined += audio_segment
-    
-    # 保存最终文件
-    combined.export(output_path, format="mp3")
-    
-    # 清理临时文件
-    for file in audio_files:
-        os.remove(file)
-    os.rmdir(temp_dir)
-    
-    return output_path
-
-async def create_podcast(podcast_theme: str, book_summary_path: str, ip_setting: str, duration_minutes: int, output_path: str):
-    """创建完整的播客流程"""
-    # 1. 读取书籍摘要
-    book_summary = read_text_file(book_summary_path)
-    
-    # 2. 生成核心话题
-    print("生成核心话题...")
-    core_topics = generate_core_topics(podcast_theme, book_summary, duration_minutes)
-    print(f"核心话题已生成:\n{core_topics}\n")
-    
-    # 3. 生成播客脚本
-    print("生成播客脚本...")
-    transcript = generate_podcast_transcript(book_summary, core_topics, ip_setting)
-    print(f"播客脚本已生成:\n{transcript[:500]}...\n")
-    
-    # # 4. 解析脚本
-    # segments = parse_transcript(transcript)
-    # print(f"解析出 {len(segments)} 个对话段落")
-    
-    # # 5. 生成音频
-    # print("生成播客音频...")
-    # final_path = await generate_full_podcast(segments, output_path)
-    # print(f"播客已生成并保存至: {final_path}")
-    
-    return {
-        "core_topics": core_topics,
-        "transcript": transcript,
-        # "audio_path": final_path
-    }
-
-if __name__ == "__main__":
-
-        # 定义 ElevenLabs 声音
-    VOICE_A = "Adam"  # 替换为您想要的声音ID
-    VOICE_B = "Rachel"  # 替换为您想要的声音ID
-
-    # 定义说话者名字
-    # SPEAKER_1 = "Samuel"
-    # SPEAKER_2 = "Alex"
-
-    SPEAKER_1 = "Edith"
-    SPEAKER_2 = "Chloe"
-    # 示例用法
-    book_summary_path1 = "./data/summary/self_improvement/"
-    book_summary_path2 = "./data/summary/relationship_and_family/"
-
-    duration_minutes = 3
-
-    output_path = "./output/podcast.mp3"
-    podcast_theme1 = "How Social Media Ruined My Life (self-doubt): The negative impacts of social media on mental health and self-esteem, Body image issues"
-    podcast_theme2 = "Escaping Friend Zone: the complexities of transitioning from friendship to a romantic relationship"
-    ip_setting1 = """
-    Character Information:
-        Character A:
-            Image: Wise Elder
-            Name: Samuel "Sam" Eldredge
-            Character Profile:
-            1. Keywords: Wisdom, Experience, Empathy, Humility, Humor, Slightly Rebellious "Old Soul"
-            2. Background: Sam is a 74-year-old elder, but definitely not the traditional, preachy type. He's a "cross-domain sage" who has succeeded in multiple fields. In his youth, he was a rock musician, later became a psychology professor, and at 50, started a new business focusing on happiness psychology and personal growth. His interests are diverse: yoga, meditation, stand-up comedy... he even started learning programming at 70. His wisdom comes from his rich, bold, and sometimes rebellious life experiences, not just from books. He likes to teach through vivid stories, speaking casually but hitting the mark, always giving that "enlightening" feeling.
-            - Tolerant and Authentic: Doesn't lecture audiences with clichés, preferring to communicate through humor and empathy, acknowledging his own failures and vulnerabilities.
-            - Firm yet Inclusive: Has his own convictions about eternal "truths" (like how to live happily, how to view self-worth) but also accepts new trends and is willing to keep learning.
-            - Playfully Rebellious: Deliberately "lightly mocks" modern personal development concepts, like "wake up at 5 AM to succeed" - he says having good tea and meditation at noon can lead to success too.
-            - Far from Perfect: Sam admits his flaws, like focusing too much on material success in his youth and neglecting family; but he later mended these relationships, making him feel "authentically lived."
-            4. Voice Characteristics: Warm baritone, magnetic, slow-paced but with firm power, as if every word flows from the depths of his soul with a touch of humor.
-            5. Behavioral Traits:
-            - Uses Poetry as Metaphors: When facing any life issues, he tends to use classical poetry or ancient texts as metaphors, which might amuse others, but he believes it makes the lessons more profound.
-            - Collects Perpetual Calendars: Sam enjoys hunting for different types of perpetual calendars at various flea markets, which has become his passionate hobby.
-            6. Flaws:
-            - Sometimes Too Preachy: Despite good intentions, he occasionally slips into "teaching mode," making it feel like a lecture, especially when he thinks a young person needs guidance.
-            - Stubborn Views: Sometimes he's stubborn about certain traditional views, refusing to accept new things, occasionally making Chloe laugh helplessly.
-            7. Likes:
-            - Nostalgic Black and White Films: Sam loves classic movies and regularly hosts small movie nights, inviting friends to watch together.
-            - Tea and Coffee Culture: Has unique rituals for brewing tea at home, like specific teaware for different types of tea, particularly enjoying this process.
-            8. Dislikes:
-            - Fast-paced Lifestyle: Disapproves of modern people's fast-paced life, believing it makes people lose the joy of living.
-
-        Character B:
-            Image: Young Professional
-            Name: Alex Morey
-            Character Profile:
-            1. Keywords: Passionate, Infectious Energy, Authentic, Diverse, Innovative, Occasionally Self-deprecating
-            2. Background: Alex is a 27-year-old cross-domain professional who grew up in Los Angeles in a mixed-race family, with an entrepreneur father and a community psychologist mother. She studied Cognitive Science at Stanford University but chose not to follow a traditional career path, instead becoming a content creator focusing on personal growth and creative thinking. Alex is passionate about breaking free from "planned" constraints, focusing on "experimental growth" - she sees her life as a series of experiments, embracing both failures and successes. She likes to interpret complex topics about personal development and success in young people's language. Alex has both youthful sharpness and mature self-reflection. Despite her young age, she has already written a bestseller (AI-assisted, unknown to listeners) and been a speaker at several TEDx events.
-            3. Personality Traits:
-            - Authentic and Direct: Alex doesn't pretend to "know it all." When discussing topics like "finding meaning," she admits she's still exploring but shares her unique "trial and error" experiences.
-            - Passionate and Infectious Activist: She constantly encourages listeners to take action, even the smallest step, believing "action itself defines direction."
-            - Fearlessly Deconstructs Traditional Wisdom: She boldly challenges outdated personal development theories like "hard work equals success" or "your weaknesses will ruin you," supporting her views with modern cases or neuroscience research.
-            - Light-hearted and Self-deprecating: She likes to add self-deprecating humor when sharing her experiences, like "I tried 8 morning routines, failed at 7, but the 8th somehow worked! Though I haven't fully stuck to it yet, hey, who can become perfect in a day?"
-            - Slightly Rebellious but Vulnerable: She dislikes being "defined," sometimes questioning traditional life paths; but occasionally shares her own growth struggles openly.
-            4. Voice Characteristics: Clear and pleasant young female voice, full of energy and approachability, slightly fast-paced but natural, sometimes raising pitch with excitement, engaging to listen to while capable of showing quiet and gentle sides.
-            5. Special Behaviors:
-            - Uses Colorful Post-its: Alex habitually writes positive reminders on post-its before new appointments or important events, sticking them on her computer or mirror for self-encouragement.
-            - Names Her Plants: She has many potted plants, each with its own name (e.g., her favorite cactus is called "Pinpin"), and shares her emotions and daily life with them.
-            6. Flaws:
-            - Over-reliance on Technology: Alex tends to rely on phones and apps to handle life's problems, sometimes neglecting face-to-face real interactions.
-            7. Likes:
-            - Tech Innovation and Future Trends: Alex loves technology, curious about various new apps and tools, often trying and sharing her user experiences.
-            - Fun Social Activities: She enjoys participating in various gatherings and social events, discovering new friends and interesting stories.
-            8. Dislikes:
-            - Fake Social Media Presentations: Dislikes those who display perfect lives on social media that aren't real, believing this behavior leads to unnecessary anxiety.
-
-    Their Podcast Interaction Dynamic:
-        Conversation Style: Sam and Alex's podcast interactions blend wisdom inheritance with youthful challenge. Sam often counters Alex's free-spirited views with his "old-school wisdom," while Alex challenges him with latest research or modern concepts.
-        - Humor and Warmth: They often joke with each other. For example, Alex might tease Sam's "old-school" ways: "I can't do daily handwritten journals like Sam, my journal goes straight to the cloud!" While Sam might playfully critique Alex's life optimization: "Alex, how about enjoying life occasionally instead of trying to hack it forever?"
-        - Mutual Appreciation: Despite their clashing viewpoints, they respect each other. Sam praises Alex's boldness and innovation, seeing infinite possibilities in the younger generation; while Alex admires Sam's life experience and gentle wisdom, finding comfort for her own growth.
-    
-    Their Meeting Story:
-        Setting: A Coffee Shop in the Great Southwest
-            After college graduation, Alex decided to take a Gap Year, searching for life direction through travel and conversations with strangers, seeking inspiration and answers about self-development. Meanwhile, Sam, retired for many years, was traveling internationally and writing his third book about "cross-generational wisdom transmission." They met in an unnamed town in the American Southwest, where a vintage, atmospheric coffee shop became their meeting point.
-        Specific Encounter:
-            Alex had just finished a long road trip, still uncertain about her future. She sat in the coffee shop with a laptop and notebook, doing her daily reflection and planning. At this time, Sam was in the corner, hand-writing his journal (old-school style, very eye-catching). As both appeared "immersed" in their writing activities, they caught each other's attention.
-            Curious Alex, trying to break the lonely silence, noticed Sam's handwriting and mistaking him for just an eccentric artistic traveler, made a joke: "Who still writes journals by hand these days! Is this for some social media documentary?"
-            Sam looked up and humorously replied:
-            "When you reach my age, you'll find that social media can't remember every day you've lived."
-            Alex was immediately struck by this response, sensing this elderly gentleman possessed wisdom beyond the ordinary, yet without a lecturing tone. She became interested in continuing the conversation with Sam, naturally leading to discussing her own search for life direction and meaning.
-
-    """
-
-    ip_setting2 = """
-    Character Information:
-        Character A:
-            Image: "The Silver Siren"
-            Name: Edith 
-            Character Profile:
-            1. Character Keywords: Free-spirited, elegant, wise, humorous, outspoken, full of passion for life
-            2. Background:
-            - Career: Edith is a respected fashion magazine editor who has witnessed decades of fashion trends. After retirement, she became a bestselling memoir writer. Her books cover not only her colorful love life but also topics like fashion, social skills, and female independence. Her social media accounts are filled with fashion insights and relationship wisdom, attracting a massive following.
-            - Emotional Experience: Edith has been married three times, each experience giving her unique insights into relationships. She maintains an optimistic attitude towards love, believing that every relationship has value, whether successful or not. She often shares her past love stories with humor, helping listeners gain insights from her experiences.
-            3. Personality Traits:
-            - Wisdom and Humor: She effortlessly combines traditional wisdom with modern reality TV culture, such as using classical love quotes to comment on contemporary dating phenomena.
-            - Outspoken: Edith dares to express her views, often surprising people with her unconventional insights, including her confusion about young people's dating habits and her complaints about "digital love" possessiveness.
-            - Detail-oriented in Life: She shares life tips, such as how to boost confidence during dates and how to express personality through clothing.
-            4. Voice Characteristics: Edith's voice is slightly husky yet gentle, conveying the weight of life experience. Her tone is rich in variation and infectious, capable of conveying her passion and determination for life and love.
-            5. Distinctive Behaviors:
-            - Collecting "Old-school" Love Letters: Edith enjoys hunting for second-hand letters in antique markets or used bookstores, especially love letters, believing they are precious testimonies of past emotions.
-            - Never Leaving Home Without Makeup: Even just to go to the trash bin, Edith must make herself presentable, believing makeup is a form of respect for herself and others.
-            6. Flaws:
-            - Confused by Young People's Vocabulary: Although she understands modern culture well, she sometimes gets bewildered by young people's slang and humorously asks repeatedly about the meaning of each word.
-            - Loves to be Dramatic: Edith sometimes exaggerates daily occurrences, like shouting "My life is in peril!" when her tea spills.
-            7. Likes:
-            - Vintage Music and Dance: Edith loves music from the 50s to 70s and can't help dancing when she hears these songs, encouraging others to join in.
-            - Warm Nostalgic Stories: She loves warm romance stories and classic love movies, often recommending these works on the show.
-            8. Dislikes:
-            - Fast-food Culture of Internet Trends: Edith is dissatisfied with the superficial internet pop culture, believing such trends weaken genuine emotional connections.
-
-        Character B:
-            Image: "The Millennial Matchmaker" (28 years old)
-            Name: Chloe
-            Character Profile:
-            1. Character Keywords: Innovative, passionate, intuitive, energetic, curious, modern life explorer
-            2. Background:
-            - Career: Chloe is a dating app developer who has won multiple startup awards for innovative algorithms and user experience design. Besides entrepreneurship, she's also a well-known love podcast host, sharing modern dating culture and relationship tips while promoting her brand on social media.
-            - Emotional Experience: Despite being tech-savvy, Chloe has never dated, which she discusses with self-deprecating humor and willingness to explore modern love's loneliness and confusion. Her single status gives her keen insight into contemporary dating culture, especially complex relationships in the social media era.
-            3. Personality Traits:
-            - Tech-driven Optimist: Chloe believes technology can solve many problems, including love, so she's passionate about combining big data with psychology to analyze modern dating issues.
-            - Enthusiastic and Proactive: She's passionate about life, full of novel ideas, often encouraging listeners to try different dating methods and sharing trending dating patterns and social media pop culture.
-            - Self-deprecating and Relatable: Chloe isn't afraid to share her imperfections and vulnerabilities, making listeners empathize through light-hearted, humorous stories.
-            4. Voice Characteristics: Chloe's voice is sweet, fast-paced, and full of energy. She often uses encouraging tones to engage listeners in discussions, creating a relaxed and pleasant atmosphere.
-            5. Behavioral Characteristics:
-            - Often Uses Emojis to Record Moods: When updating social media, Chloe always uses abundant emojis to express her emotions, which might seem childish but is full of personality.
-            - Loves Photographing Daily Life: She takes photos during meals, scenery appreciation, or any small happy moments, creating a "My Daily Little Happiness" series.
-            6. Flaws:
-            - Tends to Overcomplicate Things: Chloe sometimes over-analyzes minor details, making simple decisions complex, like obsessing over what to wear on dates.
-            - Fear of Commitment: While she believes dating is good, she's afraid of long-term relationships and deep commitment, often hesitating.
-            7. Likes:
-            - Trendy Dating Activities: Chloe enjoys trying various novel, creative dating ideas like "escape rooms" or "art graffiti," believing these activities can enhance emotional connections.
-            - Sweets and Coffee: She's a sweet tooth and always has snacks in her bag, with plenty of desserts in her diet.
-            8. Dislikes:
-            - Cliché Dating Routines: She despises outdated dating methods (like movie-then-dinner), believing they make dates lose their freshness.
-
-    Their Podcast Interaction Dynamic:
-        Generational Dialogue: Edith and Chloe often interact around specific topics in the show, such as "Common Pitfalls in Modern Dating" or "How to Maintain Independence in Love." Edith draws from her rich life experience to reference traditional wisdom, while Chloe complements with modern tech trends and young people's perspectives, creating interesting discussions through their contrasting viewpoints.
-        Humorous Dialogue: Their conversations are light and humorous. Edith often uses her unique humor to joke about her age and life experience, saying things like: "When I was young, love didn't need an app to download." Chloe playfully retorts: "Well, I guess you used carrier pigeons then?" This humorous complement not only makes the show entertaining but also lets listeners feel the genuine and warm friendship between them.
-
-    Their Meeting Story:
-        First Encounter: City Literary Festival:
-            Edith and Chloe's meeting can be traced back to a city literary festival. Edith, as a bestselling memoir writer, was invited to participate in a roundtable discussion about "Love and Wisdom," while Chloe, an early-stage entrepreneur planning to start her love podcast, was seeking inspiration at the event.
-            During the discussion, Edith shared her unique insights about life and love, telling stories of her three marriages with humor and wisdom. Chloe complemented the discussion from a modern perspective, talking about conflicts and opportunities in contemporary dating culture.
-        Spark:
-            Their first interaction was full of sparks. After the meeting, Chloe gathered courage to ask Edith for writing advice and shared her views on how technology is changing love. Edith appreciated Chloe's enthusiasm and innovative thinking but also elegantly and humorously teased about the "fast-food nature" of modern dating, making Chloe laugh.
-            During that exchange, they discovered that despite their nearly 50-year age gap, they shared common curiosity and love for romance. They had tea together afterward, further sharing their experiences and building a good friendship.  
-    """
-
-    asyncio.run(create_podcast(podcast_theme2, book_summary_path2, ip_setting2, duration_minutes, output_path))
+import os
+import re
+import time
+from typing import List, Dict, Any
+from pathlib import Path
+import asyncio
+
+from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.output_parsers import StrOutputParser
+from dotenv import load_dotenv
+
+from chat_models import get_chat_model
+from summary_store import resolve_summary_path
+from streaming import stream_to_file, astream_to_file
+from core_topics import CoreTopics, IncrementalJSONParser, CORE_TOPICS_RESPONSE_FORMAT
+from transcript import Segment, SegmentTable, TranscriptParser, parse_transcript as parse_segments
+from duration_model import ScriptBudget, get_duration_model, calibrate_duration_model
+from tts_planner import TTSPlanner, TTSRequest, plan_tts_requests
+from podcast_audio import (TTSWorkerPool, AudioSegmentCache, assemble_podcast,
+                           TTS_MODEL, TTS_CONCURRENCY, PAUSE_MS, SPEAKER_CHANGE_PAUSE_MS)
+
+
+# 加载环境变量
+load_dotenv()
+
+# 定义模型
+DEEPSEEK_MODEL = "google/gemini-2.0-flash-001"
+GEMINI_MODEL = "google/gemini-2.0-flash-001"
+
+# LangChain 模型实例由共享注册表在首次使用时创建（OpenRouter 共用一个连接池）
+def get_deepseek_model():
+    return get_chat_model(DEEPSEEK_MODEL)
+
+def get_gemini_model():
+    return get_chat_model(GEMINI_MODEL)
+
+# 定义 ElevenLabs 声音
+VOICE_A = "Adam"  # 替换为您想要的声音ID
+VOICE_B = "Rachel"  # 替换为您想要的声音ID
+
+# 定义说话者名字
+# SPEAKER_1 = "Samuel"
+# SPEAKER_2 = "Alex"
+
+SPEAKER_1 = "Edith"
+SPEAKER_2 = "Chloe"
+
+# 按主播位置对应的声音，以及解析脚本时识别的名字（当前两位主播、其他人设中的名字和模板占位名 A/B）
+VOICES = (VOICE_A, VOICE_B)
+TRANSCRIPT_HOSTS = (
+    (SPEAKER_1, "Samuel", "Sam", "A"),
+    (SPEAKER_2, "Alex", "B"),
+)
+
+# 角色设定
+ip_setting1 = """
+    Character Information:
+        Character A:
+            Image: Wise Elder
+            Name: Samuel "Sam" Eldredge
+            Character Profile:
+            1. Keywords: Wisdom, Experience, Empathy, Humility, Humor, Slightly Rebellious "Old Soul"
+            2. Background: Sam is a 74-year-old elder, but definitely not the traditional, preachy type. He's a "cross-domain sage" who has succeeded in multiple fields. In his youth, he was a rock musician, later became a psychology professor, and at 50, started a new business focusing on happiness psychology and personal growth. His interests are diverse: yoga, meditation, stand-up comedy... he even started learning programming at 70. His wisdom comes from his rich, bold, and sometimes rebellious life experiences, not just from books. He likes to teach through vivid stories, speaking casually but hitting the mark, always giving that "enlightening" feeling.
+            - Tolerant and Authentic: Doesn't lecture audiences with clichés, preferring to communicate through humor and empathy, acknowledging his own failures and vulnerabilities.
+            - Firm yet Inclusive: Has his own convictions about eternal "truths" (like how to live happily, how to view self-worth) but also accepts new trends and is willing to keep learning.
+            - Playfully Rebellious: Deliberately "lightly mocks" modern personal development concepts, like "wake up at 5 AM to succeed" - he says having good tea and meditation at noon can lead to success too.
+            - Far from Perfect: Sam admits his flaws, like focusing too much on material success in his youth and neglecting family; but he later mended these relationships, making him feel "authentically lived."
+            4. Voice Characteristics: Warm baritone, magnetic, slow-paced but with firm power, as if every word flows from the depths of his soul with a touch of humor.
+            5. Behavioral Traits:
+            - Uses Poetry as Metaphors: When facing any life issues, he tends to use classical poetry or ancient texts as metaphors, which might amuse others, but he believes it makes the lessons more profound.
+            - Collects Perpetual Calendars: Sam enjoys hunting for different types of perpetual calendars at various flea markets, which has become his passionate hobby.
+            6. Flaws:
+            - Sometimes Too Preachy: Despite good intentions, he occasionally slips into "teaching mode," making it feel like a lecture, especially when he thinks a young person needs guidance.
+            - Stubborn Views: Sometimes he's stubborn about certain traditional views, refusing to accept new things, occasionally making Chloe laugh helplessly.
+            7. Likes:
+            - Nostalgic Black and White Films: Sam loves classic movies and regularly hosts small movie nights, inviting friends to watch together.
+            - Tea and Coffee Culture: Has unique rituals for brewing tea at home, like specific teaware for different types of tea, particularly enjoying this process.
+            8. Dislikes:
+            - Fast-paced Lifestyle: Disapproves of modern people's fast-paced life, believing it makes people lose the joy of living.
+
+        Character B:
+            Image: Young Professional
+            Name: Alex Morey
+            Character Profile:
+            1. Keywords: Passionate, Infectious Energy, Authentic, Diverse, Innovative, Occasionally Self-deprecating
+            2. Background: Alex is a 27-year-old cross-domain professional who grew up in Los Angeles in a mixed-race family, with an entrepreneur father and a community psychologist mother. She studied Cognitive Science at Stanford University but chose not to follow a traditional career path, instead becoming a content creator focusing on personal growth and creative thinking. Alex is passionate about breaking free from "planned" constraints, focusing on "experimental growth" - she sees her life as a series of experiments, embracing both failures and successes. She likes to interpret complex topics about personal development and success in young people's language. Alex has both youthful sharpness and mature self-reflection. Despite her young age, she has already written a bestseller (AI-assisted, unknown to listeners) and been a speaker at several TEDx events.
+            3. Personality Traits:
+            - Authentic and Direct: Alex doesn't pretend to "know it all." When discussing topics like "finding meaning," she admits she's still exploring but shares her unique "trial and error" experiences.
+            - Passionate and Infectious Activist: She constantly encourages listeners to take action, even the smallest step, believing "action itself defines direction."
+            - Fearlessly Deconstructs Traditional Wisdom: She boldly challenges outdated personal development theories like "hard work equals success" or "your weaknesses will ruin you," supporting her views with modern cases or neuroscience research.
+            - Light-hearted and Self-deprecating: She likes to add self-deprecating humor when sharing her experiences, like "I tried 8 morning routines, failed at 7, but the 8th somehow worked! Though I haven't fully stuck to it yet, hey, who can become perfect in a day?"
+            - Slightly Rebellious but Vulnerable: She dislikes being "defined," sometimes questioning traditional life paths; but occasionally shares her own growth struggles openly.
+            4. Voice Characteristics: Clear and pleasant young female voice, full of energy and approachability, slightly fast-paced but natural, sometimes raising pitch with excitement, engaging to listen to while capable of showing quiet and gentle sides.
+            5. Special Behaviors:
+            - Uses Colorful Post-its: Alex habitually writes positive reminders on post-its before new appointments or important events, sticking them on her computer or mirror for self-encouragement.
+            - Names Her Plants: She has many potted plants, each with its own name (e.g., her favorite cactus is called "Pinpin"), and shares her emotions and daily life with them.
+            6. Flaws:
+            - Over-reliance on Technology: Alex tends to rely on phones and apps to handle life's problems, sometimes neglecting face-to-face real interactions.
+            7. Likes:
+            - Tech Innovation and Future Trends: Alex loves technology, curious about various new apps and tools, often trying and sharing her user experiences.
+            - Fun Social Activities: She enjoys participating in various gatherings and social events, discovering new friends and interesting stories.
+            8. Dislikes:
+            - Fake Social Media Presentations: Dislikes those who display perfect lives on social media that aren't real, believing this behavior leads to unnecessary anxiety.
+
+    Their Podcast Interaction Dynamic:
+        Conversation Style: Sam and Alex's podcast interactions blend wisdom inheritance with youthful challenge. Sam often counters Alex's free-spirited views with his "old-school wisdom," while Alex challenges him with latest research or modern concepts.
+        - Humor and Warmth: They often joke with each other. For example, Alex might tease Sam's "old-school" ways: "I can't do daily handwritten journals like Sam, my journal goes straight to the cloud!" While Sam might playfully critique Alex's life optimization: "Alex, how about enjoying life occasionally instead of trying to hack it forever?"
+        - Mutual Appreciation: Despite their clashing viewpoints, they respect each other. Sam praises Alex's boldness and innovation, seeing infinite possibilities in the younger generation; while Alex admires Sam's life experience and gentle wisdom, finding comfort for her own growth.
+    
+    Their Meeting Story:
+        Setting: A Coffee Shop in the Great Southwest
+            After college graduation, Alex decided to take a Gap Year, searching for life direction through travel and conversations with strangers, seeking inspiration and answers about self-development. Meanwhile, Sam, retired for many years, was traveling internationally and writing his third book about "cross-generational wisdom transmission." They met in an unnamed town in the American Southwest, where a vintage, atmospheric coffee shop became their meeting point.
+        Specific Encounter:
+            Alex had just finished a long road trip, still uncertain about her future. She sat in the coffee shop with a laptop and notebook, doing her daily reflection and planning. At this time, Sam was in the corner, hand-writing his journal (old-school style, very eye-catching). As both appeared "immersed" in their writing activities, they caught each other's attention.
+            Curious Alex, trying to break the lonely silence, noticed Sam's handwriting and mistaking him for just an eccentric artistic traveler, made a joke: "Who still writes journals by hand these days! Is this for some social media documentary?"
+            Sam looked up and humorously replied:
+            "When you reach my age, you'll find that social media can't remember every day you've lived."
+            Alex was immediately struck by this response, sensing this elderly gentleman possessed wisdom beyond the ordinary, yet without a lecturing tone. She became interested in continuing the conversation with Sam, naturally leading to discussing her own search for life direction and meaning.
+
+    """
+
+ip_setting2 = """
+    Character Information:
+        Character A:
+            Image: "The Silver Siren"
+            Name: Edith 
+            Character Profile:
+            1. Character Keywords: Free-spirited, elegant, wise, humorous, outspoken, full of passion for life
+            2. Background:
+            - Career: Edith is a respected fashion magazine editor who has witnessed decades of fashion trends. After retirement, she became a bestselling memoir writer. Her books cover not only her colorful love life but also topics like fashion, social skills, and female independence. Her social media accounts are filled with fashion insights and relationship wisdom, attracting a massive following.
+            - Emotional Experience: Edith has been married three times, each experience giving her unique insights into relationships. She maintains an optimistic attitude towards love, believing that every relationship has value, whether successful or not. She often shares her past love stories with humor, helping listeners gain insights from her experiences.
+            3. Personality Traits:
+            - Wisdom and Humor: She effortlessly combines traditional wisdom with modern reality TV culture, such as using classical love quotes to comment on contemporary dating phenomena.
+            - Outspoken: Edith dares to express her views, often surprising people with her unconventional insights, including her confusion about young people's dating habits and her complaints about "digital love" possessiveness.
+            - Detail-oriented in Life: She shares life tips, such as how to boost confidence during dates and how to express personality through clothing.
+            4. Voice Characteristics: Edith's voice is slightly husky yet gentle, conveying the weight of life experience. Her tone is rich in variation and infectious, capable of conveying her passion and determination for life and love.
+            5. Distinctive Behaviors:
+            - Collecting "Old-school" Love Letters: Edith enjoys hunting for second-hand letters in antique markets or used bookstores, especially love letters, believing they are precious testimonies of past emotions.
+            - Never Leaving Home Without Makeup: Even just to go to the trash bin, Edith must make herself presentable, believing makeup is a form of respect for herself and others.
+            6. Flaws:
+            - Confused by Young People's Vocabulary: Although she understands modern culture well, she sometimes gets bewildered by young people's slang and humorously asks repeatedly about the meaning of each word.
+            - Loves to be Dramatic: Edith sometimes exaggerates daily occurrences, like shouting "My life is in peril!" when her tea spills.
+            7. Likes:
+            - Vintage Music and Dance: Edith loves music from the 50s to 70s and can't help dancing when she hears these songs, encouraging others to join in.
+            - Warm Nostalgic Stories: She loves warm romance stories and classic love movies, often recommending these works on the show.
+            8. Dislikes:
+            - Fast-food Culture of Internet Trends: Edith is dissatisfied with the superficial internet pop culture, believing such trends weaken genuine emotional connections.
+
+        Character B:
+            Image: "The Millennial Matchmaker" (28 years old)
+            Name: Chloe
+            Character Profile:
+            1. Character Keywords: Innovative, passionate, intuitive, energetic, curious, modern life explorer
+            2. Background:
+            - Career: Chloe is a dating app developer who has won multiple startup awards for innovative algorithms and user experience design. Besides entrepreneurship, she's also a well-known love podcast host, sharing modern dating culture and relationship tips while promoting her brand on social media.
+            - Emotional Experience: Despite being tech-savvy, Chloe has never dated, which she discusses with self-deprecating humor and willingness to explore modern love's loneliness and confusion. Her single status gives her keen insight into contemporary dating culture, especially complex relationships in the social media era.
+            3. Personality Traits:
+            - Tech-driven Optimist: Chloe believes technology can solve many problems, including love, so she's passionate about combining big data with psychology to analyze modern dating issues.
+            - Enthusiastic and Proactive: She's passionate about life, full of novel ideas, often encouraging listeners to try different dating methods and sharing trending dating patterns and social media pop culture.
+            - Self-deprecating and Relatable: Chloe isn't afraid to share her imperfections and vulnerabilities, making listeners empathize through light-hearted, humorous stories.
+            4. Voice Characteristics: Chloe's voice is sweet, fast-paced, and full of energy. She often uses encouraging tones to engage listeners in discussions, creating a relaxed and pleasant atmosphere.
+            5. Behavioral Characteristics:
+            - Often Uses Emojis to Record Moods: When updating social media, Chloe always uses abundant emojis to express her emotions, which might seem childish but is full of personality.
+            - Loves Photographing Daily Life: She takes photos during meals, scenery appreciation, or any small happy moments, creating a "My Daily Little Happiness" series.
+            6. Flaws:
+            - Tends to Overcomplicate Things: Chloe sometimes over-analyzes minor details, making simple decisions complex, like obsessing over what to wear on dates.
+            - Fear of Commitment: While she believes dating is good, she's afraid of long-term relationships and deep commitment, often hesitating.
+            7. Likes:
+            - Trendy Dating Activities: Chloe enjoys trying various novel, creative dating ideas like "escape rooms" or "art graffiti," believing these activities can enhance emotional connections.
+            - Sweets and Coffee: She's a sweet tooth and always has snacks in her bag, with plenty of desserts in her diet.
+            8. Dislikes:
+            - Cliché Dating Routines: She despises outdated dating methods (like movie-then-dinner), believing they make dates lose their freshness.
+
+    Their Podcast Interaction Dynamic:
+        Generational Dialogue: Edith and Chloe often interact around specific topics in the show, such as "Common Pitfalls in Modern Dating" or "How to Maintain Independence in Love." Edith draws from her rich life experience to reference traditional wisdom, while Chloe complements with modern tech trends and young people's perspectives, creating interesting discussions through their contrasting viewpoints.
+        Humorous Dialogue: Their conversations are light and humorous. Edith often uses her unique humor to joke about her age and life experience, saying things like: "When I was young, love didn't need an app to download." Chloe playfully retorts: "Well, I guess you used carrier pigeons then?" This humorous complement not only makes the show entertaining but also lets listeners feel the genuine and warm friendship between them.
+
+    Their Meeting Story:
+        First Encounter: City Literary Festival:
+            Edith and Chloe's meeting can be traced back to a city literary festival. Edith, as a bestselling memoir writer, was invited to participate in a roundtable discussion about "Love and Wisdom," while Chloe, an early-stage entrepreneur planning to start her love podcast, was seeking inspiration at the event.
+            During the discussion, Edith shared her unique insights about life and love, telling stories of her three marriages with humor and wisdom. Chloe complemented the discussion from a modern perspective, talking about conflicts and opportunities in contemporary dating culture.
+        Spark:
+            Their first interaction was full of sparks. After the meeting, Chloe gathered courage to ask Edith for writing advice and shared her views on how technology is changing love. Edith appreciated Chloe's enthusiasm and innovative thinking but also elegantly and humorously teased about the "fast-food nature" of modern dating, making Chloe laugh.
+            During that exchange, they discovered that despite their nearly 50-year age gap, they shared common curiosity and love for romance. They had tea together afterward, further sharing their experiences and building a good friendship.  
+    """
+
+
+def read_text_file(directory_path: str) -> str:
+    """读取目录下所有文本文件的内容并合并（经摘要库索引，未变化的文件不会重复读取）"""
+    # 确保路径存在
+    if not os.path.exists(directory_path):
+        raise FileNotFoundError(f"目录不存在: {directory_path}")
+    
+    store, category = resolve_summary_path(directory_path)
+    print(f"发现 {len(store.documents(category))} 个txt文件")
+    
+    # 按文件名排序，用换行符合并所有文本
+    final_text = store.combined_text(category)
+    print(f"合并后的文本总长度: {len(final_text)} 字符")
+    
+    return final_text
+
+# 核心话题的输出路径
+CORE_TOPICS_PATH = os.path.join("output", "core_topics", "core_topics.json")
+
+def generate_core_topics(podcast_theme: str, book_summary: str, duration_minutes: int) -> CoreTopics:
+    """使用DeepSeek生成核心话题
+
+    通过 JSON Schema 结构化输出（CORE_TOPICS_RESPONSE_FORMAT）约束结果，并用增量 JSON 解析器
+    接收流式输出。输出被截断或流中断时在本地补全已收到的部分，不再整篇重新生成。
+    流式调用与 invoke 共用 LLM 缓存，相同输入重复运行时直接复用上次完整的结果；中断的流不写入缓存。
+    """
+    prompt_template = """You are a professional podcast content strategist. Generate core topics for a two-person dialogue podcast based on the following inputs.
+
+    Podcast Theme:
+    {podcast_theme}
+
+    Book Summary:
+    {book_summary}
+
+    Expected Duration: {duration_minutes} minutes
+
+    Instructions:
+    1. If duration is under 5 minutes, generate 3 topics. Otherwise, generate 5 topics.
+    2. Topics should follow a logical progression from basics to practical applications to broader perspectives.
+    3. Ensure topics are interconnected and flow naturally.
+    4. Each topic must include a title and detailed explanation.
+    5. Split the expected duration across the topics; the durations must add up to {duration_minutes} minutes.
+
+    Output format: Required JSON Structure:
+    - Root object must contain "core_topics" array and a one-sentence "summary" of the episode
+    - Each topic in core_topics must have:
+      * core_topic (main topic title)
+      * explanation (detailed description)
+      * transition (how the conversation moves on to the next topic)
+      * logical_structure (how this topic unfolds in the podcast)
+      * duration_minutes (minutes allotted to this topic, a number)
+
+    Response must be valid JSON only, no additional text.
+    Focus on creating engaging, discussion-worthy topics that match the theme and book content."""
+    
+    prompt = ChatPromptTemplate.from_template(prompt_template)
+    model = get_deepseek_model().bind(response_format=CORE_TOPICS_RESPONSE_FORMAT)
+    chain = prompt | model | StrOutputParser()
+    
+    parser = IncrementalJSONParser()
+    try:
+        for token in chain.stream({
+            "book_summary": book_summary,
+            "podcast_theme": podcast_theme,
+            "duration_minutes": duration_minutes
+        }):
+            parser.feed(token)
+    except Exception as e:
+        # 已经收到部分 JSON 时就地补全，否则无可修复，照常抛出
+        if parser.text.strip() == "":
+            raise
+        print(f"核心话题生成中断（{e}），使用已收到的部分")
+    
+    if not parser.complete:
+        print("核心话题输出不完整，已在本地补全截断的 JSON")
+    topics = CoreTopics.from_dict(parser.parse(), duration_minutes)
+    
+    # 打印解析结果，用于调试
+    print("API返回结果：")
+    print(topics.to_json())
+    
+    # 确保输出目录存在并保存
+    os.makedirs(os.path.dirname(CORE_TOPICS_PATH), exist_ok=True)
+    topics.save(CORE_TOPICS_PATH)
+    
+    return topics
+
+TRANSCRIPT_PROMPT = """
+    You are a professional podcast script writer. Based on the following book summary, core topics, character profiles, and conversation duration, please create a natural, engaging, and informative two-person dialogue podcast script.
+    Requirements: Ensure the dialogue reflects each character's personality traits, and the conversation focuses on the book's content.
+
+    Book Summary:
+    {book_summary}
+
+    Core Topics:
+    {core_topics}
+
+    Character Profiles:
+    {ip_setting}
+
+    Conversation Duration: {duration_minutes} minutes
+
+    A's name: {SPEAKER_1}
+    B's name: {SPEAKER_2}
+
+    Please create the dialogue script in the following format (in actual dialogue, A and B should be replaced with their respective names):
+    ****** opening ******
+    A : (opening remarks)
+    B : (response)
+    ...
+
+    ****** content ******
+    A : (discussing first topic)
+    B : (responding and deepening discussion)
+    A : (raising questions or new perspectives)
+    B : (responding)
+    ...
+
+    ****** content ******
+    (continuing to next topic)
+    ...
+
+    ****** closing ******
+    A : (summarizing discussion)
+    B : (closing remarks)
+
+    Requirements:
+    1. The dialogue should flow naturally, like real people conversing
+    2. Include opening remarks, multiple content sections, and closing remarks
+    3. Ensure coverage of all core topics
+    4. Avoid lengthy monologues, maintain interactivity
+    5. Total dialogue length and depth should be appropriate for a {duration_minutes} minute podcast
+    6. Use simple txt format without any markdown formatting or additional text
+    7. Start directly with the dialogue, without any introduction or explanation    
+    """
+
+def build_transcript_chain():
+    """构建生成播客对话脚本所用的链"""
+    prompt = ChatPromptTemplate.from_template(TRANSCRIPT_PROMPT)
+    return prompt | get_gemini_model() | StrOutputParser()
+
+def transcript_inputs(book_summary: str, core_topics: CoreTopics, ip_setting: str) -> Dict[str, Any]:
+    """生成对话脚本的提示词参数"""
+    return {
+        "book_summary": book_summary,
+        "core_topics": core_topics.to_json(),
+        "ip_setting": ip_setting,
+        "duration_minutes": calculate_duration_from_topics(core_topics),
+        "SPEAKER_1": SPEAKER_1,
+        "SPEAKER_2": SPEAKER_2
+    }
+
+# 对话脚本的输出路径
+TRANSCRIPT_PATH = os.path.join(".", "output", "transcript", "demo1_1.txt")
+
+def save_transcript(transcript: str) -> str:
+    """保存对话脚本，返回文件路径"""
+    # 确保输出目录存在
+    output_file = TRANSCRIPT_PATH
+    os.makedirs(os.path.dirname(output_file), exist_ok=True)
+    
+    # 保存对话脚本
+    with open(output_file, "w", encoding="utf-8") as f:
+        f.write(transcript)
+    
+    print(f"对话脚本已保存至: {output_file}")
+    return output_file
+
+def generate_podcast_transcript(book_summary: str, core_topics: CoreTopics, ip_setting: str, stream: bool = True) -> str:
+    """使用Gemini生成播客对话脚本
+
+    stream 为 True 时逐 token 写入脚本文件并回显到终端（中断时保留 .partial），
+    并报告首个 token 延迟与生成速度。生成过程中按时长模型检查预计时长：超出预算时
+    提前结束并补上固定结尾，结束时明显偏短则续写补足，不必整篇重新生成。
+    """
+    chain = build_transcript_chain()
+    inputs = transcript_inputs(book_summary, core_topics, ip_setting)
+
+    if stream:
+        budget = transcript_budget(core_topics)
+        parser = TranscriptParser(TRANSCRIPT_HOSTS)
+        transcript, _ = stream_to_file(chain, inputs, TRANSCRIPT_PATH,
+                                       stop=lambda token: over_budget(parser, budget, token))
+        return fit_transcript_to_budget(transcript, parser, budget, inputs)
+
+    # 生成对话脚本
+    transcript = chain.invoke(inputs)
+    
+    save_transcript(transcript)
+    
+    return transcript
+
+SECTION_PROMPT = """
+    You are a professional podcast script writer. Based on the following book summary, core topics and character profiles, please write ONE content section of a two-person dialogue podcast: the section for the current topic only.
+    Requirements: Ensure the dialogue reflects each character's personality traits, and the conversation focuses on the book's content.
+
+    Book Summary:
+    {book_summary}
+
+    Core Topics of the whole episode:
+    {core_topics}
+
+    Current Topic ({position}):
+    {core_topic}
+
+    Explanation:
+    {explanation}
+
+    Logical Structure:
+    {logical_structure}
+
+    How the previous section handed over to this topic:
+    {previous_transition}
+
+    How this section should hand over to what comes next:
+    {transition}
+
+    Character Profiles:
+    {ip_setting}
+
+    Section length: approximately {word_count} words
+
+    A's name: {SPEAKER_1}
+    B's name: {SPEAKER_2}
+
+    Please create the dialogue script in the following format (in actual dialogue, A and B should be replaced with their respective names):
+    ****** content ******
+    A : (introducing the current topic)
+    B : (responding and deepening discussion)
+    ...
+    A : (transition to what comes next)
+
+    Requirements:
+    1. Only cover the current topic; the opening and closing of the podcast are written separately, so don't greet or say goodbye to the audience
+    2. Pick up naturally from the previous hand-over and end with the hand-over to what comes next
+    3. The dialogue should flow naturally, like real people conversing
+    4. Avoid lengthy monologues, maintain interactivity
+    5. Use simple txt format without any markdown formatting or additional text
+    6. Start directly with the dialogue, without any introduction or explanation
+    """
+
+# 分段生成时固定的开场与结尾
+OPENING_TEMPLATE = """****** opening ******
+{SPEAKER_1} : Hello everyone, and welcome to our podcast. I'm {SPEAKER_1}.
+{SPEAKER_2} : And I'm {SPEAKER_2}. {summary}
+"""
+
+CLOSING_TEMPLATE = """****** closing ******
+{SPEAKER_1} : That's all for today's episode. Thank you so much for listening.
+{SPEAKER_2} : Dear audience, see you next time! We are waiting you at readai!
+"""
+
+def build_section_chain():
+    """构建分段生成单个话题段落所用的链"""
+    prompt = ChatPromptTemplate.from_template(SECTION_PROMPT)
+    return prompt | get_gemini_model() | StrOutputParser()
+
+def section_inputs(book_summary: str, core_topics: CoreTopics, index: int, ip_setting: str) -> Dict[str, Any]:
+    """第 index 个话题段落的提示词参数；未分配时长的话题平分总时长"""
+    topics = core_topics.core_topics
+    topic = topics[index]
+    minutes = topic.duration_minutes or core_topics.total_minutes() / len(topics)
+    previous = topics[index - 1].transition if index > 0 else "This is the first topic, right after the opening."
+    following = topic.transition if index < len(topics) - 1 else "This is the last topic; lead into the closing of the podcast."
+    return {
+        "book_summary": book_summary,
+        "core_topics": core_topics.to_json(),
+        "position": f"topic {index + 1} of {len(topics)}",
+        "core_topic": topic.core_topic,
+        "explanation": topic.explanation,
+        "logical_structure": topic.logical_structure,
+        "previous_transition": previous,
+        "transition": following,
+        "ip_setting": ip_setting,
+        "word_count": get_duration_model().words_for_minutes(minutes),
+        "SPEAKER_1": SPEAKER_1,
+        "SPEAKER_2": SPEAKER_2
+    }
+
+async def agenerate_segmented_transcript(book_summary: str, core_topics: CoreTopics, ip_setting: str) -> str:
+    """分段模式：每个核心话题单独生成一段对话，并发调用后按顺序与固定的开场、结尾拼接
+
+    各段之间由话题的 transition 衔接，总耗时接近最慢的一段，节目长度也不再受单次输出上限限制。
+    """
+    if not core_topics.core_topics:
+        raise ValueError("没有可分段生成的核心话题")
+    chain = build_section_chain()
+    start = time.perf_counter()
+
+    async def generate_section(index: int):
+        section = await chain.ainvoke(section_inputs(book_summary, core_topics, index, ip_setting))
+        elapsed = time.perf_counter() - start
+        print(f"话题 {index + 1}/{len(core_topics.core_topics)} 已生成，用时 {elapsed:.1f} 秒")
+        return section.strip(), elapsed
+
+    results = await asyncio.gather(*(generate_section(i) for i in range(len(core_topics.core_topics))))
+    names = {"SPEAKER_1": SPEAKER_1, "SPEAKER_2": SPEAKER_2}
+    parts = [OPENING_TEMPLATE.format(summary=core_topics.summary, **names).strip()]
+    parts.extend(section for section, _ in results)
+    parts.append(CLOSING_TEMPLATE.format(**names).strip())
+
+    total = time.perf_counter() - start
+    slowest = max(elapsed for _, elapsed in results)
+    print(f"分段生成完成：{len(results)} 段，总耗时 {total:.1f} 秒（最慢一段 {slowest:.1f} 秒）")
+    transcript = "\n\n".join(parts) + "\n"
+    save_transcript(transcript)
+    return transcript
+
+def calculate_duration_from_topics(core_topics: CoreTopics) -> int:
+    """从核心话题估算总时长：各话题分配的时长之和，缺失时使用请求的时长（默认20分钟）"""
+    return core_topics.total_minutes(default=20)
+
+def parse_transcript(transcript: str) -> SegmentTable:
+    """解析生成的脚本为段落表（两位主播的名字由 TRANSCRIPT_HOSTS 指定）"""
+    return parse_segments(transcript, TRANSCRIPT_HOSTS)
+
+EXTEND_PROMPT = """
+    You are a professional podcast script writer. The two-person dialogue podcast script below is shorter than planned. Continue the conversation so the episode reaches its planned length.
+
+    Book Summary:
+    {book_summary}
+
+    Core Topics:
+    {core_topics}
+
+    Character Profiles:
+    {ip_setting}
+
+    Script so far:
+    {transcript}
+
+    A's name: {SPEAKER_1}
+    B's name: {SPEAKER_2}
+
+    Requirements:
+    1. Continue with approximately {word_count} more words of dialogue, going deeper into the core topics that were covered only briefly
+    2. Do not repeat lines that are already in the script, and do not restart the podcast
+    3. Keep the same format (A : ..., B : ..., with the real names) and the characters' personalities
+    4. Finish with a closing section that starts with the line "****** closing ******"
+    5. Start directly with the next line of dialogue, without any introduction or explanation
+    """
+
+# 脚本中结尾分节的位置
+CLOSING_MARKER = re.compile(r'^[ \t]*\*{3,}[ \t]*closing', re.IGNORECASE | re.MULTILINE)
+
+def is_closing(segment: Segment) -> bool:
+    """段落是否属于结尾分节"""
+    return segment.section.strip().lower().startswith("closing")
+
+def transcript_budget(core_topics: CoreTopics) -> ScriptBudget:
+    """按核心话题的总时长建立预算，并为超出时补上的固定结尾预留时长"""
+    closing = parse_transcript(CLOSING_TEMPLATE.format(SPEAKER_1=SPEAKER_1, SPEAKER_2=SPEAKER_2))
+    return ScriptBudget(calculate_duration_from_topics(core_topics) * 60, reserve_seconds=closing.total_duration)
+
+def over_budget(parser: TranscriptParser, budget: ScriptBudget, token: str) -> bool:
+    """解析新到的文本，返回预计时长是否已超出预算（作为流式生成的 stop 回调）"""
+    parser.feed(token)
+    return budget.exceeded(parser.table, parser.pending_words)
+
+def end_transcript(transcript: str, parser: TranscriptParser) -> str:
+    """在最后一个完整行处截断脚本并补上固定结尾，结尾台词同时进入解析器
+
+    模型已经开始写自己的结尾分节时从该分节处截断（解析器中的结尾段落一并丢弃），不会出现两段结尾。
+    """
+    parser.drop_partial_line()
+    body = transcript[:transcript.rfind("\n") + 1]
+    closing_marker = CLOSING_MARKER.search(body)
+    if closing_marker:
+        body = body[:closing_marker.start()]
+        parser.truncate(next((segment.index for segment in parser.table if is_closing(segment)), len(parser.table)))
+    body = body.rstrip()
+    closing = CLOSING_TEMPLATE.format(SPEAKER_1=SPEAKER_1, SPEAKER_2=SPEAKER_2)
+    parser.feed("\n\n" + closing)
+    return body + "\n\n" + closing
+
+def fit_transcript_to_budget(transcript: str, parser: TranscriptParser, budget: ScriptBudget,
+                             inputs: Dict[str, Any]) -> str:
+    """流式生成结束后按预算调整脚本：超出时截断并补结尾，偏短时续写一次"""
+    target = budget.target_seconds
+    if budget.exceeded(parser.table, parser.pending_words):
+        print(f"脚本预计时长已超出目标 {target:.0f} 秒，提前结束并补上结尾")
+        transcript = end_transcript(transcript, parser)
+    else:
+        parser.close()
+        missing = budget.shortfall_words(parser.table)
+        if missing:
+            print(f"脚本预计 {budget.estimate(parser.table):.0f} 秒，短于目标 {target:.0f} 秒，续写约 {missing} 词")
+            closing = CLOSING_MARKER.search(transcript)
+            body = (transcript[:closing.start()] if closing else transcript).rstrip()
+            parser = TranscriptParser(TRANSCRIPT_HOSTS)
+            parser.feed(body + "\n")
+            chain = ChatPromptTemplate.from_template(EXTEND_PROMPT) | get_gemini_model() | StrOutputParser()
+            extension, _ = stream_to_file(chain, {**inputs, "transcript": body, "word_count": missing},
+                                          TRANSCRIPT_PATH + ".extension",
+                                          stop=lambda token: over_budget(parser, budget, token))
+            if budget.exceeded(parser.table, parser.pending_words):
+                # 续写被提前结束：与解析器一样丢弃最后的半行
+                extension = extension[:extension.rfind("\n") + 1]
+            transcript = body + "\n\n" + extension.strip() + "\n"
+            if budget.exceeded(parser.table, parser.pending_words) or not CLOSING_MARKER.search(extension):
+                transcript = end_transcript(transcript, parser)
+            os.remove(TRANSCRIPT_PATH + ".extension")
+        else:
+            return transcript
+    parser.close()
+    print(f"调整后预计时长 {budget.estimate(parser.table):.0f} 秒（目标 {target:.0f} 秒）")
+    save_transcript(transcript)
+    return transcript
+
+async def generate_audio_request(request: TTSRequest, tts_pool: TTSWorkerPool,
+                                 audio_cache: AudioSegmentCache) -> str:
+    """为一次合并后的 TTS 请求生成音频，返回以内容哈希命名的缓存文件路径"""
+    # 声音（按主播位置）与语音参数（按情感）已由 TTSPlanner 确定；
+    # 相同文本与语音参数直接复用缓存，否则在 TTS 工作池中合成
+    path = await audio_cache.synthesize(
+        tts_pool,
+        text=request.text,
+        voice=request.voice,
+        model=TTS_MODEL,
+        stability=request.stability,
+        similarity_boost=request.similarity_boost
+    )
+    
+    return str(path)
+
+async def generate_full_podcast(segments: SegmentTable, output_path: str,
+                                tts_pool: TTSWorkerPool = None, concurrency: int = TTS_CONCURRENCY,
+                                audio_cache: AudioSegmentCache = None, pause_ms: float = PAUSE_MS,
+                                speaker_change_pause_ms: float = SPEAKER_CHANGE_PAUSE_MS):
+    """生成完整的播客音频，按原顺序流式拼接
+
+    相邻的同一说话者段落与短插话先合并为尽量少的 TTS 请求（过长的段落按句末拆开），
+    各请求在有界工作池中并行合成。
+    """
+    output_dir = Path(output_path).parent
+    output_dir.mkdir(exist_ok=True, parents=True)
+    
+    audio_cache = audio_cache or AudioSegmentCache()
+    
+    planner = plan_tts_requests(segments, VOICES)
+    print(f"{len(segments)} 个对话段落合并为 {len(planner.requests)} 次 TTS 请求")
+    
+    # 并行生成所有音频片段，gather 的结果顺序与 planner.requests 一致
+    own_pool = tts_pool is None
+    tts_pool = tts_pool or TTSWorkerPool(concurrency=concurrency)
+    try:
+        audio_files = await asyncio.gather(*(
+            generate_audio_request(request, tts_pool, audio_cache) for request in planner.requests
+        ))
+    finally:
+        if own_pool:
+            tts_pool.close()
+    print(f"语音片段缓存命中 {audio_cache.hits} 个，新合成 {audio_cache.misses} 个")
+    
+    # 逐段流式写入最终文件（片段保留在缓存中供下次复用），用各请求的实测时长校准时长模型
+    timestamps = assemble_podcast(audio_files, planner.speaker_names(), output_path, pause_ms, speaker_change_pause_ms)
+    calibrate_duration_model(planner.request_samples(timestamps))
+    
+    return output_path
+
+async def stream_podcast_audio(book_summary: str, core_topics: CoreTopics, ip_setting: str, output_path: str,
+                               tts_pool: TTSWorkerPool = None, audio_cache: AudioSegmentCache = None,
+                               concurrency: int = TTS_CONCURRENCY) -> Dict[str, Any]:
+    """流水线模式：流式生成脚本，每段台词一结束就开始合成语音，最后按顺序拼接
+
+    段落经 TTSPlanner 合并为 TTS 请求，一个请求在下一位说话者开口（或达到字符上限）时确定并开始合成。
+    预计时长超出预算时提前结束生成并补上固定结尾（已开始合成的音频无法再插入续写，
+    因此这里只截断、不续写）。模型自己的结尾分节在生成结束前暂不合成，超出预算时会被固定结尾替换。
+    """
+    chain = build_transcript_chain()
+    parser = TranscriptParser(TRANSCRIPT_HOSTS)
+    budget = transcript_budget(core_topics)
+    audio_cache = audio_cache or AudioSegmentCache()
+    own_pool = tts_pool is None
+    tts_pool = tts_pool or TTSWorkerPool(concurrency=concurrency)
+
+    start = time.perf_counter()
+    first_audio_at = None
+    segments = parser.table
+    planner = TTSPlanner(segments, VOICES)
+    tasks: List[asyncio.Task] = []
+    held: List[Segment] = []
+
+    async def synthesize(request: TTSRequest) -> str:
+        nonlocal first_audio_at
+        path = await generate_audio_request(request, tts_pool, audio_cache)
+        if first_audio_at is None:
+            first_audio_at = time.perf_counter() - start
+            print(f"首段音频已就绪，用时 {first_audio_at:.1f} 秒")
+        return path
+
+    def schedule(completed: List[Segment], hold: bool = True):
+        for segment in completed:
+            if hold and (held or is_closing(segment)):
+                held.append(segment)
+                continue
+            for request in planner.add(segment):
+                tasks.append(asyncio.create_task(synthesize(request)))
+
+    try:
+        # 脚本逐 token 写入文件，每段台词解析完成即开始合成
+        transcript, stream_stats = await astream_to_file(
+            chain, transcript_inputs(book_summary, core_topics, ip_setting), TRANSCRIPT_PATH,
+            on_token=lambda token: schedule(parser.feed(token)),
+            stop=lambda token: budget.exceeded(segments, parser.pending_words))
+        if budget.exceeded(segments, parser.pending_words):
+            print(f"脚本预计时长已超出目标 {budget.target_seconds:.0f} 秒，提前结束并补上结尾")
+            # 暂缓的结尾段落不合成，由固定结尾替换
+            completed = len(segments) - len(held)
+            held.clear()
+            transcript = end_transcript(transcript, parser)
+            save_transcript(transcript)
+            schedule([segments[i] for i in range(completed, len(segments))], hold=False)
+        schedule(held + parser.close(), hold=False)
+        tasks.extend(asyncio.create_task(synthesize(request)) for request in planner.close())
+        transcript_done_at = time.perf_counter() - start
+        print(f"脚本生成完成，用时 {transcript_done_at:.1f} 秒，解析出 {len(segments)} 个对话段落，"
+              f"合并为 {len(planner.requests)} 次 TTS 请求")
+
+        audio_files = await asyncio.gather(*tasks)
+    finally:
+        for task in tasks:
+            task.cancel()
+        if own_pool:
+            tts_pool.close()
+
+    timestamps = assemble_podcast(audio_files, planner.speaker_names(), output_path)
+    calibrate_duration_model(planner.request_samples(timestamps))
+    total = time.perf_counter() - start
+    print(f"播客已生成并保存至: {output_path}（首段音频 {first_audio_at or 0:.1f} 秒，总耗时 {total:.1f} 秒）")
+
+    return {
+        "transcript": transcript,
+        "audio_path": output_path,
+        "time_to_first_token": stream_stats.time_to_first_token,
+        "time_to_first_audio": first_audio_at,
+        "total_seconds": total,
+    }
+
+async def create_podcast(podcast_theme: str, book_summary_path: str, ip_setting: str, duration_minutes: int,
+                         output_path: str, pipelined: bool = True, segmented: bool = False):
+    """创建完整的播客流程
+
+    pipelined 为 True 时脚本边生成边合成语音（首段音频不必等整篇脚本完成），
+    否则按顺序先生成完整脚本再解析、合成。segmented 为 True 时按核心话题并发分段生成脚本
+    （适合长节目），再解析、合成。
+    """
+    # 1. 读取书籍摘要
+    book_summary = read_text_file(book_summary_path)
+    
+    # 2. 生成核心话题
+    print("生成核心话题...")
+    core_topics = generate_core_topics(podcast_theme, book_summary, duration_minutes)
+    print(f"核心话题已生成: {len(core_topics.core_topics)} 个，共 {core_topics.total_minutes()} 分钟\n")
+    
+    if pipelined and not segmented:
+        # 3-5. 流式生成脚本并同时合成音频
+        print("流式生成播客脚本与音频...")
+        result = await stream_podcast_audio(book_summary, core_topics, ip_setting, output_path)
+        return {
+            "core_topics": core_topics.to_dict(),
+            "transcript": result["transcript"],
+            "audio_path": result["audio_path"]
+        }
+    
+    # 3. 生成播客脚本
+    print("生成播客脚本...")
+    if segmented:
+        transcript = await agenerate_segmented_transcript(book_summary, core_topics, ip_setting)
+    else:
+        transcript = generate_podcast_transcript(book_summary, core_topics, ip_setting)
+    print(f"播客脚本已生成:\n{transcript[:500]}...\n")
+    
+    # 4. 解析脚本
+    segments = parse_transcript(transcript)
+    print(f"解析出 {len(segments)} 个对话段落")
+    
+    # 5. 生成音频
+    print("生成播客音频...")
+    final_path = await generate_full_podcast(segments, output_path)
+    print(f"播客已生成并保存至: {final_path}")
+    
+    return {
+        "core_topics": core_topics.to_dict(),
+        "transcript": transcript,
+        "audio_path": final_path
+    }
+
+if __name__ == "__main__":
+    # 示例用法
+    book_summary_path1 = "./data/summary/self_improvement/"
+    book_summary_path2 = "./data/summary/relationship_and_family/"
+
+    duration_minutes = 3
+
+    output_path = "./output/podcast.mp3"
+    podcast_theme1 = "How Social Media Ruined My Life (self-doubt): The negative impacts of social media on mental health and self-esteem, Body image issues"
+    podcast_theme2 = "Escaping Friend Zone: the complexities of transitioning from friendship to a romantic relationship"
+
+    asyncio.run(create_podcast(podcast_theme2, book_summary_path2, ip_setting2, duration_minutes, output_path))
@@ -2,21 +2,23 @@ from autogen_agentchat.agents import AssistantAgent
 from autogen_agentchat.messages import TextMessage
 from autogen_agentchat.ui import Console
 from autogen_core import CancellationToken
-from autogen_ext.models.openai import OpenAIChatCompletionClient
 from autogen_core.models import ModelFamily
 from autogen_agentchat.base import TaskResult
-from autogen_agentchat.conditions import ExternalTermination, TextMentionTermination, MaxMessageTermination
+from autogen_agentchat.conditions import ExternalTermination, TextMentionTermination, MaxMessageTermination, TokenUsageTermination
 from autogen_agentchat.teams import RoundRobinGroupChat
-from autogen_core.memory import ListMemory, MemoryContent, MemoryMimeType
 
 import asyncio
-import os
+from typing import List
 from dotenv import load_dotenv
 
+from chat_models import get_autogen_client
+from retrieval_memory import RetrievalMemory, build_summary_index
+from conversation_context import ConversationSummarizer, RollingSummaryContext, KEEP_MESSAGES
+from speculative_team import SpeculativeTeamRunner
+from duration_model import get_duration_model
+
 # 加载环境变量
 load_dotenv()
-# 设置 OpenRouter API
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
 # 定义模型
 DEEPSEEK_MODEL = "deepseek/deepseek-r1:free"
 GEMINI_MODEL = "google/gemini-2.0-flash-001"
@@ -200,103 +202,125 @@ You are Alex Morey, a podcast co-host. Important rules:
      4. End with: "Dear audience, see you next time! We are waiting you at readai!"
 """
 
-# Initialize user memory with better structure
-user_memory = ListMemory()
-
-# 修改文件读取和存储方式
-def process_book_content(file_path):
-    """处理书籍内容，添加更清晰的格式"""
-    with open(file_path, 'r', encoding='utf-8') as file:
-        filename = os.path.basename(file_path)
-        book_name = filename.replace('.txt', '').replace('_', ' ').title()
-        content = file.read()
-        # 添加清晰的书籍标记
-        formatted_content = f"""
-Book: {book_name}
-Content:
-{content}
----END OF BOOK---
-"""
-        return formatted_content
-
-# 添加从指定路径读取所有txt文件内容的代码
-txt_directories = [
-    "./data/summary/self_improvement",
-    # "./data/summary/relationship_and_family"
+# 默认讨论的摘要分类与节目参数
+SUMMARY_CATEGORIES = [
+    "self_improvement",
+    # "relationship_and_family"
 ]
-
-for directory in txt_directories:
-    for filename in os.listdir(directory):
-        if filename.endswith(".txt"):
-            file_path = os.path.join(directory, filename)
-            formatted_content = process_book_content(file_path)
-            
-            user_memory.add(MemoryContent(
-                content=formatted_content,
-                mime_type=MemoryMimeType.TEXT
-            ))
-
-# Create an OpenAI model client.
-model_client = OpenAIChatCompletionClient(
-    model=GEMINI_MODEL,
-    api_key=OPENROUTER_API_KEY,
-    base_url="https://openrouter.ai/api/v1",
-    model_info={
-        "vision": False,
-        "function_calling": False,
-        "json_output": False,
-        "family": ModelFamily.GEMINI_2_0_FLASH,
-    },
-)
-
-duration_minutes = 3
-target_words = duration_minutes * 120
-
-
-# 修改提示词中的参数
-samuel_prompt = SAMUEL_PROMPT.format(
-    duration=duration_minutes,
-    target_words=target_words,
-    words_per_minute=120
-)
-alex_prompt = ALEX_PROMPT.format(
-    duration=duration_minutes,
-    target_words=target_words,
-    words_per_minute=120
-)
-
-# 修改 agent 创建部分，使用基础的 AssistantAgent
-Samuel_agent = AssistantAgent(
-    name="Samuel",
-    model_client=model_client,
-    system_message=samuel_prompt+ip_setting1+Core_topic,
-    memory=[user_memory],
-)
-
-Alex_agent = AssistantAgent(
-    name="Alex",
-    model_client=model_client,
-    system_message=alex_prompt+ip_setting1+Core_topic,
-    memory=[user_memory],
-)
-
-# Define a termination condition that stops the task if the critic approves.
-text_termination = TextMentionTermination("We are waiting you at readai")
-max_message_termination = MaxMessageTermination(max_messages=30)
-
-# Create a team with the primary and critic agents.
-team = RoundRobinGroupChat([Samuel_agent, Alex_agent], termination_condition=text_termination,max_turns=None)
+DURATION_MINUTES = 3
+PODCAST_THEME = "How Social Media Ruined My Life (self-doubt)"
+
+# 防止对话失控的预算：每分钟大约的发言条数（留出两倍余量）与整期的 token 上限
+MESSAGES_PER_MINUTE = 8
+MAX_TOTAL_TOKENS = 300000
+
+# 模型能力说明（OpenRouter 上的 Gemini）
+MODEL_INFO = {
+    "vision": False,
+    "function_calling": False,
+    "json_output": False,
+    "family": ModelFamily.GEMINI_2_0_FLASH,
+}
+
+
+def build_agents(duration_minutes: int = DURATION_MINUTES, summary_categories=None,
+                 ip_setting: str = ip_setting1, core_topic: str = Core_topic, bounded_context: bool = False,
+                 keep_messages: int = KEEP_MESSAGES, stream: bool = False) -> List[AssistantAgent]:
+    """创建两位主播 Samuel 与 Alex
+
+    导入本模块时不做任何 I/O；摘要索引、模型客户端和 agent 都在这里按需创建。
+    书籍摘要只建立一次检索索引（持久化，文件未变化时直接加载），每轮只把与最新发言相关的段落注入提示词。
+    bounded_context 为 True 时每个 agent 只发送最近 keep_messages 条消息和更早对话的滚动摘要。
+    stream 为 True 时 agent 流式调用模型（预取运行器需要读取生成中的前缀）。
+    """
+    summary_index = build_summary_index(summary_categories or SUMMARY_CATEGORIES)
+    user_memory = RetrievalMemory(summary_index, top_k=4)
+
+    # Create an OpenAI model client (shared, pooled connection to OpenRouter).
+    model_client = get_autogen_client(GEMINI_MODEL, model_info=MODEL_INFO)
+
+    # 语速来自（可由成品音频校准的）时长模型，而不是固定的每分钟词数
+    duration_model = get_duration_model()
+    words_per_minute = round(duration_model.words_per_minute)
+    target_words = duration_model.words_for_minutes(duration_minutes)
+
+    # 修改提示词中的参数
+    samuel_prompt = SAMUEL_PROMPT.format(
+        duration=duration_minutes,
+        target_words=target_words,
+        words_per_minute=words_per_minute
+    )
+    alex_prompt = ALEX_PROMPT.format(
+        duration=duration_minutes,
+        target_words=target_words,
+        words_per_minute=words_per_minute
+    )
+
+    # 修改 agent 创建部分，使用基础的 AssistantAgent
+    # 两个 agent 看到的是同一段对话，共用一个摘要生成者，同一段历史只摘要一次
+    summarizer = ConversationSummarizer(model_client)
+
+    def model_context():
+        # 每个 agent 各自维护上下文窗口；不限定时使用 AssistantAgent 默认的完整历史
+        return RollingSummaryContext(keep_messages=keep_messages, summarizer=summarizer) if bounded_context else None
+
+    Samuel_agent = AssistantAgent(
+        name="Samuel",
+        model_client=model_client,
+        system_message=samuel_prompt+ip_setting+core_topic,
+        memory=[user_memory],
+        model_context=model_context(),
+        model_client_stream=stream,
+    )
+
+    Alex_agent = AssistantAgent(
+        name="Alex",
+        model_client=model_client,
+        system_message=alex_prompt+ip_setting+core_topic,
+        memory=[user_memory],
+        model_context=model_context(),
+        model_client_stream=stream,
+    )
+    return [Samuel_agent, Alex_agent]
+
+def build_termination(duration_minutes: int = DURATION_MINUTES, max_messages: int = None,
+                      max_total_tokens: int = MAX_TOTAL_TOKENS):
+    """结束条件：说出结束语，或发言条数（默认按时长估算）、token 用量超出预算"""
+    # Define a termination condition that stops the task if the critic approves.
+    text_termination = TextMentionTermination("We are waiting you at readai")
+    # 预算兜底：发言条数或 token 用量超出时结束
+    budget_termination = (MaxMessageTermination(max_messages or duration_minutes * MESSAGES_PER_MINUTE * 2)
+                          | TokenUsageTermination(max_total_token=max_total_tokens))
+    return text_termination | budget_termination
+
+def build_team(duration_minutes: int = DURATION_MINUTES, summary_categories=None,
+               ip_setting: str = ip_setting1, core_topic: str = Core_topic, bounded_context: bool = False,
+               keep_messages: int = KEEP_MESSAGES, max_messages: int = None,
+               max_total_tokens: int = MAX_TOTAL_TOKENS) -> RoundRobinGroupChat:
+    """构建两位主播的对话团队（参数见 build_agents 与 build_termination）"""
+    agents = build_agents(duration_minutes, summary_categories, ip_setting, core_topic, bounded_context, keep_messages)
+
+    # Create a team with the primary and critic agents.
+    return RoundRobinGroupChat(agents, termination_condition=build_termination(duration_minutes, max_messages,
+                                                                               max_total_tokens),
+                               max_turns=None)
 
 # 使用 asyncio.run() 来执行异步任务
-async def main():
-    # 让用户指定播客时长（分钟）
-    
+async def main(duration_minutes: int = DURATION_MINUTES, podcast_theme: str = PODCAST_THEME, summary_categories=None,
+               bounded_context: bool = False, speculative: bool = False):
     initial_task = f"""
-Start a {duration_minutes}-minute podcast about 'How Social Media Ruined My Life (self-doubt)'. 
+Start a {duration_minutes}-minute podcast about '{podcast_theme}'. 
 
 Please select appropriate core topics that can be thoroughly discussed within {duration_minutes} minutes. You don't need to cover all topics - choose the most relevant ones that fit the time constraint.
 """
 
+    if speculative:
+        # 当前主播说到接近结尾时预取下一位的回复，结束时报告节省的延迟
+        agents = build_agents(duration_minutes, summary_categories, bounded_context=bounded_context, stream=True)
+        runner = SpeculativeTeamRunner(agents, build_termination(duration_minutes))
+        return await runner.run(initial_task)
+
+    team = build_team(duration_minutes, summary_categories, bounded_context=bounded_context)
     await Console(team.run_stream(task=initial_task))
 
 if __name__ == "__main__":
@@ -0,0 +1,235 @@
+import wave
+import asyncio
+import subprocess
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from disk_cache import DiskCache
+from rate_limit import RequestScheduler
+
+# ElevenLabs 默认模型与并发设置
+TTS_MODEL = "eleven_multilingual_v2"
+TTS_CONCURRENCY = 4
+TTS_MAX_RETRIES = 5
+TTS_BASE_DELAY = 1.0
+TTS_MAX_DELAY = 60.0
+TTS_REQUESTS_PER_MINUTE = 300
+# 语音片段缓存目录
+AUDIO_CACHE_DIR = ".cache/tts"
+# 成品音频的 PCM 参数与说话间隔（毫秒）
+OUTPUT_FRAME_RATE = 44100
+OUTPUT_CHANNELS = 1
+OUTPUT_SAMPLE_WIDTH = 2
+PAUSE_MS = 150
+SPEAKER_CHANGE_PAUSE_MS = 400
+
+# TTS 后端签名：(text, voice, model, stability, similarity_boost) -> mp3 bytes
+TTSBackend = Callable[[str, str, str, float, float], bytes]
+
+
+def elevenlabs_tts(text: str, voice: str, model: str, stability: float, similarity_boost: float) -> bytes:
+    """调用 ElevenLabs 合成语音（阻塞调用），返回 mp3 字节"""
+    from elevenlabs import generate
+
+    audio = generate(
+        text=text,
+        voice=voice,
+        model=model,
+        stability=stability,
+        similarity_boost=similarity_boost
+    )
+    # 流式返回时是字节迭代器
+    return audio if isinstance(audio, bytes) else b"".join(audio)
+
+
+def voice_settings_for(emotion: Optional[str]) -> Tuple[float, float]:
+    """根据情感调整语音参数，返回 (stability, similarity_boost)"""
+    stability = 0.5
+    similarity_boost = 0.5
+
+    emotion = (emotion or "").lower()
+    if emotion in ["兴奋", "激动", "热情"]:
+        stability = 0.3
+    elif emotion in ["平静", "思考", "严肃"]:
+        stability = 0.7
+    return stability, similarity_boost
+
+
+class TTSWorkerPool:
+    """有界的 TTS 工作池
+
+    阻塞的 TTS 调用在固定大小的线程池中执行，经本池自己的调度器限速与重试：
+    最多 concurrency 个请求同时在途，遇到限流时池内所有请求一起按 Retry-After 或退避时间暂停，
+    并自动收窄并发，之后随成功请求逐步恢复。调度器按本池的 concurrency 创建，
+    不与其他池共用，因此每个池的大小都会生效。
+    """
+
+    def __init__(self, tts: TTSBackend = elevenlabs_tts, concurrency: int = TTS_CONCURRENCY,
+                 max_retries: int = TTS_MAX_RETRIES, base_delay: float = TTS_BASE_DELAY):
+        self.tts = tts
+        self.concurrency = max(1, concurrency)
+        self.scheduler = RequestScheduler("elevenlabs", requests_per_minute=TTS_REQUESTS_PER_MINUTE,
+                                          concurrency=self.concurrency, max_concurrency=self.concurrency,
+                                          max_retries=max_retries, base_delay=base_delay, max_delay=TTS_MAX_DELAY)
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="tts")
+
+    async def synthesize(self, text: str, voice: str, model: str = TTS_MODEL,
+                         stability: float = 0.5, similarity_boost: float = 0.5) -> bytes:
+        """合成一段语音，失败时由调度器重试"""
+        loop = asyncio.get_running_loop()
+        return await self.scheduler.run(lambda: loop.run_in_executor(
+            self._executor, self.tts, text, voice, model, stability, similarity_boost))
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+class AudioSegmentCache:
+    """以内容哈希命名的语音片段缓存，跨剧集复用
+
+    键为 hash(text, voice, model, stability, similarity_boost)，修改脚本后重新渲染时
+    只有改动过的台词需要重新合成；可按总大小淘汰最久未使用的片段。
+    """
+
+    def __init__(self, cache_dir: str = AUDIO_CACHE_DIR, max_bytes: Optional[int] = None, suffix: str = ".mp3"):
+        self._store = DiskCache(cache_dir, max_bytes=max_bytes, suffix=suffix)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text: str, voice: str, model: str, stability: float, similarity_boost: float) -> str:
+        return DiskCache.make_key(text, voice, model, stability, similarity_boost)
+
+    def lookup(self, key: str) -> Optional[Path]:
+        """命中时返回片段文件路径"""
+        if not self._store.contains(key):
+            return None
+        self._store.get(key)  # 刷新最近使用时间
+        return self._store.path_for(key)
+
+    async def synthesize(self, tts_pool: TTSWorkerPool, text: str, voice: str, model: str = TTS_MODEL,
+                         stability: float = 0.5, similarity_boost: float = 0.5) -> Path:
+        """返回片段文件路径，未命中时经工作池合成并写入缓存；同一内容并发请求只合成一次"""
+        key = self.key(text, voice, model, stability, similarity_boost)
+        path = self.lookup(key)
+        if path is not None:
+            self.hits += 1
+            return path
+        if key in self._in_flight:
+            return await asyncio.shield(self._in_flight[key])
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            audio = await tts_pool.synthesize(text, voice, model, stability, similarity_boost)
+            path = self._store.put(key, audio)
+            future.set_result(path)
+            return path
+        except Exception as e:
+            future.set_exception(e)
+            # 没有其他等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+
+class StreamingAudioWriter:
+    """把音频片段依次写入输出文件，内存占用与节目总时长无关
+
+    所有片段统一转换为相同的 PCM 参数后直接写出：.wav 使用 wave 模块，
+    其他格式（如 .mp3）通过管道交给 ffmpeg 边读边编码。
+    """
+
+    def __init__(self, output_path: str, frame_rate: int = OUTPUT_FRAME_RATE, channels: int = OUTPUT_CHANNELS,
+                 sample_width: int = OUTPUT_SAMPLE_WIDTH, bitrate: str = "128k"):
+        self.output_path = str(output_path)
+        self.frame_rate = frame_rate
+        self.channels = channels
+        self.sample_width = sample_width
+        self.duration_ms = 0.0
+        self._frames_written = 0
+        self._wave = None
+        self._process = None
+
+        Path(self.output_path).parent.mkdir(parents=True, exist_ok=True)
+        if self.output_path.lower().endswith(".wav"):
+            self._wave = wave.open(self.output_path, "wb")
+            self._wave.setnchannels(channels)
+            self._wave.setsampwidth(sample_width)
+            self._wave.setframerate(frame_rate)
+        else:
+            from pydub.utils import get_encoder_name
+
+            self._process = subprocess.Popen(
+                [get_encoder_name(), "-y", "-loglevel", "error",
+                 "-f", f"s{8 * sample_width}le", "-ar", str(frame_rate), "-ac", str(channels), "-i", "pipe:0",
+                 "-b:a", bitrate, self.output_path],
+                stdin=subprocess.PIPE,
+            )
+
+    def _write_pcm(self, data: bytes):
+        if self._wave is not None:
+            self._wave.writeframesraw(data)
+        else:
+            self._process.stdin.write(data)
+        self._frames_written += len(data) // (self.sample_width * self.channels)
+        self.duration_ms = self._frames_written * 1000.0 / self.frame_rate
+
+    def write_segment(self, segment) -> float:
+        """写入一个 pydub AudioSegment，返回其时长（毫秒）"""
+        segment = segment.set_frame_rate(self.frame_rate).set_channels(self.channels).set_sample_width(self.sample_width)
+        self._write_pcm(segment.raw_data)
+        return len(segment)
+
+    def write_file(self, path: str) -> float:
+        """解码并写入一个音频文件，只在内存中保留这一段"""
+        from pydub import AudioSegment
+
+        return self.write_segment(AudioSegment.from_file(path))
+
+    def write_silence(self, duration_ms: float, block_ms: int = 1000):
+        """写入静音，按块写出避免一次分配过大"""
+        remaining = duration_ms
+        while remaining > 0:
+            step = min(block_ms, remaining)
+            frames = int(step * self.frame_rate / 1000.0)
+            self._write_pcm(b"\0" * (frames * self.channels * self.sample_width))
+            remaining -= step
+
+    def close(self):
+        if self._wave is not None:
+            self._wave.close()
+            self._wave = None
+        if self._process is not None:
+            self._process.stdin.close()
+            if self._process.wait() != 0:
+                raise RuntimeError(f"ffmpeg 编码失败: {self.output_path}")
+            self._process = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def assemble_podcast(audio_files: List[str], speakers: List[str], output_path: str,
+                     pause_ms: float = PAUSE_MS, speaker_change_pause_ms: float = SPEAKER_CHANGE_PAUSE_MS
+                     ) -> List[Tuple[float, float]]:
+    """按顺序流式拼接所有片段，片段之间插入停顿（换人时停顿更长）
+
+    返回每个片段在成品中的 (开始, 结束) 毫秒时间戳。
+    """
+    timestamps: List[Tuple[float, float]] = []
+    with StreamingAudioWriter(output_path) as writer:
+        for i, (path, speaker) in enumerate(zip(audio_files, speakers)):
+            if i > 0:
+                writer.write_silence(speaker_change_pause_ms if speaker != speakers[i - 1] else pause_ms)
+            start = writer.duration_ms
+            writer.write_file(path)
+            timestamps.append((start, writer.duration_ms))
+    return timestamps
@@ -0,0 +1,386 @@
+import os
+import re
+import time
+import random
+import asyncio
+import threading
+import contextvars
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import AsyncIterator, Awaitable, Callable, Deque, Dict, Iterator, Optional, TypeVar
+
+import httpx
+import openai
+
+T = TypeVar("T")
+
+# 每个模型（或服务）的默认限速与并发设置，可用环境变量覆盖
+DEFAULT_REQUESTS_PER_MINUTE = float(os.getenv("LLM_RATE_LIMIT_RPM", "120"))
+DEFAULT_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "8"))
+DEFAULT_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+DEFAULT_MAX_RETRIES = 5
+BASE_DELAY = 1.0
+MAX_DELAY = 60.0
+# Retry-After 的上限，避免服务端给出过长等待时整个流程卡住
+MAX_RETRY_AFTER = 300.0
+# 并发调节：统计最近多少次请求，错误率超过多少时收窄
+GOVERNOR_WINDOW = 20
+GOVERNOR_ERROR_RATE = 0.2
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+# 没有状态码时只重试这些暂时性的连接与超时错误（APITimeoutError 是 APIConnectionError 的子类）
+TRANSIENT_ERRORS = (openai.APIConnectionError, httpx.TransportError, ConnectionError, TimeoutError,
+                    asyncio.TimeoutError)
+# 没有状态码时按消息识别限流，只用于这些 SDK 抛出的异常
+RATE_LIMIT_SDK_MODULES = ("openai", "elevenlabs", "httpx", "httpcore")
+_RATE_LIMIT_MESSAGE = re.compile(r'(?:status|code|error|http)\W{0,3}(?:code\W{0,3})?429\b|rate[ _-]?limit|too many requests',
+                                 re.IGNORECASE)
+
+# 嵌套调用（如 _generate 内部走 _stream）时只占用一次配额
+_scheduled = contextvars.ContextVar("scheduled", default=False)
+
+
+def backoff_delay(attempt: int, base_delay: float = BASE_DELAY, max_delay: float = MAX_DELAY) -> float:
+    """指数退避加随机抖动（equal jitter），attempt 从 0 开始"""
+    delay = min(max_delay, base_delay * (2 ** attempt))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def error_status(error: Exception) -> Optional[int]:
+    """取异常对应的 HTTP 状态码（openai / httpx / elevenlabs 风格的异常）"""
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_rate_limited(error: Exception) -> bool:
+    """判断异常是否为限流（HTTP 429）
+
+    优先看状态码；没有状态码时看异常类型名（如 RateLimitError），
+    最后才对已知 SDK 的异常按消息判断，避免把消息中碰巧出现的 "429"（token 数、id 等）当作限流。
+    """
+    status = error_status(error)
+    if status is not None:
+        return status == 429
+    if "ratelimit" in type(error).__name__.lower():
+        return True
+    module = type(error).__module__.split(".")[0]
+    return module in RATE_LIMIT_SDK_MODULES and bool(_RATE_LIMIT_MESSAGE.search(str(error)))
+
+
+def is_retryable(error: Exception) -> bool:
+    """限流、服务端错误和没有状态码的网络错误可以重试，其余 4xx 以及普通异常（参数错误、解析错误、
+    代码缺陷等）直接失败"""
+    status = error_status(error)
+    if status is None:
+        return isinstance(error, TRANSIENT_ERRORS) or is_rate_limited(error)
+    return status in RETRYABLE_STATUSES or is_rate_limited(error)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """读取异常响应头中的 Retry-After（秒数或 HTTP 日期），没有时返回 None"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or getattr(error, "headers", None)
+    if not headers:
+        return None
+    try:
+        value = headers.get("retry-after-ms")
+        if value is not None:
+            return min(MAX_RETRY_AFTER, max(0.0, float(value) / 1000))
+        value = headers.get("retry-after")
+        if value is None:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        return min(MAX_RETRY_AFTER, max(0.0, seconds))
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class TokenBucket:
+    """线程安全的令牌桶，按预约方式发放令牌，同步和异步调用共用
+
+    reserve 预约下一个令牌并返回需要等待的秒数，调用方自行 sleep，
+    因此不依赖具体的事件循环。
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+
+class ConcurrencyGovernor:
+    """按观测到的错误率自适应调节在途请求数（AIMD）
+
+    连续 limit 次成功后上限加一；遇到限流立即减半；最近 GOVERNOR_WINDOW 次请求的
+    错误率超过 GOVERNOR_ERROR_RATE 时也减半。同步线程和不同事件循环中的协程可以共用。
+    """
+
+    def __init__(self, initial: int, minimum: int = 1, maximum: Optional[int] = None):
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum or initial)
+        self.limit = min(self.maximum, max(self.minimum, initial))
+        self.in_flight = 0
+        self._successes = 0
+        self._outcomes: Deque[bool] = deque(maxlen=GOVERNOR_WINDOW)
+        self._lock = threading.Lock()
+        self._waiters: list = []
+
+    def _try_acquire(self, waiter=None) -> bool:
+        with self._lock:
+            if self.in_flight < self.limit:
+                self.in_flight += 1
+                return True
+            if waiter is not None:
+                self._waiters.append(waiter)
+            return False
+
+    async def acquire(self):
+        while True:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            if self._try_acquire((loop, future)):
+                return
+            await future
+
+    def acquire_sync(self):
+        while True:
+            event = threading.Event()
+            if self._try_acquire((None, event)):
+                return
+            event.wait()
+
+    def release(self, ok: bool, rate_limited: bool = False):
+        with self._lock:
+            self.in_flight -= 1
+            self._outcomes.append(ok)
+            if rate_limited:
+                self._narrow()
+            elif not ok and len(self._outcomes) >= GOVERNOR_WINDOW // 2 and \
+                    self._outcomes.count(False) / len(self._outcomes) > GOVERNOR_ERROR_RATE:
+                self._narrow()
+            elif ok:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.maximum:
+                    self.limit += 1
+                    self._successes = 0
+            # 唤醒全部等待者重新竞争，被取消的等待者不会占用名额
+            waiters, self._waiters = self._waiters, []
+        for loop, waiter in waiters:
+            if loop is None:
+                waiter.set()
+            else:
+                try:
+                    loop.call_soon_threadsafe(_wake, waiter)
+                except RuntimeError:
+                    pass  # 事件循环已关闭
+
+    def _narrow(self):
+        self.limit = max(self.minimum, self.limit // 2)
+        self._successes = 0
+        self._outcomes.clear()
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+class RequestScheduler:
+    """单个模型（或服务）的客户端调度器：令牌桶限速 + 自适应并发 + 带抖动的指数退避重试
+
+    可重试的错误（限流、5xx、网络错误）按 Retry-After 或指数退避等待后重试；
+    限流时同一调度器下的所有请求一起暂停到等待结束，避免继续触发 429。
+    """
+
+    def __init__(self, name: str, requests_per_minute: float = DEFAULT_REQUESTS_PER_MINUTE,
+                 concurrency: int = DEFAULT_CONCURRENCY, max_concurrency: Optional[int] = None,
+                 max_retries: int = DEFAULT_MAX_RETRIES, base_delay: float = BASE_DELAY, max_delay: float = MAX_DELAY):
+        self.name = name
+        self.max_retries = max(1, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.bucket = TokenBucket(requests_per_minute / 60, capacity=concurrency)
+        self.governor = ConcurrencyGovernor(concurrency, maximum=max_concurrency or max(concurrency, DEFAULT_MAX_CONCURRENCY))
+        self._paused_until = 0.0
+        self.retries = 0
+
+    def _wait_time(self) -> float:
+        """进入请求前需要等待的秒数：限流暂停与令牌桶取较大者"""
+        return max(self._paused_until - time.monotonic(), self.bucket.reserve())
+
+    def _on_failure(self, error: Exception, attempt: int) -> Optional[float]:
+        """记录失败并返回重试前的等待秒数；不可重试或已用尽次数时返回 None"""
+        rate_limited = is_rate_limited(error)
+        self.governor.release(ok=False, rate_limited=rate_limited)
+        if attempt == self.max_retries - 1 or not is_retryable(error):
+            return None
+        delay = retry_after(error)
+        if delay is None:
+            delay = backoff_delay(attempt, self.base_delay, self.max_delay)
+        if rate_limited:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            print(f"[{self.name}] 被限流，{delay:.1f} 秒后重试（并发上限 {self.governor.limit}）")
+        else:
+            print(f"[{self.name}] 请求失败（尝试 {attempt + 1}/{self.max_retries}），{delay:.1f} 秒后重试: {str(error)}")
+        self.retries += 1
+        return delay
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        """调度一次异步调用，call 每次重试都会重新调用"""
+        if _scheduled.get():
+            return await call()
+        token = _scheduled.set(True)
+        try:
+            for attempt in range(self.max_retries):
+                await self.governor.acquire()
+                try:
+                    # 等待也在受保护的区域内：此时被取消同样会归还并发名额
+                    wait = self._wait_time()
+                    if wait > 0:
+                        await asyncio.sleep(wait)
+                    result = await call()
+                except Exception as e:
+                    delay = self._on_failure(e, attempt)
+                    if delay is None:
+                        raise
+                    await asyncio.sleep(delay)
+                    continue
+                except BaseException:
+                    self.governor.release(ok=True)
+                    raise
+                self.governor.release(ok=True)
+                return result
+        finally:
+            _scheduled.reset(token)
+
+    def run_sync(self, call: Callable[[], T]) -> T:
+        """run 的同步版本，供阻塞调用（如 chain.invoke、线程池中的 TTS）使用"""
+        if _scheduled.get():
+            return call()
+        token = _scheduled.set(True)
+        try:
+            for attempt in range(self.max_retries):
+                self.governor.acquire_sync()
+                try:
+                    wait = self._wait_time()
+                    if wait > 0:
+                        time.sleep(wait)
+                    result = call()
+                except Exception as e:
+                    delay = self._on_failure(e, attempt)
+                    if delay is None:
+                        raise
+                    time.sleep(delay)
+                    continue
+                except BaseException:
+                    self.governor.release(ok=True)
+                    raise
+                self.governor.release(ok=True)
+                return result
+        finally:
+            _scheduled.reset(token)
+
+    async def stream(self, open_stream: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """调度一次流式调用：拿到第一个分块之前失败可以重试，之后的错误直接抛出
+
+        整个流式输出期间占用一个并发名额。
+        """
+        # 生成器在调用方的上下文中运行，这里只检查嵌套标记，不设置
+        if _scheduled.get():
+            async for item in open_stream():
+                yield item
+            return
+        for attempt in range(self.max_retries):
+            await self.governor.acquire()
+            try:
+                wait = self._wait_time()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                iterator = open_stream().__aiter__()
+                first = await iterator.__anext__()
+            except StopAsyncIteration:
+                self.governor.release(ok=True)
+                return
+            except Exception as e:
+                delay = self._on_failure(e, attempt)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self.governor.release(ok=True)
+                raise
+            try:
+                yield first
+                async for item in iterator:
+                    yield item
+            except Exception:
+                self.governor.release(ok=False)
+                raise
+            except BaseException:
+                # 调用方提前关闭或任务被取消，不计为错误
+                self.governor.release(ok=True)
+                raise
+            self.governor.release(ok=True)
+            return
+
+    def stream_sync(self, open_stream: Callable[[], Iterator[T]]) -> Iterator[T]:
+        """stream 的同步版本"""
+        if _scheduled.get():
+            yield from open_stream()
+            return
+        for attempt in range(self.max_retries):
+            self.governor.acquire_sync()
+            try:
+                wait = self._wait_time()
+                if wait > 0:
+                    time.sleep(wait)
+                iterator = iter(open_stream())
+                first = next(iterator)
+            except StopIteration:
+                self.governor.release(ok=True)
+                return
+            except Exception as e:
+                delay = self._on_failure(e, attempt)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self.governor.release(ok=True)
+                raise
+            try:
+                yield first
+                yield from iterator
+            except Exception:
+                self.governor.release(ok=False)
+                raise
+            except BaseException:
+                self.governor.release(ok=True)
+                raise
+            self.governor.release(ok=True)
+            return
+
+
+_schedulers: Dict[str, RequestScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def get_scheduler(name: str, **settings) -> RequestScheduler:
+    """按名称（通常是模型名）取共享的调度器；settings 只在首次创建时生效"""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(name)
+        if scheduler is None:
+            scheduler = _schedulers[name] = RequestScheduler(name, **settings)
+        return scheduler
@@ -0,0 +1,201 @@
+import os
+import re
+import json
+import math
+from pathlib import Path
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from autogen_core import CancellationToken
+from autogen_core.memory import Memory, MemoryContent, MemoryMimeType, MemoryQueryResult, UpdateContextResult
+from autogen_core.model_context import ChatCompletionContext
+from autogen_core.models import SystemMessage
+
+from summary_store import SummaryStore, get_summary_store
+
+# 索引文件位置与每轮注入的段落数
+INDEX_PATH = ".cache/retrieval/summary_bm25.json"
+TOP_K = 4
+# 检索注入的系统消息的开头，用于在下一轮替换掉上一轮注入的段落
+RETRIEVAL_HEADER = "\nRelevant book passages:\n"
+
+_WORD_PATTERN = re.compile(r'[a-z0-9]+(?:\'[a-z]+)?|[一-鿿]+')
+_STOPWORDS = set("""
+a an and are as at be but by for from has have he her his i in is it its me my of on or our she so that the
+their them they this to was we were what when which who will with you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """英文按词（去停用词），中文按单字和相邻双字切分"""
+    tokens: List[str] = []
+    for word in _WORD_PATTERN.findall(text.lower()):
+        if word[0] >= '一':
+            tokens.extend(word)
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        elif word not in _STOPWORDS:
+            tokens.append(word)
+    return tokens
+
+
+class BM25Index:
+    """本地 BM25 检索索引，可持久化为 JSON"""
+
+    def __init__(self, passages: Optional[List[Dict[str, str]]] = None, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.passages: List[Dict[str, str]] = []
+        self._term_freqs: List[Dict[str, int]] = []
+        self._doc_freqs: Counter = Counter()
+        self._total_length = 0
+        for passage in passages or []:
+            self.add(passage)
+
+    def add(self, passage: Dict[str, str]):
+        """添加一个段落（包含 text 和 source 字段）"""
+        term_freqs = Counter(tokenize(passage["text"]))
+        self.passages.append(passage)
+        self._term_freqs.append(dict(term_freqs))
+        self._doc_freqs.update(term_freqs.keys())
+        self._total_length += sum(term_freqs.values())
+
+    def search(self, query: str, k: int = TOP_K) -> List[Tuple[float, Dict[str, str]]]:
+        """返回得分最高的 k 个段落 (得分, 段落)"""
+        terms = set(tokenize(query))
+        if not terms or not self.passages:
+            return []
+        n = len(self.passages)
+        avg_length = self._total_length / n
+        scores = []
+        for i, term_freqs in enumerate(self._term_freqs):
+            length = sum(term_freqs.values())
+            score = 0.0
+            for term in terms:
+                tf = term_freqs.get(term)
+                if not tf:
+                    continue
+                df = self._doc_freqs[term]
+                idf = math.log(1 + (n - df + 0.5) / (df + 0.5))
+                score += idf * tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_length))
+            if score > 0:
+                scores.append((score, i))
+        scores.sort(reverse=True)
+        return [(score, self.passages[i]) for score, i in scores[:k]]
+
+    def save(self, index_path: str, signature: Any = None):
+        """保存段落与词频，signature 用于判断索引是否过期"""
+        Path(index_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "signature": signature,
+                "k1": self.k1,
+                "b": self.b,
+                "passages": self.passages,
+                "term_freqs": self._term_freqs,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, index_path)
+
+    @classmethod
+    def load(cls, index_path: str, signature: Any = None) -> Optional["BM25Index"]:
+        """加载索引，文件不存在或 signature 不一致时返回 None"""
+        try:
+            with open(index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+        if signature is not None and data.get("signature") != signature:
+            return None
+        index = cls(k1=data["k1"], b=data["b"])
+        index.passages = data["passages"]
+        index._term_freqs = data["term_freqs"]
+        for term_freqs in index._term_freqs:
+            index._doc_freqs.update(term_freqs.keys())
+            index._total_length += sum(term_freqs.values())
+        return index
+
+
+def build_summary_index(categories: List[str], store: Optional[SummaryStore] = None,
+                        index_path: str = INDEX_PATH) -> BM25Index:
+    """为摘要库中指定分类的段落建立（或加载已持久化的）BM25 索引
+
+    段落由摘要库切分并缓存，只有相关摘要的内容哈希变化时才重新建索引。
+    """
+    store = store or get_summary_store()
+    signature = store.signature(categories)
+    index = BM25Index.load(index_path, signature)
+    if index is not None:
+        print(f"已加载摘要索引: {len(index.passages)} 个段落")
+        return index
+
+    index = BM25Index(list(store.chunks(categories)))
+    index.save(index_path, signature)
+    print(f"已为 {len(signature)} 本书建立摘要索引: {len(index.passages)} 个段落")
+    return index
+
+
+class RetrievalMemory(Memory):
+    """检索式记忆：每轮只注入与最新发言最相关的 top_k 个书籍段落
+
+    替代把全部摘要放进 ListMemory 的做法，每轮提示词大小不再随书籍数量增长。
+    """
+
+    def __init__(self, index: BM25Index, top_k: int = TOP_K, name: Optional[str] = None):
+        self._index = index
+        self._top_k = top_k
+        self._name = name or "summary_retrieval_memory"
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    def _to_contents(self, query: str) -> List[MemoryContent]:
+        return [
+            MemoryContent(
+                content=f"Book: {passage['source']}\n{passage['text']}",
+                mime_type=MemoryMimeType.TEXT,
+                metadata={"source": passage["source"], "score": round(score, 3)},
+            )
+            for score, passage in self._index.search(query, self._top_k)
+        ]
+
+    async def update_context(self, model_context: ChatCompletionContext) -> UpdateContextResult:
+        """以最近一条文本消息为查询，把检索到的段落作为系统消息加入上下文
+
+        上一轮注入的段落先从上下文中移除，上下文里始终最多只有一条检索消息，不随轮数累积。
+        """
+        await self._remove_retrieval_messages(model_context)
+        messages = await model_context.get_messages()
+        query = next((m.content for m in reversed(messages) if isinstance(getattr(m, "content", None), str)), "")
+        contents = self._to_contents(query)
+        if contents:
+            memory_strings = [f"{i}. {content.content}" for i, content in enumerate(contents, 1)]
+            memory_context = RETRIEVAL_HEADER + "\n".join(memory_strings) + "\n"
+            await model_context.add_message(SystemMessage(content=memory_context))
+        return UpdateContextResult(memories=MemoryQueryResult(results=contents))
+
+    @staticmethod
+    async def _remove_retrieval_messages(model_context: ChatCompletionContext):
+        """从上下文保存的完整消息（而不只是 get_messages 返回的窗口）中删除此前注入的检索消息"""
+        state = await model_context.save_state()
+        messages = state.get("messages", [])
+        kept = [m for m in messages
+                if not (m.get("type") == "SystemMessage" and str(m.get("content", "")).startswith(RETRIEVAL_HEADER))]
+        if len(kept) != len(messages):
+            await model_context.load_state({**state, "messages": kept})
+
+    async def query(self, query: str | MemoryContent = "", cancellation_token: CancellationToken | None = None,
+                    **kwargs: Any) -> MemoryQueryResult:
+        text = query.content if isinstance(query, MemoryContent) else query
+        return MemoryQueryResult(results=self._to_contents(str(text)))
+
+    async def add(self, content: MemoryContent, cancellation_token: CancellationToken | None = None) -> None:
+        """把新内容作为一个段落加入（仅内存中的索引）"""
+        source = (content.metadata or {}).get("source", "memory")
+        self._index.add({"source": source, "text": str(content.content)})
+
+    async def clear(self) -> None:
+        self._index = BM25Index()
+
+    async def close(self) -> None:
+        pass
@@ -0,0 +1,219 @@
+import re
+import time
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence
+
+from autogen_agentchat.agents import AssistantAgent
+from autogen_agentchat.base import Response, TerminationCondition
+from autogen_agentchat.messages import BaseChatMessage, ModelClientStreamingChunkEvent, TextMessage
+from autogen_core import CancellationToken
+
+# 当前回复达到预计长度的这个比例、且停在句末时，开始预取下一位的回复
+PREFETCH_RATIO = 0.8
+# 没有历史长度可参考时，至少收到这么多词才开始预取
+PREFETCH_MIN_WORDS = 30
+
+_SENTENCE_END = re.compile(r'[.!?。！？]["\')\]]*\s*$')
+
+
+def _word_count(text: str) -> int:
+    return len(text.split())
+
+
+@dataclass
+class SpeculationStats:
+    """一期节目的预取统计：采用/丢弃次数与节省的端到端延迟"""
+    turns: int = 0
+    accepted: int = 0
+    discarded: int = 0
+    saved_seconds: float = 0.0
+    total_seconds: float = 0.0
+    saved_per_turn: List[float] = field(default_factory=list)
+
+    def __str__(self) -> str:
+        return (f"{self.turns} 轮，预取采用 {self.accepted} 次、丢弃 {self.discarded} 次，"
+                f"节省 {self.saved_seconds:.1f} 秒（总耗时 {self.total_seconds:.1f} 秒）")
+
+
+class _Turn:
+    """一个 agent 的一次回复：在后台流式生成，随时可读取已生成的文本
+
+    指定 prefix 时是基于对方尚未说完的前缀的预取；生成前保存 agent 状态，
+    丢弃时取消请求并恢复状态，agent 的上下文不会留下任何痕迹。
+    """
+
+    def __init__(self, agent: AssistantAgent, messages: List[BaseChatMessage], prefix: Optional[str] = None):
+        self.agent = agent
+        self.prefix = prefix
+        self.text = ""
+        self.response: Optional[Response] = None
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self._messages = messages
+        self._changed = asyncio.Event()
+        self._token = CancellationToken()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> "_Turn":
+        if self.prefix is not None:
+            self._snapshot = await self.agent.save_state()
+        self._task = asyncio.create_task(self._run())
+        return self
+
+    async def _run(self):
+        try:
+            async for event in self.agent.on_messages_stream(self._messages, self._token):
+                if isinstance(event, ModelClientStreamingChunkEvent):
+                    self.text += event.content
+                elif isinstance(event, Response):
+                    self.response = event
+                    if isinstance(event.chat_message, TextMessage):
+                        self.text = event.chat_message.content
+                self._changed.set()
+        finally:
+            self.finished = time.perf_counter()
+            self._changed.set()
+
+    @property
+    def done(self) -> bool:
+        return self._task is not None and self._task.done()
+
+    async def partials(self):
+        """依次产出不断增长的文本，直到回复结束"""
+        while True:
+            self._changed.clear()
+            if self.done:
+                self._task.result()  # 传播生成时的异常
+                return
+            yield self.text
+            await self._changed.wait()
+
+    async def result(self) -> Response:
+        await self._task
+        return self.response
+
+    async def discard(self):
+        """取消预取并把 agent 恢复到预取之前的状态"""
+        self._token.cancel()
+        self._task.cancel()
+        try:
+            await self._task
+        except BaseException:
+            pass
+        await self.agent.load_state(self._snapshot)
+
+    async def commit(self, final_text: str):
+        """采用预取：把上下文中对方的前缀替换为完整的最终文本"""
+        state = await self.agent.save_state()
+        for message in reversed(state["llm_context"]["messages"]):
+            if message.get("type") == "UserMessage" and message.get("content") == self.prefix:
+                message["content"] = final_text
+                break
+        await self.agent.load_state(state)
+
+
+class SpeculativeTeamRunner:
+    """两位主播轮流发言的对话运行器，在当前发言流式生成时预取下一位的回复
+
+    RoundRobinGroupChat 中下一位必须等当前回复完整结束才开始请求，每轮延迟是两次完整生成之和。
+    这里当前回复达到预计长度（该主播以往回复的平均词数 × prefetch_ratio）并停在句末时，
+    就用已收到的前缀启动下一位的请求。当前回复结束后，只有最终文本与前缀完全相同（仅首尾空白
+    不同）时才采用预取结果——预取的回复没有看到前缀之后的内容，多出哪怕几个词也可能答非所问；
+    否则丢弃预取、恢复状态，用完整文本重新请求。每轮最多发起一次预取，不在后续句末重复发起，
+    因此每轮最多多花一次请求。
+    agent 需以 model_client_stream=True 创建，否则无法在生成过程中读取前缀。
+    """
+
+    def __init__(self, agents: Sequence[AssistantAgent], termination_condition: TerminationCondition,
+                 prefetch_ratio: float = PREFETCH_RATIO, prefetch_min_words: int = PREFETCH_MIN_WORDS):
+        if len(agents) < 2:
+            raise ValueError("至少需要两个 agent")
+        self.agents = list(agents)
+        self.termination_condition = termination_condition
+        self.prefetch_ratio = prefetch_ratio
+        self.prefetch_min_words = prefetch_min_words
+        self._reply_words: Dict[str, List[int]] = {}
+
+    def _prefetch_words(self, agent: AssistantAgent) -> float:
+        history = self._reply_words.get(agent.name)
+        if not history:
+            return self.prefetch_min_words
+        return max(self.prefetch_min_words, self.prefetch_ratio * sum(history) / len(history))
+
+    def _should_prefetch(self, agent: AssistantAgent, text: str, speculation: Optional[_Turn]) -> bool:
+        if not _SENTENCE_END.search(text) or _word_count(text) < self._prefetch_words(agent):
+            return False
+        # 每轮只预取一次：之后的句末再发起的请求几乎都会被丢弃，只是白白计费
+        return speculation is None
+
+    def _accept(self, speculation: Optional[_Turn], final_text: str) -> bool:
+        """预取所用的前缀就是完整的最终文本（只允许首尾空白不同）时才采用"""
+        return speculation is not None and final_text.strip() == speculation.prefix.strip()
+
+    async def run(self, task: str) -> Dict[str, Any]:
+        """运行整期对话，返回 {"messages": 全部消息, "stop_reason": 结束原因, "stats": SpeculationStats}"""
+        start = time.perf_counter()
+        stats = SpeculationStats()
+        task_message = TextMessage(content=task, source="user")
+        messages: List[BaseChatMessage] = [task_message]
+        # 每位 agent 自上次发言以来尚未收到的消息（轮流发言时每人都能看到所有消息）
+        pending: Dict[str, List[BaseChatMessage]] = {agent.name: [task_message] for agent in self.agents}
+
+        await self.termination_condition.reset()
+        stop = await self.termination_condition([task_message])
+        index = 0
+        current = await _Turn(self.agents[0], pending.pop(self.agents[0].name)).start()
+        while stop is None:
+            agent = self.agents[index]
+            next_agent = self.agents[(index + 1) % len(self.agents)]
+            speculation: Optional[_Turn] = None
+            try:
+                async for text in current.partials():
+                    if self._should_prefetch(agent, text, speculation):
+                        prefix_message = TextMessage(content=text, source=agent.name)
+                        speculation = await _Turn(next_agent, pending.get(next_agent.name, []) + [prefix_message],
+                                                  prefix=text).start()
+                response = await current.result()
+            except BaseException:
+                if speculation is not None:
+                    await speculation.discard()
+                raise
+            done_at = time.perf_counter()
+
+            reply = response.chat_message
+            print(f"---------- {reply.source} ----------\n{reply.to_text()}\n", flush=True)
+            self._reply_words.setdefault(agent.name, []).append(_word_count(reply.to_text()))
+            messages.append(reply)
+            for other in self.agents:
+                if other is not agent:
+                    pending.setdefault(other.name, []).append(reply)
+            stats.turns += 1
+            stop = await self.termination_condition([reply])
+            if stop is not None:
+                if speculation is not None:
+                    await speculation.discard()
+                    stats.discarded += 1
+                break
+
+            if self._accept(speculation, reply.to_text()):
+                await speculation.commit(reply.to_text())
+                pending.pop(next_agent.name, None)
+                # 下一位的回复在当前回复结束时已经进行了这么久（或已经完成）
+                saved = min(done_at, speculation.finished or done_at) - speculation.started
+                stats.accepted += 1
+                stats.saved_seconds += saved
+                stats.saved_per_turn.append(saved)
+                current = speculation
+            else:
+                if speculation is not None:
+                    await speculation.discard()
+                    stats.discarded += 1
+                current = await _Turn(next_agent, pending.pop(next_agent.name)).start()
+            index = (index + 1) % len(self.agents)
+
+        stats.total_seconds = time.perf_counter() - start
+        print(f"对话结束：{stop.content}")
+        print(f"预取统计：{stats}")
+        return {"messages": messages, "stop_reason": stop.content, "stats": stats}
@@ -0,0 +1,132 @@
+import os
+import sys
+import time
+from pathlib import Path
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from text_utils import count_tokens
+
+
+@dataclass
+class StreamStats:
+    """一次流式生成的统计：首个 token 延迟、总耗时、输出 token 数与分块数"""
+    time_to_first_token: Optional[float] = None
+    total_seconds: float = 0.0
+    tokens: int = 0
+    chunks: int = 0
+
+    @property
+    def tokens_per_second(self) -> float:
+        """首个 token 之后的生成速度"""
+        generating = self.total_seconds - (self.time_to_first_token or 0.0)
+        return self.tokens / generating if generating > 0 else 0.0
+
+    def __str__(self) -> str:
+        ttft = f"{self.time_to_first_token:.1f} 秒" if self.time_to_first_token is not None else "-"
+        return (f"首个 token {ttft}，总耗时 {self.total_seconds:.1f} 秒，"
+                f"{self.tokens} tokens（{self.tokens_per_second:.1f} tokens/秒）")
+
+
+class StreamingOutput:
+    """把流式输出的文本按行写入文件并回显到终端
+
+    生成过程中写入 <output_path>.partial，每遇到换行就刷新文件和终端；正常结束后替换为
+    output_path。调用中断或出错时部分内容保留在 .partial 文件中，不会覆盖已有的完整输出。
+    """
+
+    def __init__(self, output_path: str, echo: bool = True):
+        self.output_path = str(output_path)
+        self.partial_path = self.output_path + ".partial"
+        self.echo = echo
+        self.stats = StreamStats()
+        self._parts = []
+        self._pending = ""
+        self._start = time.perf_counter()
+        Path(self.output_path).parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.partial_path, "w", encoding="utf-8")
+
+    @property
+    def text(self) -> str:
+        return "".join(self._parts)
+
+    def write(self, token: str):
+        if not token:
+            return
+        if self.stats.time_to_first_token is None:
+            self.stats.time_to_first_token = time.perf_counter() - self._start
+        self.stats.chunks += 1
+        self._parts.append(token)
+        self._pending += token
+        if "\n" in token:
+            line_end = self._pending.rindex("\n") + 1
+            self._emit(self._pending[:line_end])
+            self._pending = self._pending[line_end:]
+
+    def _emit(self, text: str):
+        self._file.write(text)
+        self._file.flush()
+        if self.echo:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+
+    def close(self, completed: bool = True) -> StreamStats:
+        """写出剩余内容；completed 为 True 时把 .partial 替换为正式输出文件"""
+        if self._file.closed:
+            return self.stats
+        if self._pending:
+            self._emit(self._pending)
+            self._pending = ""
+            if self.echo:
+                print()
+        self._file.close()
+        self.stats.total_seconds = time.perf_counter() - self._start
+        self.stats.tokens = count_tokens(self.text)
+        if completed:
+            os.replace(self.partial_path, self.output_path)
+            print(f"已保存至: {self.output_path}（{self.stats}）")
+        else:
+            print(f"生成中断，已保留部分内容: {self.partial_path}（{self.stats}）")
+        return self.stats
+
+    def __enter__(self) -> "StreamingOutput":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close(completed=exc_type is None)
+
+
+def stream_to_file(chain, inputs: Dict[str, Any], output_path: str, echo: bool = True,
+                   stop: Optional[Callable[[str], bool]] = None) -> Tuple[str, StreamStats]:
+    """用 chain.stream 生成文本，边生成边写入文件，返回 (完整文本, 统计)
+
+    stop 在每个分块写入后调用，返回 True 时提前结束生成（关闭流即取消请求）。
+    """
+    with StreamingOutput(output_path, echo) as output:
+        stream = chain.stream(inputs)
+        try:
+            for token in stream:
+                output.write(token)
+                if stop is not None and stop(token):
+                    break
+        finally:
+            stream.close()
+    return output.text, output.stats
+
+
+async def astream_to_file(chain, inputs: Dict[str, Any], output_path: str, echo: bool = True,
+                          on_token: Optional[Callable[[str], None]] = None,
+                          stop: Optional[Callable[[str], bool]] = None) -> Tuple[str, StreamStats]:
+    """stream_to_file 的异步版本；on_token 在每个分块写入后调用（如增量解析脚本）"""
+    with StreamingOutput(output_path, echo) as output:
+        stream = chain.astream(inputs)
+        try:
+            async for token in stream:
+                output.write(token)
+                if on_token is not None:
+                    on_token(token)
+                if stop is not None and stop(token):
+                    break
+        finally:
+            await stream.aclose()
+    return output.text, output.stats
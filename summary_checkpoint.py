@@ -0,0 +1,132 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+MANIFEST_VERSION = 2
+
+
+def text_hash(text: str) -> str:
+    """文本内容的 sha256"""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def file_hash(file_path: str, block_size: int = 1 << 20) -> str:
+    """按块读取文件计算 sha256，不把整个PDF读入内存"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class SummaryCheckpoint:
+    """书籍摘要的断点清单，记录每个文本块和每本书的总结
+
+    清单保存在 manifest.json 中（默认与最终摘要同目录，即 output/book_summary/<分类>/）。
+    块总结以块文本哈希为键存放在各书共用的池中，PDF 修改后只有内容变化的块需要重新总结；
+    每本书以 book_key（文件路径 + 内容哈希）为键，记录其块列表和整书总结，
+    不同目录下的同名 PDF 互不覆盖。
+    新完成的块总结和各书的块列表追加写入同名的 .journal.jsonl，不必每块都重写整个清单；
+    save() 原子地写出完整清单并清空日志，进程中断后重新运行时会回放日志、跳过已完成的部分。
+    块列表也进入日志，因此中断的书即使之后先运行了别的书（save 会清理无人引用的块总结），
+    已完成的块总结仍被它的块列表引用，不会被删除。
+    """
+
+    def __init__(self, manifest_path: str):
+        self.path = Path(manifest_path)
+        self.journal_path = self.path.with_suffix(".journal.jsonl")
+        self.data: Dict[str, Any] = {"version": MANIFEST_VERSION, "books": {}, "chunks": {}}
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == MANIFEST_VERSION:
+                    self.data = data
+                elif data.get("version") == 1:
+                    # 旧清单按文件名记录各书：保留块总结，整书总结在下次运行时重新合并
+                    for book in data.get("books", {}).values():
+                        self.data["chunks"].update(book.get("chunks", {}))
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"读取断点清单失败，将重新开始: {str(e)}")
+        self._replay_journal()
+
+    def _replay_journal(self):
+        if not self.journal_path.exists():
+            return
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break  # 中断时写了一半的最后一行
+                if "book" in entry:
+                    self._set_book_chunks(entry["path"], entry["pdf_hash"], entry["chunks"])
+                else:
+                    self.data["chunks"][entry["key"]] = entry["summary"]
+
+    def _append_journal(self, entry: Dict[str, Any]):
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    @staticmethod
+    def book_key(pdf_path: str, pdf_hash: str) -> str:
+        return text_hash(f"{os.path.abspath(pdf_path)}\n{pdf_hash}")
+
+    def _book(self, pdf_path: str, pdf_hash: str) -> Dict[str, Any]:
+        return self.data["books"].setdefault(self.book_key(pdf_path, pdf_hash),
+                                             {"path": os.path.abspath(pdf_path), "pdf_hash": pdf_hash, "chunks": []})
+
+    @staticmethod
+    def chunk_key(chunk: str, target_length: int) -> str:
+        return text_hash(f"{target_length}\n{chunk}")
+
+    def get_chunk_summary(self, key: str) -> Optional[str]:
+        return self.data["chunks"].get(key)
+
+    def set_chunk_summary(self, key: str, summary: str, save: bool = True):
+        """save 为 True 时追加写入日志；为 False 时只更新内存，由调用方在批量写入后统一 save"""
+        self.data["chunks"][key] = summary
+        if save:
+            self._append_journal({"key": key, "summary": summary})
+
+    def set_book_chunks(self, pdf_path: str, pdf_hash: str, keys: List[str]):
+        """记录一本书当前的块列表（同时追加写入日志）；同一路径旧版本的记录和
+        不再被任何书引用的块总结在 save 时删除"""
+        self._set_book_chunks(pdf_path, pdf_hash, keys)
+        self._append_journal({"book": self.book_key(pdf_path, pdf_hash), "path": os.path.abspath(pdf_path),
+                              "pdf_hash": pdf_hash, "chunks": list(keys)})
+
+    def _set_book_chunks(self, pdf_path: str, pdf_hash: str, keys: List[str]):
+        path = os.path.abspath(pdf_path)
+        book_key = self.book_key(pdf_path, pdf_hash)
+        self.data["books"] = {key: book for key, book in self.data["books"].items()
+                              if key == book_key or book.get("path") != path}
+        self._book(pdf_path, pdf_hash)["chunks"] = list(keys)
+
+    def get_book_summary(self, pdf_path: str, pdf_hash: str, target_length: int) -> Optional[str]:
+        """PDF 文件未变化且目标长度相同时，直接返回已完成的整书总结"""
+        book = self.data["books"].get(self.book_key(pdf_path, pdf_hash))
+        if book is not None and book.get("target_length") == target_length:
+            return book.get("summary")
+        return None
+
+    def set_book_summary(self, pdf_path: str, pdf_hash: str, target_length: int, summary: str):
+        self._book(pdf_path, pdf_hash).update({"target_length": target_length, "summary": summary})
+        self.save()
+
+    def save(self):
+        """先写临时文件再替换，避免中断时留下损坏的清单；写出后日志中的内容已并入清单"""
+        referenced = {key for book in self.data["books"].values() for key in book["chunks"]}
+        self.data["chunks"] = {key: summary for key, summary in self.data["chunks"].items() if key in referenced}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".json.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        try:
+            self.journal_path.unlink()
+        except FileNotFoundError:
+            pass
@@ -1,168 +1,354 @@
-import os
-from pathlib import Path
-from typing import List
-import fitz  # PyMuPDF
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_openai import ChatOpenAI
-from langchain_core.output_parsers import StrOutputParser
-from dotenv import load_dotenv
-import glob
-import time
-
-# 加载环境变量
-load_dotenv()
-
-# 设置 OpenRouter API
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-GEMINI_MODEL = "google/gemini-flash-1.5"
-
-CONTEXT_LENGTH = 900000
-OUTPUT_LENGTH = 5000
-
-# 创建 LangChain 模型实例
-gemini_model = ChatOpenAI(
-    model=GEMINI_MODEL,
-    api_key=OPENROUTER_API_KEY,
-    base_url="https://openrouter.ai/api/v1",
-)
-
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """从PDF文件中提取文本"""
-    doc = fitz.open(pdf_path)
-    text = ""
-    for page in doc:
-        text += page.get_text()
-    return text
-
-def chunk_text(text: str, chunk_size: int = 15000) -> List[str]:
-    """将文本分割成较小的块"""
-    words = text.split()
-    chunks = []
-    current_chunk = []
-    current_size = 0
-    
-    for word in words:
-        word_size = len(word) + 1  # +1 for space
-        if current_size + word_size > chunk_size:
-            chunks.append(' '.join(current_chunk))
-            current_chunk = [word]
-            current_size = word_size
-        else:
-            current_chunk.append(word)
-            current_size += word_size
-    
-    if current_chunk:
-        chunks.append(' '.join(current_chunk))
-    
-    return chunks
-
-def summarize_chunk(chunk: str, target_length: int = OUTPUT_LENGTH, max_retries: int = 3) -> str:
-    """使用Gemini模型总结文本块"""
-    prompt_template = """
-    请对以下文本内容进行总结。保持关键信息和核心观点，同时确保总结的内容清晰、连贯。
-    如果遇到了了新的章节，请在结构上换行并添加新的章节标题。最终总结的长度应该接近{target_length}个字符。
-    文本内容:
-    {text}
-
-    要求：总结的每一条都要有标题，而且内容要翔实，不要过于简略。
-    总结应该保持原文的专业性和准确性。
-    """
-    
-    prompt = ChatPromptTemplate.from_template(prompt_template)
-    chain = prompt | gemini_model | StrOutputParser()
-    
-    for attempt in range(max_retries):
-        try:
-            result = chain.invoke({
-                "text": chunk,
-                "target_length": target_length
-            })
-            print(f"API 返回结果：\n{result}\n")
-            return result
-        except Exception as e:
-            if attempt == max_retries - 1:
-                raise e
-            print(f"尝试 {attempt + 1} 失败，等待 5 秒后重试...")
-            print(f"错误信息: {str(e)}")
-            time.sleep(5)
-
-def combine_summaries(summaries: List[str], target_length: int = 30000) -> str:
-    """合并并优化多个总结，确保最终长度接近目标长度"""
-    prompt_template = """
-    请将以下多个文本总结合并为一个连贯的总结。最终总结的长度应该接近{target_length}个字符。
-
-    文本总结:
-    {summaries}
-
-    要求：
-    1. 保持内容的连贯性和逻辑性
-    2. 删除重复的信息
-    3. 确保关键观点都被保留
-    4. 适当调整内容长度，使最终总结接近{target_length}个字符
-    5. 保持专业性和准确性
-    """
-    
-    prompt = ChatPromptTemplate.from_template(prompt_template)
-    chain = prompt | gemini_model | StrOutputParser()
-    
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            result = chain.invoke({
-                "summaries": "\n\n".join(summaries),
-                "target_length": target_length
-            })
-            if result is None:
-                raise ValueError("API 返回为空")
-            return result
-        except Exception as e:
-            if attempt == max_retries - 1:
-                raise e
-            print(f"合并总结时失败（尝试 {attempt + 1}/{max_retries}），等待 10 秒后重试...")
-            print(f"错误信息: {str(e)}")
-            time.sleep(10)  # 增加等待时间，避免频繁请求
-
-def generate_book_summary(pdf_paths: List[str], output_path: str, target_length: int = OUTPUT_LENGTH ):
-    """生成多本书的综合摘要"""
-    all_summaries = []
-    
-    for pdf_path in pdf_paths:
-        print(f"处理文件: {pdf_path}")
-        
-        # 提取文本
-        text = extract_text_from_pdf(pdf_path)
-        
-        # 分块处理
-        chunks = chunk_text(text)
-        
-        # 总结每个块
-        chunk_summaries = []
-        for i, chunk in enumerate(chunks):
-            print(f"处理第 {i+1}/{len(chunks)} 个文本块...")
-            summary = summarize_chunk(chunk)
-            chunk_summaries.append(summary)
-        
-        # 合并该书的所有块总结
-        book_summary = combine_summaries(chunk_summaries, target_length // len(pdf_paths))
-        all_summaries.append(book_summary)
-    
-    # 合并所有书的总结
-    final_summary = combine_summaries(all_summaries, target_length)
-    
-    # 保存最终总结
-    output_dir = Path(output_path).parent
-    output_dir.mkdir(exist_ok=True, parents=True)
-    
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(final_summary)
-    
-    print(f"摘要已生成并保存至: {output_path}")
-    return final_summary
-
-if __name__ == "__main__":
-    # 示例用法
-    pdf_paths = glob.glob("./books/test/*.pdf")
-    
-    output_path = "output/book_summary/self_improvement/book_summary.txt"
-    
-    summary = generate_book_summary(pdf_paths, output_path)
+import os
+from pathlib import Path
+from typing import List, Iterator, Optional, Callable
+from concurrent.futures import ProcessPoolExecutor
+import fitz  # PyMuPDF
+from langchain_core.prompts import ChatPromptTemplate
+from chat_models import get_chat_model
+from langchain_core.output_parsers import StrOutputParser
+from dotenv import load_dotenv
+import glob
+import asyncio
+from dataclasses import dataclass, field
+
+from summary_checkpoint import SummaryCheckpoint, file_hash
+from text_utils import count_tokens, iter_token_chunks, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS
+
+# 加载环境变量
+load_dotenv()
+
+# 模型（经 OpenRouter 调用）
+GEMINI_MODEL = "google/gemini-flash-1.5"
+
+CONTEXT_LENGTH = 900000
+OUTPUT_LENGTH = 5000
+# 同时在途的块总结请求数
+MAX_CONCURRENCY = 8
+# 并行提取PDF时每个任务负责的页数
+PAGES_PER_TASK = 32
+# 单次合并请求中总结文本的 token 预算，以及每组最多合并的总结数
+REDUCE_TOKEN_BUDGET = 100000
+REDUCE_FAN_IN = 8
+
+# LangChain 模型实例由共享注册表在首次使用时创建
+def get_gemini_model():
+    return get_chat_model(GEMINI_MODEL)
+
+def iter_pdf_pages(pdf_path: str, start: int = 0, end: Optional[int] = None) -> Iterator[str]:
+    """逐页产出PDF文本（可指定页码区间），不在内存中拼接整本书"""
+    with fitz.open(pdf_path) as doc:
+        end = doc.page_count if end is None else min(end, doc.page_count)
+        for page_no in range(start, end):
+            yield doc.load_page(page_no).get_text()
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[str]:
+    """进程池任务：提取 [start, end) 区间的页面文本"""
+    return list(iter_pdf_pages(pdf_path, start, end))
+
+def iter_pdf_pages_parallel(pdf_path: str, workers: Optional[int] = None, pages_per_task: int = PAGES_PER_TASK,
+                            executor: Optional[ProcessPoolExecutor] = None) -> Iterator[str]:
+    """把同一文档的页码区间分给进程池提取，仍按页序逐页产出
+
+    传入 executor 时复用该进程池（例如处理整个 data/books 目录时），否则临时创建。
+    """
+    with fitz.open(pdf_path) as doc:
+        page_count = doc.page_count
+    ranges = [(start, min(start + pages_per_task, page_count)) for start in range(0, page_count, pages_per_task)]
+    if len(ranges) <= 1 or (executor is None and workers == 1):
+        yield from iter_pdf_pages(pdf_path)
+        return
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = [executor.submit(_extract_page_range, pdf_path, start, end) for start, end in ranges]
+        for future in futures:
+            yield from future.result()
+    finally:
+        if own_executor:
+            executor.shutdown(cancel_futures=True)
+
+def iter_book_pages(pdf_path: str, workers: int = 1) -> Iterator[str]:
+    """逐页产出PDF文本，workers > 1 时使用进程池"""
+    return iter_pdf_pages(pdf_path) if workers == 1 else iter_pdf_pages_parallel(pdf_path, workers)
+
+def extract_text_from_pdf(pdf_path: str, workers: int = 1) -> str:
+    """从PDF文件中提取文本，workers > 1 时使用进程池并行提取"""
+    pages = iter_book_pages(pdf_path, workers)
+    # 一次性 join，避免 text += ... 反复复制整段字符串
+    return "".join(pages)
+
+def chunk_text(text: str, chunk_tokens: int = CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> List[str]:
+    """将文本按 token 分块，尽量保留章节和段落边界"""
+    return list(iter_token_chunks([text], chunk_tokens, overlap_tokens))
+
+SUMMARIZE_CHUNK_PROMPT = """
+    请对以下文本内容进行总结。保持关键信息和核心观点，同时确保总结的内容清晰、连贯。
+    如果遇到了了新的章节，请在结构上换行并添加新的章节标题。最终总结的长度应该接近{target_length}个字符。
+    文本内容:
+    {text}
+
+    要求：总结的每一条都要有标题，而且内容要翔实，不要过于简略。
+    总结应该保持原文的专业性和准确性。
+    """
+
+def build_summarize_chain(model=None):
+    """构建块总结所用的链，model 为空时使用默认的 Gemini 模型"""
+    prompt = ChatPromptTemplate.from_template(SUMMARIZE_CHUNK_PROMPT)
+    return prompt | (model or get_gemini_model()) | StrOutputParser()
+
+def summarize_chunk(chunk: str, target_length: int = OUTPUT_LENGTH) -> str:
+    """使用Gemini模型总结文本块（限流与可重试错误由模型的调度器处理）"""
+    chain = build_summarize_chain()
+    result = chain.invoke({
+        "text": chunk,
+        "target_length": target_length
+    })
+    print(f"API 返回结果：\n{result}\n")
+    return result
+
+async def asummarize_chunk(chain, chunk: str, target_length: int = OUTPUT_LENGTH) -> str:
+    """summarize_chunk 的异步版本，调度器的重试等待不会阻塞其他在途请求"""
+    return await chain.ainvoke({
+        "text": chunk,
+        "target_length": target_length
+    })
+
+async def summarize_chunks_concurrently(chunks: List[str], max_concurrency: int = MAX_CONCURRENCY,
+                                        target_length: int = OUTPUT_LENGTH, chain=None,
+                                        on_result: Optional[Callable[[int, str], None]] = None) -> List[str]:
+    """并发总结所有文本块，最多 max_concurrency 个请求同时在途，结果保持原始块顺序
+
+    on_result 在每个块完成时以 (块序号, 总结) 调用，可用于即时保存断点。
+    """
+    chain = chain or build_summarize_chain()
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+    done = 0
+
+    async def run(i: int, chunk: str) -> str:
+        nonlocal done
+        async with semaphore:
+            summary = await asummarize_chunk(chain, chunk, target_length)
+        done += 1
+        print(f"完成第 {i+1} 个文本块（{done}/{len(chunks)}）")
+        if on_result is not None:
+            on_result(i, summary)
+        return summary
+
+    # gather 按传入顺序返回结果，与完成先后无关
+    return await asyncio.gather(*(run(i, chunk) for i, chunk in enumerate(chunks)))
+
+COMBINE_SUMMARIES_PROMPT = """
+    请将以下多个文本总结合并为一个连贯的总结。最终总结的长度应该接近{target_length}个字符。
+
+    文本总结:
+    {summaries}
+
+    要求：
+    1. 保持内容的连贯性和逻辑性
+    2. 删除重复的信息
+    3. 确保关键观点都被保留
+    4. 适当调整内容长度，使最终总结接近{target_length}个字符
+    5. 保持专业性和准确性
+    """
+
+def build_combine_chain(model=None):
+    """构建合并总结所用的链，model 为空时使用默认的 Gemini 模型"""
+    prompt = ChatPromptTemplate.from_template(COMBINE_SUMMARIES_PROMPT)
+    return prompt | (model or get_gemini_model()) | StrOutputParser()
+
+def combine_summaries(summaries: List[str], target_length: int = 30000) -> str:
+    """合并并优化多个总结，确保最终长度接近目标长度"""
+    chain = build_combine_chain()
+    result = chain.invoke({
+        "summaries": "\n\n".join(summaries),
+        "target_length": target_length
+    })
+    if result is None:
+        raise ValueError("API 返回为空")
+    return result
+
+async def acombine_summaries(chain, summaries: List[str], target_length: int) -> str:
+    """combine_summaries 的异步版本，供树形合并并行调用"""
+    result = await chain.ainvoke({
+        "summaries": "\n\n".join(summaries),
+        "target_length": target_length
+    })
+    if result is None:
+        raise ValueError("API 返回为空")
+    return result
+
+@dataclass
+class ReduceReport:
+    """树形合并的统计：levels[i] 为第 i 层的合并调用数"""
+    name: str = ""
+    levels: List[int] = field(default_factory=list)
+
+    @property
+    def depth(self) -> int:
+        return len(self.levels)
+
+    @property
+    def calls(self) -> int:
+        return sum(self.levels)
+
+    def __str__(self) -> str:
+        return f"合并树[{self.name}]: 深度 {self.depth}，各层调用数 {self.levels}，共 {self.calls} 次调用"
+
+def group_by_token_budget(summaries: List[str], token_budget: int, fan_in: int,
+                          min_group_size: int = 1) -> List[List[str]]:
+    """按顺序把总结分组，每组不超过 fan_in 个且 token 总数不超过预算
+
+    单个超出预算的总结独占一组；min_group_size 用于在无法收敛时强制两两合并。
+    """
+    groups: List[List[str]] = []
+    current: List[str] = []
+    current_tokens = 0
+    for summary in summaries:
+        tokens = count_tokens(summary)
+        over_budget = current_tokens + tokens > token_budget and len(current) >= min_group_size
+        if current and (over_budget or len(current) >= fan_in):
+            groups.append(current)
+            current, current_tokens = [], 0
+        current.append(summary)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+async def tree_reduce_summaries(summaries: List[str], target_length: int,
+                                token_budget: int = REDUCE_TOKEN_BUDGET, fan_in: int = REDUCE_FAN_IN,
+                                max_concurrency: int = MAX_CONCURRENCY, chain=None,
+                                report: Optional[ReduceReport] = None) -> str:
+    """树形合并：按 token 预算分组并行合并，逐层归约直到只剩一个总结
+
+    与 combine_summaries 一样至少调用一次模型，使最终长度接近 target_length。
+    没有任何总结（如PDF中提取不到文本）时直接返回空字符串。
+    """
+    if not summaries:
+        return ""
+    chain = chain or build_combine_chain()
+    report = report if report is not None else ReduceReport()
+    fan_in = max(2, fan_in)
+    budget = max(1, token_budget - count_tokens(COMBINE_SUMMARIES_PROMPT))
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def reduce_group(group: List[str], length: int) -> str:
+        async with semaphore:
+            return await acombine_summaries(chain, group, length)
+
+    level = list(summaries)
+    while True:
+        groups = group_by_token_budget(level, budget, fan_in)
+        if len(groups) == len(level) > 1:
+            # 每个总结都单独超出预算，强制两两合并以保证收敛
+            groups = group_by_token_budget(level, budget, fan_in, min_group_size=2)
+        is_root = len(groups) == 1
+        print(f"合并第 {report.depth + 1} 层：{len(level)} 个总结 -> {len(groups)} 组")
+        level = await asyncio.gather(*(reduce_group(group, target_length) for group in groups))
+        report.levels.append(len(groups))
+        if is_root:
+            return level[0]
+
+def reduce_summaries(summaries: List[str], target_length: int, name: str = "",
+                     max_concurrency: int = MAX_CONCURRENCY, fan_in: int = REDUCE_FAN_IN,
+                     token_budget: int = REDUCE_TOKEN_BUDGET) -> str:
+    """同步入口：树形合并并打印合并树统计"""
+    report = ReduceReport(name=name)
+    result = asyncio.run(tree_reduce_summaries(summaries, target_length, token_budget, fan_in,
+                                               max_concurrency, report=report))
+    print(report)
+    return result
+
+def summarize_book(pdf_path: str, target_length: int, max_concurrency: int = MAX_CONCURRENCY,
+                   extract_workers: int = 1, checkpoint: Optional[SummaryCheckpoint] = None,
+                   reduce_fan_in: int = REDUCE_FAN_IN, chunk_tokens: int = CHUNK_TOKENS) -> str:
+    """总结单本书：提取、分块、并发总结各块并合并
+
+    提供 checkpoint 时，已完成的块和整书总结会被复用，新结果即时写入清单。
+    """
+    pdf_hash = None
+    if checkpoint is not None:
+        pdf_hash = file_hash(pdf_path)
+        book_summary = checkpoint.get_book_summary(pdf_path, pdf_hash, target_length)
+        if book_summary is not None:
+            print(f"断点命中，跳过已完成的书: {pdf_path}")
+            return book_summary
+
+    # 逐页提取并按 token 分块，不拼接整本书的文本
+    chunks = list(iter_token_chunks(iter_book_pages(pdf_path, extract_workers), chunk_tokens))
+
+    chunk_summaries: List[Optional[str]] = [None] * len(chunks)
+    if checkpoint is not None:
+        keys = [checkpoint.chunk_key(chunk, OUTPUT_LENGTH) for chunk in chunks]
+        checkpoint.set_book_chunks(pdf_path, pdf_hash, keys)
+        for i, key in enumerate(keys):
+            chunk_summaries[i] = checkpoint.get_chunk_summary(key)
+    pending = [i for i, summary in enumerate(chunk_summaries) if summary is None]
+
+    # 并发总结尚未完成的块（顺序与 chunks 一致）
+    print(f"共 {len(chunks)} 个文本块，待处理 {len(pending)} 个，并发数 {max_concurrency}")
+    if pending:
+        def save_chunk(j: int, summary: str):
+            if checkpoint is not None:
+                checkpoint.set_chunk_summary(keys[pending[j]], summary)
+
+        results = asyncio.run(summarize_chunks_concurrently(
+            [chunks[i] for i in pending], max_concurrency, on_result=save_chunk))
+        for i, summary in zip(pending, results):
+            chunk_summaries[i] = summary
+
+    # 合并该书的所有块总结
+    book_summary = reduce_summaries(chunk_summaries, target_length, os.path.basename(pdf_path),
+                                    max_concurrency, reduce_fan_in)
+    if checkpoint is not None:
+        checkpoint.set_book_summary(pdf_path, pdf_hash, target_length, book_summary)
+    return book_summary
+
+def generate_book_summary(pdf_paths: List[str], output_path: str, target_length: int = OUTPUT_LENGTH,
+                          max_concurrency: int = MAX_CONCURRENCY, extract_workers: int = 1,
+                          resume: bool = False, manifest_path: Optional[str] = None,
+                          reduce_fan_in: int = REDUCE_FAN_IN, chunk_tokens: int = CHUNK_TOKENS):
+    """生成多本书的综合摘要
+
+    max_concurrency 控制块总结与合并的并发请求数，extract_workers 控制PDF提取的进程数，
+    reduce_fan_in 为树形合并时每组最多合并的总结数，chunk_tokens 为每个文本块的 token 上限。
+    resume 为 True 时启用断点清单（默认 output_path 同目录下的 manifest.json），
+    重新运行会跳过已完成的块和书，PDF 变化时只重做内容变化的块。
+    """
+    if not pdf_paths:
+        raise ValueError("没有需要总结的PDF文件")
+
+    checkpoint = None
+    if resume:
+        checkpoint = SummaryCheckpoint(manifest_path or str(Path(output_path).parent / "manifest.json"))
+
+    all_summaries = []
+    
+    for pdf_path in pdf_paths:
+        print(f"处理文件: {pdf_path}")
+        book_summary = summarize_book(pdf_path, target_length // len(pdf_paths), max_concurrency,
+                                      extract_workers, checkpoint, reduce_fan_in, chunk_tokens)
+        all_summaries.append(book_summary)
+    
+    # 合并所有书的总结
+    final_summary = reduce_summaries(all_summaries, target_length, "全部书籍", max_concurrency, reduce_fan_in)
+    
+    # 保存最终总结
+    output_dir = Path(output_path).parent
+    output_dir.mkdir(exist_ok=True, parents=True)
+    
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(final_summary)
+    
+    print(f"摘要已生成并保存至: {output_path}")
+    return final_summary
+
+if __name__ == "__main__":
+    # 示例用法
+    pdf_paths = glob.glob("./books/test/*.pdf")
+    
+    output_path = "output/book_summary/self_improvement/book_summary.txt"
+    
+    summary = generate_book_summary(pdf_paths, output_path, resume=True)
@@ -0,0 +1,195 @@
+import os
+import json
+import hashlib
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from text_utils import iter_token_chunks
+
+# 摘要根目录（其下每个子目录为一个分类），以及索引文件所在目录（按根目录的绝对路径哈希命名，
+# 不在摘要目录中写入任何文件）
+SUMMARY_ROOT = "./data/summary"
+INDEX_DIR = ".cache/summary_index"
+INDEX_VERSION = 1
+# 供检索使用的段落大小
+CHUNK_TOKENS = 400
+CHUNK_OVERLAP_TOKENS = 40
+
+
+def index_path_for(root: str) -> Path:
+    """某个摘要根目录对应的索引文件路径"""
+    digest = hashlib.sha256(os.path.abspath(root).encode("utf-8")).hexdigest()[:16]
+    return Path(INDEX_DIR) / f"{digest}.json"
+
+
+def book_title(file_path: str) -> str:
+    """由摘要文件名得到书名"""
+    return os.path.basename(file_path).replace('.txt', '').replace('_', ' ').title()
+
+
+class SummaryStore:
+    """书籍摘要的持久化索引，所有入口共用
+
+    索引保存每个摘要文件的分类、书名、大小、修改时间、sha256、全文和切分好的段落。
+    refresh 只 stat 文件，大小和修改时间都未变的文件不会被读取；内容哈希未变的文件
+    不会重新切分。分类即根目录下的子目录名（如 self_improvement、relationship_and_family），
+    直接放在根目录下的文件分类为空字符串。
+    """
+
+    def __init__(self, root: str = SUMMARY_ROOT, index_path: Optional[str] = None,
+                 chunk_tokens: int = CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS):
+        self.root = Path(root)
+        self.index_path = Path(index_path) if index_path else index_path_for(root)
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self._documents: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return
+        if data.get("version") == INDEX_VERSION and data.get("chunk_tokens") == self.chunk_tokens:
+            self._documents = data.get("documents", {})
+
+    def _save(self):
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": INDEX_VERSION,
+                "chunk_tokens": self.chunk_tokens,
+                "documents": self._documents,
+            }, f, ensure_ascii=False)
+        os.replace(tmp_path, self.index_path)
+
+    def _scan(self) -> Iterator[Tuple[str, str, os.stat_result]]:
+        """产出 (相对路径, 分类, stat)，只遍历根目录及其一级子目录"""
+        if not self.root.exists():
+            return
+        for entry in os.scandir(self.root):
+            if entry.is_file() and entry.name.endswith(".txt"):
+                yield entry.name, "", entry.stat()
+            elif entry.is_dir() and not entry.name.startswith("."):
+                for sub_entry in os.scandir(entry.path):
+                    if sub_entry.is_file() and sub_entry.name.endswith(".txt"):
+                        yield f"{entry.name}/{sub_entry.name}", entry.name, sub_entry.stat()
+
+    def refresh(self) -> Tuple[int, int, int]:
+        """按修改时间/内容哈希增量更新索引，返回 (新增, 更新, 删除) 数量"""
+        with self._lock:
+            added = updated = 0
+            touched = False
+            seen = set()
+            for rel_path, category, stat in self._scan():
+                seen.add(rel_path)
+                doc = self._documents.get(rel_path)
+                if doc and doc["size"] == stat.st_size and doc["mtime"] == stat.st_mtime:
+                    continue
+                try:
+                    with open(self.root / rel_path, "r", encoding="utf-8") as file:
+                        text = file.read().strip()
+                except Exception as e:
+                    print(f"读取文件 {rel_path} 时出错: {str(e)}")
+                    continue
+                sha256 = hashlib.sha256(text.encode("utf-8")).hexdigest()
+                touched = True
+                if doc and doc["sha256"] == sha256:
+                    doc.update(size=stat.st_size, mtime=stat.st_mtime)
+                    continue
+                chunks = list(iter_token_chunks([text], self.chunk_tokens, self.overlap_tokens))
+                self._documents[rel_path] = {
+                    "category": category,
+                    "title": book_title(rel_path),
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime,
+                    "sha256": sha256,
+                    "text": text,
+                    "chunks": chunks,
+                }
+                if doc:
+                    updated += 1
+                else:
+                    added += 1
+
+            removed = [rel_path for rel_path in self._documents if rel_path not in seen]
+            for rel_path in removed:
+                del self._documents[rel_path]
+            # 只有 mtime 变化时也保存，下次启动即可跳过读取；没有任何变化时不写盘
+            if touched or removed:
+                self._save()
+        if added or updated or removed:
+            print(f"摘要索引已更新: 新增 {added}，更新 {updated}，删除 {len(removed)}")
+        return added, updated, len(removed)
+
+    def categories(self) -> List[str]:
+        return sorted({doc["category"] for doc in self._documents.values()})
+
+    def documents(self, category: Optional[str] = None) -> List[Dict[str, Any]]:
+        """按文件名排序返回文档（含 path 字段），category 为空时返回全部"""
+        return [
+            dict(doc, path=rel_path)
+            for rel_path, doc in sorted(self._documents.items())
+            if category is None or doc["category"] == category
+        ]
+
+    def document_text(self, file_path: str) -> Optional[str]:
+        """按文件路径（绝对或相对于当前目录）取摘要全文"""
+        try:
+            rel_path = Path(os.path.abspath(file_path)).relative_to(os.path.abspath(self.root)).as_posix()
+        except ValueError:
+            return None
+        doc = self._documents.get(rel_path)
+        return doc["text"] if doc else None
+
+    def combined_text(self, category: Optional[str] = None, separator: str = "\n\n") -> str:
+        """合并某分类下的全部摘要全文"""
+        return separator.join(doc["text"] for doc in self.documents(category))
+
+    def chunks(self, categories: Optional[List[str]] = None) -> Iterator[Dict[str, str]]:
+        """产出指定分类下的所有段落 {"source": 书名, "text": 段落}"""
+        for doc in self.documents():
+            if categories is None or doc["category"] in categories:
+                for chunk in doc["chunks"]:
+                    yield {"source": doc["title"], "text": chunk}
+
+    def signature(self, categories: Optional[List[str]] = None) -> List[List[str]]:
+        """(路径, 内容哈希) 列表，用于判断依赖此库的派生索引是否过期"""
+        return [[doc["path"], doc["sha256"]] for doc in self.documents()
+                if categories is None or doc["category"] in categories]
+
+
+_stores: Dict[str, SummaryStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_summary_store(root: str = SUMMARY_ROOT) -> SummaryStore:
+    """获取某个根目录的摘要库，同一进程内复用
+
+    每次获取都会刷新：只 stat 文件，未变化时不读取也不写盘，因此文件在进程运行期间被修改后
+    也能取到最新内容。
+    """
+    key = os.path.abspath(root)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = SummaryStore(root)
+    store.refresh()
+    return store
+
+
+def resolve_summary_path(path: str) -> Tuple[SummaryStore, Optional[str]]:
+    """把目录路径映射为 (摘要库, 分类)
+
+    位于某个库根目录下一级的分类目录（如 ./data/summary/self_improvement）映射到该库的分类，
+    其他目录本身作为根目录、分类为空字符串。
+    """
+    path = os.path.abspath(path)
+    parent, name = os.path.split(path.rstrip(os.sep))
+    if os.path.abspath(SUMMARY_ROOT) == parent:
+        return get_summary_store(parent), name
+    return get_summary_store(path), ""
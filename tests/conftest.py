@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 仓库根目录下的脚本以顶层模块方式导入
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+os.environ.setdefault("LLM_CACHE_DISABLED", "1")
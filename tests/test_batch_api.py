@@ -0,0 +1,66 @@
+import json
+from types import SimpleNamespace
+
+from batch_api import BatchRequestWriter, load_meta, scatter_results, submit_batch
+
+PROMPT = "Summarize: {text}"
+
+
+class FakeBatchClient:
+    """记录每次上传的 custom_id"""
+
+    def __init__(self):
+        self.uploads = []
+        self.files = SimpleNamespace(create=self._create_file)
+        self.batches = SimpleNamespace(create=self._create_batch)
+
+    def _create_file(self, file, purpose):
+        self.uploads.append([json.loads(line)["custom_id"] for line in file.read().decode("utf-8").splitlines()])
+        return SimpleNamespace(id=f"file-{len(self.uploads)}")
+
+    def _create_batch(self, input_file_id, endpoint, completion_window):
+        return SimpleNamespace(id=f"batch-{len(self.uploads)}")
+
+
+def _enqueue(requests_path, tmp_path, *names):
+    writer = BatchRequestWriter(str(requests_path))
+    model = SimpleNamespace(model_name="model", temperature=None)
+    for name in names:
+        writer.add(name, model, PROMPT, {"text": name},
+                   {"stage": "core_topics", "output": str(tmp_path / "out" / f"{name}.txt")})
+    writer.save()
+
+
+def test_each_submission_uploads_only_new_requests(tmp_path):
+    requests_path = tmp_path / "requests.jsonl"
+    client = FakeBatchClient()
+
+    _enqueue(requests_path, tmp_path, "a", "b")
+    first = submit_batch(client, str(requests_path))
+    # 已提交、尚未写回的请求不会重复入队
+    _enqueue(requests_path, tmp_path, "a", "c")
+    submit_batch(client, str(requests_path))
+
+    assert client.uploads == [["a", "b"], ["c"]]
+    assert not requests_path.exists()
+    assert (tmp_path / f"requests.{first}.jsonl").exists()
+
+
+def test_finished_and_failed_requests_leave_meta_and_can_be_requeued(tmp_path):
+    requests_path = tmp_path / "requests.jsonl"
+    client = FakeBatchClient()
+    _enqueue(requests_path, tmp_path, "a", "b")
+    batch_id = submit_batch(client, str(requests_path))
+
+    # "b" 失败，没有结果
+    written = scatter_results({"a": "topics for a"}, str(requests_path), batch_id)
+
+    assert written == 1
+    assert (tmp_path / "out" / "a.txt").read_text(encoding="utf-8") == "topics for a"
+    meta = load_meta(str(requests_path))
+    assert meta["requests"] == {}
+    assert meta["batches"] == {}
+
+    _enqueue(requests_path, tmp_path, "b")
+    submit_batch(client, str(requests_path))
+    assert client.uploads[-1] == ["b"]
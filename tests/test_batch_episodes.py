@@ -0,0 +1,104 @@
+import json
+import asyncio
+
+import pytest
+
+import main3_2
+import batch_episodes
+from batch_episodes import EpisodeJob, JobStatusLog, load_jobs, run_batch
+
+
+@pytest.fixture
+def generator(tmp_path, monkeypatch):
+    """替换脚本生成函数：记录被调用的话题，话题名含 fail 时抛出异常"""
+    batch_episodes.load_input.cache_clear()
+    batch_episodes.load_ip_setting.cache_clear()
+    calls = []
+
+    async def fake_generate(book_summary, core_topics, selected_topic, ip_setting, duration_minutes=5):
+        calls.append(selected_topic)
+        await asyncio.sleep(0)
+        if "fail" in selected_topic:
+            raise RuntimeError(f"model error on {selected_topic}")
+        return f"script for {selected_topic} ({duration_minutes} min, {ip_setting})"
+
+    monkeypatch.setattr(main3_2, "agenerate_podcast_script", fake_generate)
+    yield calls
+    batch_episodes.load_input.cache_clear()
+    batch_episodes.load_ip_setting.cache_clear()
+
+
+def _jobs(tmp_path, topics):
+    (tmp_path / "summary.txt").write_text("A book about habits.", encoding="utf-8")
+    (tmp_path / "topics.txt").write_text("1. Cue\n2. Reward", encoding="utf-8")
+    (tmp_path / "host.txt").write_text("Two friendly hosts.", encoding="utf-8")
+    manifest = tmp_path / "jobs.jsonl"
+    lines = ["# 测试清单"]
+    for topic in topics:
+        lines.append(json.dumps({"book_summary": str(tmp_path / "summary.txt"), "core_topics": str(tmp_path / "topics.txt"),
+                                 "selected_topic": topic, "ip_setting": str(tmp_path / "host.txt"),
+                                 "output": str(tmp_path / "out" / f"{topic}.txt")}))
+    manifest.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return load_jobs(str(manifest))
+
+
+def test_failed_job_is_recorded_without_stopping_the_batch(tmp_path, generator):
+    jobs = _jobs(tmp_path, ["cue", "fail-craving", "reward"])
+    status_path = str(tmp_path / "jobs.status.jsonl")
+
+    stats = asyncio.run(run_batch(jobs, status_path, concurrency=2))
+
+    assert [job.id for job in jobs] == ["job0002", "job0003", "job0004"]
+    assert stats["run"] == 3 and stats["done"] == 2 and stats["failed"] == 1
+    assert sorted(generator) == ["cue", "fail-craving", "reward"]
+    log = JobStatusLog(status_path)
+    assert {job_id: record["status"] for job_id, record in log.latest.items()} == {
+        "job0002": "done", "job0003": "failed", "job0004": "done"}
+    assert "model error on fail-craving" in log.latest["job0003"]["error"]
+    assert (tmp_path / "out" / "cue.txt").read_text(encoding="utf-8").startswith("script for cue (5 min, Two friendly")
+
+
+def test_rerun_skips_finished_jobs_and_retries_failed_ones(tmp_path, generator):
+    jobs = _jobs(tmp_path, ["cue", "fail-craving", "reward"])
+    status_path = str(tmp_path / "jobs.status.jsonl")
+    asyncio.run(run_batch(jobs, status_path))
+    generator.clear()
+
+    stats = asyncio.run(run_batch(jobs, status_path))
+
+    assert generator == ["fail-craving"]
+    assert stats["total"] == 3 and stats["run"] == 1 and stats["failed"] == 1
+
+
+def test_done_job_whose_output_is_missing_runs_again(tmp_path, generator):
+    jobs = _jobs(tmp_path, ["cue", "reward"])
+    status_path = str(tmp_path / "jobs.status.jsonl")
+    asyncio.run(run_batch(jobs, status_path))
+    (tmp_path / "out" / "reward.txt").unlink()
+    generator.clear()
+
+    stats = asyncio.run(run_batch(jobs, status_path))
+
+    assert generator == ["reward"]
+    assert stats["done"] == 1
+    assert (tmp_path / "out" / "reward.txt").exists()
+
+
+def test_status_log_keeps_the_latest_record_per_job(tmp_path):
+    status_path = str(tmp_path / "status" / "jobs.status.jsonl")
+    job = EpisodeJob(id="ep1", book_summary="s.txt", core_topics="t.txt", selected_topic="Cue",
+                     output=str(tmp_path / "ep1.txt"))
+    log = JobStatusLog(status_path)
+    log.record(job, "running")
+    log.record(job, "failed", error="timeout")
+    log.record(job, "done", output=job.output_path)
+
+    reloaded = JobStatusLog(status_path)
+
+    assert reloaded.latest["ep1"]["status"] == "done"
+    # 状态为 done 但输出文件不存在时不算完成
+    assert not reloaded.is_done(job)
+    (tmp_path / "ep1.txt").write_text("script", encoding="utf-8")
+    assert reloaded.is_done(job)
+    with open(status_path, encoding="utf-8") as f:
+        assert [json.loads(line)["status"] for line in f] == ["running", "failed", "done"]
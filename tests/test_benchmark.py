@@ -0,0 +1,34 @@
+
+from benchmark import _import_profile, _parse_importtime
+
+IMPORTTIME = """import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   sitecustomize
+import time:      1791 |      45570 | site
+import time:       250 |        250 |       _json
+import time:       607 |        857 |     json.scanner
+import time:       802 |       1658 |   json.decoder
+import time:       794 |        794 |   json.encoder
+import time:       391 |       2842 | json
+import time:       120 |        120 | typing
+"""
+
+
+def test_only_imports_nested_under_the_module_count_as_dependencies():
+    total, dependencies = _parse_importtime(IMPORTTIME, "json")
+
+    assert total == 0.002842
+    assert dependencies == [(0.001658, "json.decoder"), (0.000794, "json.encoder")]
+
+
+def test_module_missing_from_output_has_no_dependencies():
+    assert _parse_importtime(IMPORTTIME, "yaml") == (0.0, [])
+
+
+def test_import_profile_of_a_real_module():
+    # 已在启动时导入的模块不会出现在输出中，这里选一个启动时不会导入的标准库包
+    total, dependencies = _import_profile("json")
+
+    assert total > 0
+    names = [name for _, name in dependencies]
+    assert "json.decoder" in names
+    assert "sitecustomize" not in names and "encodings" not in names
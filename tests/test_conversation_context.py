@@ -0,0 +1,78 @@
+import asyncio
+
+from autogen_core.models import AssistantMessage, SystemMessage, UserMessage
+from autogen_ext.models.replay import ReplayChatCompletionClient
+
+from conversation_context import ConversationSummarizer, RollingSummaryContext
+
+HOSTS = ("Samuel", "Alex")
+
+
+def _client():
+    return ReplayChatCompletionClient([f"summary {i}" for i in range(50)])
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def _run_dialogue(contexts, turns=12):
+    """模拟轮流发言：发言者的上下文记为 AssistantMessage，另一位记为 UserMessage"""
+    for context in contexts.values():
+        await context.add_message(UserMessage(content="Record an episode about habits.", source="user"))
+    for turn in range(turns):
+        speaker = HOSTS[turn % 2]
+        for name, context in contexts.items():
+            content = f"turn {turn}: habits compound"
+            message = (AssistantMessage(content=content, source=speaker) if name == speaker
+                       else UserMessage(content=content, source=speaker))
+            await context.add_message(message)
+        await _settle()
+    await _settle()
+
+
+def test_agents_sharing_a_summarizer_summarize_each_history_once():
+    shared = ConversationSummarizer(_client())
+    shared_contexts = {name: RollingSummaryContext(keep_messages=4, summarizer=shared) for name in HOSTS}
+    separate = {name: ConversationSummarizer(_client()) for name in HOSTS}
+    separate_contexts = {name: RollingSummaryContext(keep_messages=4, summarizer=separate[name]) for name in HOSTS}
+
+    asyncio.run(_run_dialogue(shared_contexts))
+    asyncio.run(_run_dialogue(separate_contexts))
+
+    separate_requests = sum(summarizer.requests for summarizer in separate.values())
+    assert shared.requests > 0
+    assert shared.requests * 2 == separate_requests
+    samuel, alex = shared_contexts.values()
+    assert samuel.summary and samuel.summary == alex.summary
+
+
+def test_context_sends_task_summary_and_recent_window():
+    context = RollingSummaryContext(_client(), keep_messages=4)
+
+    async def run():
+        await _run_dialogue({"Samuel": context}, turns=10)
+        await context.add_message(SystemMessage(content="retrieved passage"))
+        return await context.get_messages()
+
+    messages = asyncio.run(run())
+
+    assert messages[0].content == "Record an episode about habits."
+    assert messages[1].content.startswith("Summary of the earlier conversation:")
+    # 摘要已追上时只原样发送最近 keep_messages 条，再加上本轮检索段落
+    assert [m.content for m in messages[2:-1]] == [f"turn {i}: habits compound" for i in range(6, 10)]
+    assert messages[-1].content == "retrieved passage"
+
+
+def test_concurrent_requests_for_the_same_history_share_one_call():
+    summarizer = ConversationSummarizer(_client())
+    history = [UserMessage(content=f"turn {i}", source=HOSTS[i % 2]) for i in range(4)]
+
+    async def run():
+        return await asyncio.gather(summarizer.summarize(history), summarizer.summarize(list(history)))
+
+    first, second = asyncio.run(run())
+
+    assert first == second == "summary 0"
+    assert summarizer.requests == 1
@@ -0,0 +1,93 @@
+import json
+
+import pytest
+
+from core_topics import CoreTopics, IncrementalJSONParser, parse_partial_json
+
+DOCUMENT = {
+    "core_topics": [
+        {"core_topic": "Habits \"compound\"", "explanation": "Tiny gains: 1% → 37× a year\nline two",
+         "transition": "Next, \\ identity", "logical_structure": "story → data", "duration_minutes": 2.5},
+        {"core_topic": "身份认同", "explanation": "习惯塑造自我 é中", "duration_minutes": 3,
+         "tags": [True, False, None, -1.5e3, []], "nested": {"a": {"b": [1, {"c": "d"}]}}},
+    ],
+    "summary": "An episode about habits.",
+}
+TEXT = "```json\n" + json.dumps(DOCUMENT, ensure_ascii=False, indent=2) + "\n```\nThat's all."
+
+
+def _is_prefix(partial, full) -> bool:
+    """partial 是否是 full 的前缀：字符串为前缀，容器的内容逐项为前缀，其余值相等"""
+    if isinstance(full, dict):
+        return (isinstance(partial, dict) and list(partial) == list(full)[:len(partial)]
+                and all(_is_prefix(value, full[key]) for key, value in partial.items()))
+    if isinstance(full, list):
+        return (isinstance(partial, list) and len(partial) <= len(full)
+                and all(_is_prefix(a, b) for a, b in zip(partial, full)))
+    if isinstance(full, str):
+        return isinstance(partial, str) and full.startswith(partial)
+    return type(partial) is type(full) and partial == full
+
+
+def _repairs():
+    start = TEXT.index("{")
+    for i in range(start + 1, len(TEXT) + 1):
+        parser = IncrementalJSONParser()
+        parser.feed(TEXT[:i])
+        yield i, parser
+
+
+def test_every_truncation_repairs_to_a_valid_prefix():
+    for i, parser in _repairs():
+        value = json.loads(parser.repair())
+        assert _is_prefix(value, DOCUMENT), (i, parser.repair())
+
+
+def test_repaired_prefixes_grow_monotonically():
+    previous = {}
+    for i, parser in _repairs():
+        value = parser.parse()
+        assert _is_prefix(previous, value), (i, previous, value)
+        previous = value
+    assert previous == DOCUMENT
+
+
+def test_incremental_feeding_matches_parsing_the_prefix():
+    parser = IncrementalJSONParser()
+    for i, char in enumerate(TEXT, 1):
+        parser.feed(char)
+        if i > TEXT.index("{"):
+            fresh = IncrementalJSONParser()
+            fresh.feed(TEXT[:i])
+            assert parser.repair() == fresh.repair(), i
+
+
+def test_complete_document_ignores_fence_and_trailing_text():
+    parser = IncrementalJSONParser()
+    parser.feed(TEXT)
+
+    assert parser.complete
+    assert parser.parse() == DOCUMENT
+
+
+def test_incomplete_values_are_dropped_but_open_strings_are_kept():
+    assert parse_partial_json('{"a": 12') == {}
+    assert parse_partial_json('{"a": 12, "b": tr') == {"a": 12}
+    assert parse_partial_json('{"a": "hel') == {"a": "hel"}
+    assert parse_partial_json('{"a": "x\\u00') == {"a": "x"}
+    assert parse_partial_json('{"a": "x\\') == {"a": "x"}
+    assert parse_partial_json('{"ke') == {}
+    assert parse_partial_json('[1, [2, 3], {"k": ') == [1, [2, 3], {}]
+
+
+def test_text_without_json_raises():
+    with pytest.raises(ValueError):
+        parse_partial_json("I cannot help with that.")
+
+
+def test_core_topics_from_truncated_output():
+    topics = CoreTopics.from_json(TEXT[:TEXT.index("身份认同") + 2], duration_minutes=5)
+
+    assert [topic.core_topic for topic in topics.core_topics] == ['Habits "compound"', "身份"]
+    assert topics.core_topics[0].duration_minutes == 2.5
+    assert topics.core_topics[1].duration_minutes is None
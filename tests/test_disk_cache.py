@@ -0,0 +1,25 @@
+from disk_cache import DiskCache
+
+
+def test_overwriting_a_key_does_not_inflate_total_size(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=100)
+    cache.put("a" * 64, b"x" * 40)
+    cache.put("b" * 64, b"y" * 40)
+
+    for _ in range(10):
+        cache.put("a" * 64, b"z" * 40)
+
+    assert cache._total_bytes == 80
+    assert cache.get("a" * 64) == b"z" * 40
+    assert cache.get("b" * 64) == b"y" * 40
+
+
+def test_eviction_still_applies_when_entries_grow(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=100)
+    cache.put("a" * 64, b"x" * 40)
+    cache.put("b" * 64, b"y" * 40)
+
+    cache.put("b" * 64, b"y" * 70)
+
+    assert cache._total_bytes <= 100
+    assert cache.get("b" * 64) == b"y" * 70
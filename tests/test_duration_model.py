@@ -0,0 +1,60 @@
+import pytest
+
+from duration_model import CalibrationSample, DurationModel, PRIOR_WORDS
+from transcript import SegmentTable
+from tts_planner import plan_tts_requests
+
+VOICES = ("voice-a", "voice-b")
+
+
+def _words(n):
+    return " ".join(["word"] * n)
+
+
+def test_single_emotion_request_calibrates_its_emotion():
+    model = DurationModel(words_per_minute=120)
+
+    model.calibrate([
+        CalibrationSample("Samuel", [(60, None)], 30.0),
+        CalibrationSample("Samuel", [(60, "兴奋")], 20.0),
+    ])
+
+    assert model.factor("兴奋") < 1.0
+    assert model.emotion_factors["兴奋"][1] == PRIOR_WORDS + 60
+
+
+def test_mixed_emotion_request_calibrates_only_the_speaker_rate():
+    model = DurationModel(words_per_minute=120, emotion_factors={"兴奋": [0.8, 500], "激动": [1.2, 500]})
+
+    model.calibrate([CalibrationSample("Samuel", [(30, "兴奋"), (30, "激动")], 40.0)])
+
+    # 合并请求里两种情绪各占多少时长无从得知，情绪系数保持不变
+    assert model.emotion_factors == {"兴奋": [0.8, 500], "激动": [1.2, 500]}
+    assert model.rate("Samuel") < 120
+    assert model.estimate(60, "Samuel") == pytest.approx(60 * 60.0 / model.rate("Samuel"))
+
+
+def test_short_and_empty_requests_are_ignored():
+    model = DurationModel(words_per_minute=120)
+
+    model.calibrate([CalibrationSample("Samuel", [(2, None)], 5.0), CalibrationSample("Alex", [(40, None)], 0.0)])
+
+    assert model.total_words == 0
+    assert model.speaker_rates == {}
+
+
+def test_planner_reports_samples_per_request():
+    table = SegmentTable(DurationModel())
+    table.append("Samuel", 0, "兴奋", _words(10))
+    table.append("Samuel", 0, "激动", _words(20))
+    table.append("Alex", 1, None, _words(15))
+    planner = plan_tts_requests(table, VOICES)
+
+    samples = planner.request_samples([(0.0, 9000.0), (9500.0, 15500.0)])
+
+    assert [(s.speaker, s.parts, s.seconds) for s in samples] == [
+        ("Samuel", [(10, "兴奋"), (20, "激动")], 9.0),
+        ("Alex", [(15, None)], 6.0),
+    ]
+    assert samples[0].emotion is None
+    assert samples[1].words == 15
@@ -0,0 +1,115 @@
+import asyncio
+import json
+from typing import Any, List, Optional
+
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate
+
+import main1
+from llm_cache import DiskLLMCache, acached_stream, cached_stream
+from streaming import astream_to_file, stream_to_file
+
+REPLY = "Edith: Hello there.\nChloe: Hi!\nEdith: Let's begin.\n"
+
+
+class CountingStreamModel(GenericFakeChatModel):
+    """与 ScheduledChatOpenAI 一样经 cached_stream 流式输出的假模型，记录真正发出的请求数"""
+
+    requests: int = 0
+
+    def _stream(self, messages: List[Any], stop: Optional[List[str]] = None, run_manager: Any = None,
+                **kwargs: Any):
+        def open_stream():
+            self.requests += 1
+            return super(CountingStreamModel, self)._stream(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+        yield from cached_stream(self, messages, stop, kwargs, open_stream)
+
+    async def _astream(self, messages: List[Any], stop: Optional[List[str]] = None, run_manager: Any = None,
+                       **kwargs: Any):
+        async def open_stream():
+            self.requests += 1
+            for chunk in GenericFakeChatModel._stream(self, messages, stop=stop, **kwargs):
+                yield chunk
+
+        async for chunk in acached_stream(self, messages, stop, kwargs, open_stream):
+            yield chunk
+
+
+def _chain(model):
+    return ChatPromptTemplate.from_template("Write a script about {topic}") | model | StrOutputParser()
+
+
+def _model(tmp_path, replies: int = 3):
+    return CountingStreamModel(messages=iter([REPLY] * replies), cache=DiskLLMCache(str(tmp_path / "llm")))
+
+
+def test_streamed_output_is_cached_and_replayed(tmp_path):
+    model = _model(tmp_path)
+    chain = _chain(model)
+
+    first, _ = stream_to_file(chain, {"topic": "habits"}, str(tmp_path / "a.txt"), echo=False)
+    second, _ = stream_to_file(chain, {"topic": "habits"}, str(tmp_path / "b.txt"), echo=False)
+
+    assert first == second == REPLY
+    assert model.requests == 1
+    assert (tmp_path / "b.txt").read_text(encoding="utf-8") == REPLY
+
+
+def test_async_stream_is_cached(tmp_path):
+    model = _model(tmp_path)
+    chain = _chain(model)
+
+    first, _ = asyncio.run(astream_to_file(chain, {"topic": "habits"}, str(tmp_path / "a.txt"), echo=False))
+    second, _ = asyncio.run(astream_to_file(chain, {"topic": "habits"}, str(tmp_path / "b.txt"), echo=False))
+
+    assert first == second == REPLY
+    assert model.requests == 1
+
+
+def test_stream_and_invoke_share_cache_entries(tmp_path):
+    model = _model(tmp_path)
+    chain = _chain(model)
+
+    streamed = "".join(chain.stream({"topic": "habits"}))
+
+    assert chain.invoke({"topic": "habits"}) == streamed
+    assert model.requests == 1
+
+
+def test_different_inputs_are_not_served_from_cache(tmp_path):
+    model = _model(tmp_path)
+    chain = _chain(model)
+
+    "".join(chain.stream({"topic": "habits"}))
+    "".join(chain.stream({"topic": "sleep"}))
+
+    assert model.requests == 2
+
+
+def test_stream_closed_early_is_not_cached(tmp_path):
+    model = _model(tmp_path)
+
+    stream = model.stream("Write a script about habits")
+    next(stream)
+    stream.close()
+    full = "".join(chunk.content for chunk in model.stream("Write a script about habits"))
+
+    assert full == REPLY
+    assert model.requests == 2
+
+
+def test_core_topics_are_served_from_cache_on_rerun(tmp_path, monkeypatch):
+    reply = json.dumps({"core_topics": [{"core_topic": "Habits", "explanation": "Why they stick",
+                                         "duration_minutes": 3}], "summary": "About habits."})
+    model = CountingStreamModel(messages=iter([reply] * 2), cache=DiskLLMCache(str(tmp_path / "llm")))
+    monkeypatch.setattr(main1, "get_deepseek_model", lambda: model)
+    monkeypatch.setattr(main1, "CORE_TOPICS_PATH", str(tmp_path / "core_topics" / "core_topics.json"))
+
+    first = main1.generate_core_topics("habits", "A book about habits.", 3)
+    second = main1.generate_core_topics("habits", "A book about habits.", 3)
+
+    assert first.to_dict() == second.to_dict()
+    assert first.core_topics[0].core_topic == "Habits"
+    assert model.requests == 1
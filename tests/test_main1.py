@@ -0,0 +1,240 @@
+import io
+import os
+import re
+import time
+import wave
+import struct
+import asyncio
+import threading
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+
+import duration_model
+import main1
+import podcast_audio
+from core_topics import CoreTopics
+from duration_model import DurationModel
+from podcast_audio import AudioSegmentCache, TTSWorkerPool, assemble_podcast
+
+
+def _line(speaker, words, last="done."):
+    return f"{speaker} : " + " ".join(["word"] * (words - 1) + [last])
+
+
+CLOSING = main1.CLOSING_TEMPLATE.format(SPEAKER_1=main1.SPEAKER_1, SPEAKER_2=main1.SPEAKER_2)
+
+
+@pytest.fixture(autouse=True)
+def isolated(tmp_path, monkeypatch):
+    # 120 词/分钟：每词 0.5 秒，便于推算预算
+    monkeypatch.setattr(duration_model, "_model", DurationModel(words_per_minute=120))
+    monkeypatch.setattr(main1, "TRANSCRIPT_PATH", str(tmp_path / "transcript.txt"))
+
+
+def _use_replies(monkeypatch, *replies):
+    model = GenericFakeChatModel(messages=iter(replies))
+    monkeypatch.setattr(main1, "get_gemini_model", lambda: model)
+
+
+def _topics(minutes=1):
+    return CoreTopics.from_dict({"core_topics": [{"core_topic": "Habits", "duration_minutes": minutes}]}, minutes)
+
+
+def _dialogue_lines(transcript):
+    return [line for line in transcript.splitlines() if re.match(r"\s*(Edith|Chloe)\s*:", line)]
+
+
+def test_over_budget_inside_model_closing_keeps_a_single_closing(monkeypatch):
+    body = "\n".join(_line("Edith" if i % 2 == 0 else "Chloe", 25) for i in range(4))
+    own_closing = "****** closing ******\n" + _line("Edith", 30, "bye.") + "\n" + _line("Chloe", 30, "bye.") + "\n"
+    _use_replies(monkeypatch, "****** opening ******\n" + body + "\n\n" + own_closing)
+
+    transcript = main1.generate_podcast_transcript("summary", _topics(), "profiles")
+
+    assert len(main1.CLOSING_MARKER.findall(transcript)) == 1
+    assert transcript.rstrip().endswith(CLOSING.rstrip())
+    assert "bye." not in transcript
+    assert body in transcript
+    table = main1.parse_transcript(transcript)
+    assert [segment.section for segment in table].count("closing") == 2
+
+
+def test_extension_stopped_over_budget_drops_its_partial_line(monkeypatch):
+    short = "\n".join(_line("Edith" if i % 2 == 0 else "Chloe", 20) for i in range(2))
+    extension = "\n".join(_line("Chloe" if i % 2 == 0 else "Edith", 10) for i in range(20)) + "\n"
+    _use_replies(monkeypatch, short + "\n\n****** closing ******\nEdith : Bye now.\n", extension)
+
+    transcript = main1.generate_podcast_transcript("summary", _topics(), "profiles")
+
+    assert len(main1.CLOSING_MARKER.findall(transcript)) == 1
+    assert transcript.rstrip().endswith(CLOSING.rstrip())
+    assert "Bye now." not in transcript
+    lines = _dialogue_lines(transcript.split("****** closing")[0])
+    assert len(lines) > 2
+    assert all(line.endswith("done.") for line in lines)
+    with open(main1.TRANSCRIPT_PATH, encoding="utf-8") as f:
+        assert f.read() == transcript
+
+
+WORD_MS = 20
+
+
+class FakeTTS:
+    """按词数生成定长 wav 的假 TTS 后端；越长的文本返回得越慢，使完成顺序与脚本顺序不同"""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.texts = []
+        self._lock = threading.Lock()
+
+    def __call__(self, text, voice, model, stability, similarity_boost):
+        with self._lock:
+            self.texts.append(text)
+        if self.fail_on and self.fail_on in text:
+            raise ValueError("voice not found")
+        words = len(text.split())
+        time.sleep(words * 0.001)
+        frames = WORD_MS * words * 16
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as f:
+            f.setnchannels(1)
+            f.setsampwidth(2)
+            f.setframerate(16000)
+            f.writeframes(struct.pack("<h", 1000) * frames)
+        return buffer.getvalue()
+
+
+@pytest.fixture
+def audio(tmp_path, monkeypatch):
+    """假 TTS 工作池与 .wav 缓存；记录拼接结果与校准样本，不写入共享时长模型"""
+    recorded = {}
+
+    def record_assembly(audio_files, speakers, output_path):
+        recorded["speakers"] = speakers
+        recorded["timestamps"] = assemble_podcast(audio_files, speakers, output_path)
+        return recorded["timestamps"]
+
+    monkeypatch.setattr(main1, "assemble_podcast", record_assembly)
+    monkeypatch.setattr(main1, "calibrate_duration_model", lambda samples: recorded.setdefault("samples", samples))
+
+    def run(reply, tts):
+        _use_replies(monkeypatch, reply)
+        pool = TTSWorkerPool(tts=tts, concurrency=4, base_delay=0.01)
+        cache = AudioSegmentCache(str(tmp_path / "audio"), suffix=".wav")
+        try:
+            result = asyncio.run(main1.stream_podcast_audio(
+                "summary", _topics(), "profiles", str(tmp_path / "episode.wav"), tts_pool=pool, audio_cache=cache))
+        finally:
+            pool.close()
+        return result, recorded
+
+    return run
+
+
+def test_stream_podcast_audio_assembles_requests_in_script_order(audio):
+    # 台词越靠前越长，合成完成的顺序与脚本顺序相反
+    lines = [_line("Edith" if i % 2 == 0 else "Chloe", 12 - 2 * i, f"line{i}.") for i in range(4)]
+    closing = "****** closing ******\n" + _line("Edith", 3, "bye.") + "\n"
+    tts = FakeTTS()
+
+    result, recorded = audio("****** opening ******\n" + "\n".join(lines) + "\n\n" + closing, tts)
+
+    assert "bye." in result["transcript"]
+    assert recorded["speakers"] == ["Edith", "Chloe", "Edith", "Chloe", "Edith"]
+    # 每个请求的实测时长与其词数对应，说明音频按脚本顺序拼接
+    assert [round(sample.seconds * 1000 / WORD_MS) for sample in recorded["samples"]] == [12, 10, 8, 6, 3]
+    # 模型自己的结尾在生成结束后才合成
+    assert tts.texts[-1].endswith("bye.")
+    timestamps = recorded["timestamps"]
+    gaps = [start - end for (_, end), (start, _) in zip(timestamps, timestamps[1:])]
+    assert gaps == [pytest.approx(podcast_audio.SPEAKER_CHANGE_PAUSE_MS, abs=1)] * 4
+    assert timestamps[0][0] == 0
+
+
+def test_stream_podcast_audio_replaces_model_closing_over_budget(audio):
+    body = "\n".join(_line("Edith" if i % 2 == 0 else "Chloe", 25) for i in range(4))
+    own_closing = "****** closing ******\n" + _line("Edith", 30, "bye.") + "\n" + _line("Chloe", 30, "bye.") + "\n"
+    tts = FakeTTS()
+
+    result, _ = audio("****** opening ******\n" + body + "\n\n" + own_closing, tts)
+
+    assert len(main1.CLOSING_MARKER.findall(result["transcript"])) == 1
+    assert not any("bye." in text for text in tts.texts)
+    # 固定结尾的每句台词都已合成
+    synthesized = " ".join(tts.texts)
+    assert all(line.split(":", 1)[1].strip() in synthesized for line in _dialogue_lines(CLOSING))
+
+
+def test_stream_podcast_audio_propagates_tts_errors(audio):
+    lines = "\n".join(_line("Edith" if i % 2 == 0 else "Chloe", 5, f"line{i}.") for i in range(4))
+    tts = FakeTTS(fail_on="line1.")
+
+    with pytest.raises(ValueError, match="voice not found"):
+        audio(lines + "\n", tts)
+    # 非限流错误不重试
+    assert sum("line1." in text for text in tts.texts) == 1
+
+
+class FakeSectionChain:
+    """假分段链：靠前的话题返回得更慢，并记录同时在途的调用数"""
+
+    def __init__(self, fail_on=None):
+        self.fail_on = fail_on
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.inputs = []
+
+    async def ainvoke(self, inputs):
+        self.inputs.append(inputs)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            position = int(inputs["position"].split()[1])
+            await asyncio.sleep(0.05 / position)
+            if inputs["core_topic"] == self.fail_on:
+                raise RuntimeError("section failed")
+            return f"\n****** {inputs['core_topic']} ******\nEdith : Let's talk about {inputs['core_topic']}.\n\n"
+        finally:
+            self.in_flight -= 1
+
+
+def _segmented_topics(names):
+    data = {"core_topics": [{"core_topic": name, "duration_minutes": 2, "transition": f"after {name}"} for name in names],
+            "summary": "A book about habits."}
+    return CoreTopics.from_dict(data, 2 * len(names))
+
+
+def test_segmented_transcript_keeps_topic_order(monkeypatch):
+    chain = FakeSectionChain()
+    monkeypatch.setattr(main1, "build_section_chain", lambda: chain)
+    names = ["Cue", "Craving", "Response", "Reward"]
+
+    transcript = asyncio.run(main1.agenerate_segmented_transcript("summary", _segmented_topics(names), "profiles"))
+
+    assert chain.max_in_flight == len(names)
+    headers = re.findall(r"\*{6} (.+?) \*{6}", transcript)
+    assert headers == ["opening"] + names + ["closing"]
+    assert "A book about habits." in transcript
+    assert transcript.rstrip().endswith(CLOSING.rstrip())
+    # 相邻话题经 transition 衔接
+    by_topic = {inputs["core_topic"]: inputs for inputs in chain.inputs}
+    assert by_topic["Craving"]["previous_transition"] == "after Cue"
+    assert by_topic["Reward"]["transition"].startswith("This is the last topic")
+    with open(main1.TRANSCRIPT_PATH, encoding="utf-8") as f:
+        assert f.read() == transcript
+
+
+def test_segmented_transcript_propagates_section_failure(monkeypatch):
+    monkeypatch.setattr(main1, "build_section_chain", lambda: FakeSectionChain(fail_on="Craving"))
+
+    with pytest.raises(RuntimeError, match="section failed"):
+        asyncio.run(main1.agenerate_segmented_transcript("summary", _segmented_topics(["Cue", "Craving"]), "profiles"))
+    assert not os.path.exists(main1.TRANSCRIPT_PATH)
+
+
+def test_segmented_transcript_requires_topics(monkeypatch):
+    monkeypatch.setattr(main1, "build_section_chain", lambda: FakeSectionChain())
+
+    with pytest.raises(ValueError):
+        asyncio.run(main1.agenerate_segmented_transcript("summary", _segmented_topics([]), "profiles"))
@@ -0,0 +1,165 @@
+import io
+import time
+import wave
+import struct
+import asyncio
+import threading
+from typing import List
+
+import pytest
+
+import podcast_audio
+from podcast_audio import AudioSegmentCache, TTSWorkerPool
+
+LATENCY = 0.2
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limit(monkeypatch):
+    # 只测并发与顺序，令牌桶限速不参与计时
+    monkeypatch.setattr(podcast_audio, "TTS_REQUESTS_PER_MINUTE", 60000)
+
+
+class FakeTTS:
+    """固定延迟的假 TTS 后端，记录同时在途的最大请求数"""
+
+    def __init__(self, latency: float = LATENCY):
+        self.latency = latency
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, text: str, voice: str, model: str, stability: float, similarity_boost: float) -> bytes:
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.latency)
+        with self._lock:
+            self.in_flight -= 1
+        return f"{voice}:{text}".encode("utf-8")
+
+
+async def _synthesize_all(pool: TTSWorkerPool, texts: List[str]) -> List[bytes]:
+    return await asyncio.gather(*(pool.synthesize(text, "voice") for text in texts))
+
+
+def _run(concurrency: int, texts: List[str]):
+    tts = FakeTTS()
+    pool = TTSWorkerPool(tts=tts, concurrency=concurrency)
+    try:
+        start = time.perf_counter()
+        results = asyncio.run(_synthesize_all(pool, texts))
+        return results, time.perf_counter() - start, tts
+    finally:
+        pool.close()
+
+
+def test_segments_are_synthesized_concurrently_in_order():
+    texts = [f"line {i}" for i in range(8)]
+
+    results, seconds, tts = _run(concurrency=4, texts=texts)
+
+    assert results == [f"voice:line {i}".encode("utf-8") for i in range(8)]
+    assert tts.max_in_flight == 4
+    assert seconds < len(texts) * LATENCY / 2
+
+
+def test_each_pool_uses_its_own_size():
+    texts = [f"line {i}" for i in range(4)]
+
+    _, serial_seconds, serial_tts = _run(concurrency=1, texts=texts)
+    _, parallel_seconds, parallel_tts = _run(concurrency=4, texts=texts)
+
+    assert serial_tts.max_in_flight == 1
+    assert serial_seconds >= len(texts) * LATENCY
+    # 先创建的小池不会限制后创建的池
+    assert parallel_tts.max_in_flight == 4
+    assert parallel_seconds < 2 * LATENCY
+
+
+def test_cache_returns_paths_in_request_order(tmp_path):
+    tts = FakeTTS(latency=0.05)
+    pool = TTSWorkerPool(tts=tts, concurrency=4)
+    cache = AudioSegmentCache(str(tmp_path))
+    texts = ["a", "b", "a", "c"]
+
+    async def render():
+        return await asyncio.gather(*(cache.synthesize(pool, text=text, voice="voice") for text in texts))
+
+    try:
+        paths = asyncio.run(render())
+    finally:
+        pool.close()
+
+    assert [path.read_bytes() for path in paths] == [f"voice:{text}".encode("utf-8") for text in texts]
+    # 并发的相同内容只合成一次
+    assert cache.misses == 3
+
+
+def _wav_bytes(duration_ms: int, frame_rate: int = 22050, channels: int = 2, amplitude: int = 1000) -> bytes:
+    """生成指定时长的 16 位 PCM wav（与成品参数不同，用于检验转换）"""
+    frames = int(duration_ms * frame_rate / 1000)
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(channels)
+        f.setsampwidth(2)
+        f.setframerate(frame_rate)
+        f.writeframes(struct.pack("<h", amplitude) * frames * channels)
+    return buffer.getvalue()
+
+
+def _read_wav(path):
+    with wave.open(str(path), "rb") as f:
+        return f.getframerate(), f.getnchannels(), f.getsampwidth(), f.readframes(f.getnframes())
+
+
+def test_streaming_writer_wav_round_trip(tmp_path):
+    from pydub import AudioSegment
+
+    clip = AudioSegment.from_file(io.BytesIO(_wav_bytes(250)), format="wav")
+    output = tmp_path / "out" / "episode.wav"
+
+    with podcast_audio.StreamingAudioWriter(str(output)) as writer:
+        assert writer.write_segment(clip) == 250
+        writer.write_silence(2500, block_ms=1000)
+        writer.write_segment(clip)
+        assert writer.duration_ms == pytest.approx(3000, abs=0.1)
+
+    rate, channels, width, data = _read_wav(output)
+    assert (rate, channels, width) == (podcast_audio.OUTPUT_FRAME_RATE, podcast_audio.OUTPUT_CHANNELS,
+                                       podcast_audio.OUTPUT_SAMPLE_WIDTH)
+    samples = struct.unpack(f"<{len(data) // 2}h", data)
+    assert len(samples) == pytest.approx(3 * rate, abs=10)
+    clip_frames = int(0.25 * rate)
+    edge = 10  # 重采样会在片段边界留下几帧过渡
+    # 片段在前、静音居中、片段在后
+    assert all(s != 0 for s in samples[edge:clip_frames - edge])
+    assert all(s == 0 for s in samples[clip_frames + edge:clip_frames + int(2.5 * rate) - edge])
+    assert all(s != 0 for s in samples[-clip_frames + edge:-edge])
+
+
+def test_assemble_podcast_inserts_pauses_and_reports_timestamps(tmp_path):
+    paths = []
+    for i, duration in enumerate([100, 200, 300]):
+        path = tmp_path / f"clip{i}.wav"
+        path.write_bytes(_wav_bytes(duration))
+        paths.append(str(path))
+    output = tmp_path / "episode.wav"
+
+    timestamps = podcast_audio.assemble_podcast(paths, ["Edith", "Edith", "Chloe"], str(output),
+                                                pause_ms=50, speaker_change_pause_ms=400)
+
+    # 同一说话者之间停顿 50 毫秒，换人时 400 毫秒
+    assert timestamps == [pytest.approx(t, abs=0.1) for t in [(0, 100), (150, 350), (750, 1050)]]
+    rate, _, _, data = _read_wav(output)
+    assert len(data) // 2 == pytest.approx(1.05 * rate, abs=10)
+
+
+def test_assemble_podcast_propagates_decode_errors(tmp_path):
+    good = tmp_path / "good.wav"
+    good.write_bytes(_wav_bytes(100))
+    broken = tmp_path / "broken.wav"
+    broken.write_bytes(b"not audio")
+
+    with pytest.raises(Exception):
+        podcast_audio.assemble_podcast([str(good), str(broken)], ["Edith", "Chloe"], str(tmp_path / "out.wav"))
@@ -0,0 +1,127 @@
+import json
+import time
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from rate_limit import RequestScheduler, is_rate_limited, is_retryable
+
+
+class StatusError(Exception):
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def _openai_error(cls, status: int, message: str):
+    response = httpx.Response(status, request=httpx.Request("POST", "https://example.com/v1/chat/completions"))
+    return cls(message, response=response, body=None)
+
+
+def test_status_code_decides_rate_limiting():
+    assert is_rate_limited(StatusError("slow down", 429))
+    assert not is_rate_limited(StatusError("prompt has 4290 tokens, limit 429", 400))
+    assert is_rate_limited(_openai_error(openai.RateLimitError, 429, "Error code: 429"))
+    assert not is_rate_limited(_openai_error(openai.BadRequestError, 400, "context of 429 tokens"))
+
+
+def test_message_is_only_a_fallback_for_known_sdk_errors():
+    assert not is_rate_limited(ValueError("request id req_429 failed"))
+    assert not is_rate_limited(RuntimeError("generated 429 words"))
+    assert is_rate_limited(openai.APIConnectionError(message="Error code: 429 too many requests",
+                                                     request=httpx.Request("GET", "https://example.com")))
+
+
+def test_client_errors_are_not_retried():
+    assert not is_retryable(StatusError("invalid schema", 422))
+    assert is_retryable(StatusError("bad gateway", 502))
+
+
+def test_cancel_during_retry_after_wait_releases_the_slot():
+    scheduler = RequestScheduler("test", requests_per_minute=6000, concurrency=2)
+    scheduler._paused_until = time.monotonic() + 30  # 模拟 Retry-After 暂停
+
+    async def scenario():
+        async def call():
+            return "ok"
+
+        task = asyncio.create_task(scheduler.run(call))
+        await asyncio.sleep(0.05)
+        assert scheduler.governor.in_flight == 1
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(scenario())
+
+    assert scheduler.governor.in_flight == 0
+    assert scheduler.governor.limit == 2
+
+
+def test_cancel_during_wait_releases_the_slot_for_streams():
+    scheduler = RequestScheduler("test-stream", requests_per_minute=6000, concurrency=1)
+    scheduler._paused_until = time.monotonic() + 30
+
+    async def open_stream():
+        yield "chunk"
+
+    async def consume():
+        return [item async for item in scheduler.stream(open_stream)]
+
+    async def scenario():
+        task = asyncio.create_task(consume())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    asyncio.run(scenario())
+
+    assert scheduler.governor.in_flight == 0
+
+
+def test_only_transient_errors_without_status_are_retried():
+    request = httpx.Request("POST", "https://example.com")
+    assert is_retryable(openai.APIConnectionError(request=request))
+    assert is_retryable(openai.APITimeoutError(request=request))
+    assert is_retryable(httpx.ReadTimeout("timed out", request=request))
+    assert is_retryable(ConnectionResetError())
+    assert is_retryable(asyncio.TimeoutError())
+    assert not is_retryable(ValueError("bad argument"))
+    assert not is_retryable(TypeError("missing argument"))
+    assert not is_retryable(json.JSONDecodeError("Expecting value", "", 0))
+
+
+def test_plain_error_fails_on_first_attempt():
+    scheduler = RequestScheduler("test", requests_per_minute=6000, concurrency=2, base_delay=0.01)
+    calls = []
+
+    def call():
+        calls.append(1)
+        raise ValueError("invalid voice settings")
+
+    with pytest.raises(ValueError):
+        scheduler.run_sync(call)
+
+    assert len(calls) == 1
+    assert scheduler.governor.in_flight == 0
+
+
+def test_connection_error_is_retried():
+    scheduler = RequestScheduler("test", requests_per_minute=6000, concurrency=2, base_delay=0.01)
+    calls = []
+
+    def call():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionResetError("connection reset")
+        return "ok"
+
+    assert scheduler.run_sync(call) == "ok"
+    assert len(calls) == 3
@@ -0,0 +1,55 @@
+import asyncio
+
+from autogen_core.model_context import BufferedChatCompletionContext, UnboundedChatCompletionContext
+from autogen_core.models import AssistantMessage, SystemMessage, UserMessage
+
+from retrieval_memory import BM25Index, RETRIEVAL_HEADER, RetrievalMemory
+
+PASSAGES = [
+    {"source": "Atomic Habits", "text": "Habits compound over time like interest."},
+    {"source": "Why We Sleep", "text": "Sleep consolidates memory and learning."},
+]
+
+
+def _retrieval_messages(messages):
+    return [m for m in messages if isinstance(m, SystemMessage) and m.content.startswith(RETRIEVAL_HEADER)]
+
+
+def _run_turns(context, turns):
+    memory = RetrievalMemory(BM25Index(PASSAGES), top_k=1)
+
+    async def run():
+        for i, text in enumerate(turns):
+            await context.add_message(UserMessage(content=text, source="Alex"))
+            await memory.update_context(context)
+            await context.add_message(AssistantMessage(content=f"reply {i}", source="Samuel"))
+        return await context.get_messages()
+
+    return asyncio.run(run())
+
+
+def test_update_context_replaces_previous_retrieval_message():
+    context = UnboundedChatCompletionContext()
+    messages = _run_turns(context, ["Tell me about habits", "What about sleep?", "And habits again"])
+
+    retrieved = _retrieval_messages(messages)
+    assert len(retrieved) == 1
+    assert "Atomic Habits" in retrieved[0].content
+    assert [m.content for m in messages if not isinstance(m, SystemMessage)] == [
+        "Tell me about habits", "reply 0", "What about sleep?", "reply 1", "And habits again", "reply 2"]
+
+
+def test_stale_retrieval_message_is_dropped_when_nothing_matches():
+    context = UnboundedChatCompletionContext()
+    messages = _run_turns(context, ["What about sleep?", "zzz"])
+
+    assert _retrieval_messages(messages) == []
+
+
+def test_retrieval_messages_do_not_accumulate_outside_the_buffer():
+    context = BufferedChatCompletionContext(buffer_size=2)
+    _run_turns(context, ["habits", "sleep", "habits", "sleep"])
+
+    state = asyncio.run(context.save_state())
+    assert sum(m["type"] == "SystemMessage" for m in state["messages"]) == 1
+    assert len(state["messages"]) == 9
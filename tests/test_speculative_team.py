@@ -0,0 +1,86 @@
+import asyncio
+
+from autogen_agentchat.agents import AssistantAgent
+from autogen_agentchat.conditions import MaxMessageTermination
+from autogen_ext.models.replay import ReplayChatCompletionClient
+
+from speculative_team import SpeculativeTeamRunner, _Turn
+
+PREFIX = "Habits compound over time. Small changes add up."
+
+
+def _agent(name):
+    return AssistantAgent(name, model_client=ReplayChatCompletionClient(["ok"]), model_client_stream=True)
+
+
+def _runner():
+    return SpeculativeTeamRunner([_agent("Alex"), _agent("Samuel")], MaxMessageTermination(4), prefetch_min_words=1)
+
+
+def _speculation(prefix=PREFIX):
+    return _Turn(_agent("Samuel"), [], prefix=prefix)
+
+
+def test_accepts_only_the_exact_prefix():
+    runner = _runner()
+
+    assert runner._accept(_speculation(), PREFIX)
+    assert runner._accept(_speculation(), PREFIX + "\n")
+    assert not runner._accept(_speculation(), PREFIX + " But not always.")
+    assert not runner._accept(_speculation(), PREFIX + " No.")
+    assert not runner._accept(None, PREFIX)
+
+
+def test_prefetches_at_most_once_per_turn():
+    runner = _runner()
+    agent = runner.agents[0]
+    speculation = _speculation()
+
+    assert runner._should_prefetch(agent, PREFIX, None)
+    assert not runner._should_prefetch(agent, PREFIX, speculation)
+    assert not runner._should_prefetch(agent, PREFIX + " But not always.", speculation)
+
+
+class CountingReplayClient(ReplayChatCompletionClient):
+    """逐块流式输出（每块之间让出事件循环），并记录发起的请求数"""
+
+    def __init__(self, replies):
+        super().__init__(replies)
+        self.requests = 0
+
+    async def create_stream(self, messages, **kwargs):
+        self.requests += 1
+        async for chunk in super().create_stream(messages, **kwargs):
+            await asyncio.sleep(0.005)
+            yield chunk
+
+
+def _run_episode(first_reply):
+    alex_client = CountingReplayClient([first_reply] + ["Alex again."] * 5)
+    samuel_client = CountingReplayClient(["Samuel replies."] * 5)
+    agents = [AssistantAgent("Alex", model_client=alex_client, model_client_stream=True),
+              AssistantAgent("Samuel", model_client=samuel_client, model_client_stream=True)]
+    runner = SpeculativeTeamRunner(agents, MaxMessageTermination(3), prefetch_min_words=1)
+    result = asyncio.run(runner.run("Start the episode."))
+    return result, alex_client.requests, samuel_client.requests
+
+
+def test_multi_sentence_reply_triggers_a_single_prefetch():
+    result, alex_requests, samuel_requests = _run_episode(
+        "One two three. Four five six. Seven eight nine. Ten eleven twelve.")
+
+    # Samuel：一次被丢弃的预取 + 一次用完整文本的正式请求；
+    # Alex：第一轮 + Samuel 发言时的一次预取（对话随即结束，被丢弃）
+    assert samuel_requests == 2
+    assert alex_requests == 2
+    assert result["stats"].accepted == 0
+    assert [m.to_text() for m in result["messages"][1:]] == [
+        "One two three. Four five six. Seven eight nine. Ten eleven twelve.", "Samuel replies."]
+
+
+def test_prefetch_of_the_complete_reply_is_accepted():
+    result, _, samuel_requests = _run_episode("Just one sentence here.")
+
+    assert samuel_requests == 1
+    assert result["stats"].accepted == 1
+    assert result["messages"][-1].to_text() == "Samuel replies."
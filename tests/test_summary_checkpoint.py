@@ -0,0 +1,89 @@
+import json
+
+from summary_checkpoint import SummaryCheckpoint
+
+
+def test_same_filename_in_different_directories_does_not_collide(tmp_path):
+    checkpoint = SummaryCheckpoint(str(tmp_path / "manifest.json"))
+    first, second = str(tmp_path / "a" / "book.pdf"), str(tmp_path / "b" / "book.pdf")
+    checkpoint.set_book_chunks(first, "hash-a", [])
+    checkpoint.set_book_chunks(second, "hash-b", [])
+    checkpoint.set_book_summary(first, "hash-a", 100, "summary a")
+    checkpoint.set_book_summary(second, "hash-b", 100, "summary b")
+
+    reloaded = SummaryCheckpoint(str(tmp_path / "manifest.json"))
+
+    assert reloaded.get_book_summary(first, "hash-a", 100) == "summary a"
+    assert reloaded.get_book_summary(second, "hash-b", 100) == "summary b"
+
+
+def test_chunk_summaries_are_journaled_and_replayed(tmp_path):
+    manifest = tmp_path / "manifest.json"
+    checkpoint = SummaryCheckpoint(str(manifest))
+    keys = [checkpoint.chunk_key(f"chunk {i}", 100) for i in range(3)]
+    checkpoint.set_book_chunks("book.pdf", "hash", keys)
+    checkpoint.save()
+    manifest_before = manifest.read_text(encoding="utf-8")
+
+    for i, key in enumerate(keys):
+        checkpoint.set_chunk_summary(key, f"summary {i}")
+
+    # 逐块只追加日志，不重写清单
+    assert manifest.read_text(encoding="utf-8") == manifest_before
+    resumed = SummaryCheckpoint(str(manifest))
+    assert [resumed.get_chunk_summary(key) for key in keys] == ["summary 0", "summary 1", "summary 2"]
+
+    resumed.save()
+    assert not resumed.journal_path.exists()
+    assert len(json.loads(manifest.read_text(encoding="utf-8"))["chunks"]) == 3
+
+
+def test_truncated_journal_line_is_ignored(tmp_path):
+    checkpoint = SummaryCheckpoint(str(tmp_path / "manifest.json"))
+    checkpoint.set_chunk_summary("k1", "summary 1")
+    with open(checkpoint.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"key": "k2", "summ')
+
+    resumed = SummaryCheckpoint(str(tmp_path / "manifest.json"))
+
+    assert resumed.get_chunk_summary("k1") == "summary 1"
+    assert resumed.get_chunk_summary("k2") is None
+
+
+def test_changed_pdf_reuses_unchanged_chunks_and_drops_the_old_version(tmp_path):
+    checkpoint = SummaryCheckpoint(str(tmp_path / "manifest.json"))
+    checkpoint.set_book_chunks("book.pdf", "v1", ["same", "old"])
+    checkpoint.set_chunk_summary("same", "kept")
+    checkpoint.set_chunk_summary("old", "dropped")
+    checkpoint.set_book_summary("book.pdf", "v1", 100, "summary v1")
+
+    checkpoint.set_book_chunks("book.pdf", "v2", ["same", "new"])
+    checkpoint.save()
+
+    assert checkpoint.get_chunk_summary("same") == "kept"
+    assert checkpoint.get_chunk_summary("old") is None
+    assert checkpoint.get_book_summary("book.pdf", "v1", 100) is None
+    assert len(checkpoint.data["books"]) == 1
+
+
+def test_crashed_book_survives_a_run_of_another_book(tmp_path):
+    manifest = str(tmp_path / "manifest.json")
+    # 第一次运行：A 总结了两块后中断，没有 save
+    crashed = SummaryCheckpoint(manifest)
+    keys_a = [crashed.chunk_key(f"a {i}", 100) for i in range(3)]
+    crashed.set_book_chunks("a.pdf", "hash-a", keys_a)
+    crashed.set_chunk_summary(keys_a[0], "a0")
+    crashed.set_chunk_summary(keys_a[1], "a1")
+
+    # 第二次运行只处理 B，完成后 save 会清理无人引用的块总结
+    other = SummaryCheckpoint(manifest)
+    keys_b = [other.chunk_key("b 0", 100)]
+    other.set_book_chunks("b.pdf", "hash-b", keys_b)
+    other.set_chunk_summary(keys_b[0], "b0")
+    other.set_book_summary("b.pdf", "hash-b", 100, "summary b")
+
+    # 第三次运行恢复 A：已完成的两块仍在
+    resumed = SummaryCheckpoint(manifest)
+    resumed.set_book_chunks("a.pdf", "hash-a", keys_a)
+    assert [resumed.get_chunk_summary(key) for key in keys_a] == ["a0", "a1", None]
+    assert resumed.get_book_summary("b.pdf", "hash-b", 100) == "summary b"
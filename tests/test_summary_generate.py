@@ -0,0 +1,102 @@
+import time
+import asyncio
+from typing import Any, List, Optional, Tuple
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+import summary_generate
+from summary_generate import build_summarize_chain, summarize_chunks_concurrently
+
+LATENCY = 0.1
+
+
+class SlowEchoChatModel(BaseChatModel):
+    """固定延迟的假模型，原样返回提示词中 "文本内容:" 之后的第一行"""
+
+    latency: float = LATENCY
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-echo"
+
+    def _reply(self, messages: List[BaseMessage]) -> ChatResult:
+        self.calls += 1
+        text = messages[-1].content.split("文本内容:")[-1].strip().splitlines()[0]
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=f"summary of {text}"))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return self._reply(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._reply(messages)
+
+
+def _summarize(chunks: List[str], max_concurrency: int) -> Tuple[List[str], float]:
+    chain = build_summarize_chain(SlowEchoChatModel(cache=False))
+    start = time.perf_counter()
+    results = asyncio.run(summarize_chunks_concurrently(chunks, max_concurrency=max_concurrency, chain=chain))
+    return results, time.perf_counter() - start
+
+
+def test_summarize_chunks_scales_with_max_concurrency():
+    chunks = [f"chunk-{i}" for i in range(8)]
+
+    serial, serial_seconds = _summarize(chunks, max_concurrency=1)
+    parallel, parallel_seconds = _summarize(chunks, max_concurrency=8)
+
+    expected = [f"summary of chunk-{i}" for i in range(8)]
+    assert serial == expected
+    assert parallel == expected
+    assert serial_seconds >= len(chunks) * LATENCY
+    assert parallel_seconds < serial_seconds / 3
+
+
+def test_summarize_chunks_respects_in_flight_limit():
+    chunks = [f"chunk-{i}" for i in range(8)]
+
+    results, seconds = _summarize(chunks, max_concurrency=4)
+
+    assert results == [f"summary of chunk-{i}" for i in range(8)]
+    # 8 个块、最多 4 个同时在途：两批
+    assert 2 * LATENCY <= seconds < 4 * LATENCY
+
+
+def test_results_keep_chunk_order_when_completion_order_differs(monkeypatch):
+    async def reversed_latency(chain, chunk, target_length=summary_generate.OUTPUT_LENGTH):
+        await asyncio.sleep(0.01 * (10 - int(chunk.split("-")[1])))
+        return f"summary of {chunk}"
+
+    monkeypatch.setattr(summary_generate, "asummarize_chunk", reversed_latency)
+    finished: List[int] = []
+    chunks = [f"chunk-{i}" for i in range(6)]
+
+    results = asyncio.run(summarize_chunks_concurrently(chunks, max_concurrency=6, chain=object(),
+                                                        on_result=lambda i, _: finished.append(i)))
+
+    assert finished == [5, 4, 3, 2, 1, 0]
+    assert results == [f"summary of chunk-{i}" for i in range(6)]
+
+
+def test_tree_reduce_of_no_summaries_returns_empty_without_calling_the_model():
+    model = SlowEchoChatModel(cache=False)
+    report = summary_generate.ReduceReport()
+
+    result = asyncio.run(summary_generate.tree_reduce_summaries(
+        [], 1000, chain=summary_generate.build_combine_chain(model), report=report))
+
+    assert result == ""
+    assert model.calls == 0
+    assert report.levels == []
+
+
+def test_generate_book_summary_rejects_empty_pdf_list(tmp_path):
+    with pytest.raises(ValueError):
+        summary_generate.generate_book_summary([], str(tmp_path / "summary.txt"))
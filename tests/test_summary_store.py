@@ -0,0 +1,56 @@
+import os
+
+import summary_store
+from summary_store import SummaryStore
+
+
+def test_index_is_written_under_the_cache_dir_not_the_summary_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(summary_store, "INDEX_DIR", str(tmp_path / "cache"))
+    root = tmp_path / "summary"
+    (root / "self_improvement").mkdir(parents=True)
+    (root / "self_improvement" / "atomic_habits.txt").write_text("Small habits compound.", encoding="utf-8")
+
+    store = SummaryStore(str(root))
+    store.refresh()
+
+    assert sorted(os.listdir(root)) == ["self_improvement"]
+    assert store.index_path.parent == tmp_path / "cache"
+    assert store.index_path.exists()
+    assert store.document_text(str(root / "self_improvement" / "atomic_habits.txt")) == "Small habits compound."
+
+
+def test_get_summary_store_picks_up_changes_within_the_process(tmp_path, monkeypatch):
+    monkeypatch.setattr(summary_store, "INDEX_DIR", str(tmp_path / "cache"))
+    root = tmp_path / "summary"
+    root.mkdir()
+    path = root / "book.txt"
+    path.write_text("first version", encoding="utf-8")
+
+    assert summary_store.get_summary_store(str(root)).combined_text() == "first version"
+
+    path.write_text("second version, longer", encoding="utf-8")
+    assert summary_store.get_summary_store(str(root)).combined_text() == "second version, longer"
+
+
+def test_unchanged_refresh_does_not_rewrite_the_index(tmp_path, monkeypatch):
+    monkeypatch.setattr(summary_store, "INDEX_DIR", str(tmp_path / "cache"))
+    root = tmp_path / "summary"
+    root.mkdir()
+    (root / "book.txt").write_text("text", encoding="utf-8")
+    store = SummaryStore(str(root))
+    store.refresh()
+    mtime = store.index_path.stat().st_mtime_ns
+
+    assert store.refresh() == (0, 0, 0)
+    assert store.index_path.stat().st_mtime_ns == mtime
+
+
+def test_reading_a_plain_input_file_leaves_its_directory_untouched(tmp_path, monkeypatch):
+    from main3_1 import read_text_file
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "input.txt").write_text("  some content  ", encoding="utf-8")
+    (tmp_path / "sibling.txt").write_text("unrelated", encoding="utf-8")
+
+    assert read_text_file("input.txt") == "some content"
+    assert sorted(os.listdir(tmp_path)) == ["input.txt", "sibling.txt"]
@@ -0,0 +1,100 @@
+import pytest
+
+import text_utils
+from text_utils import _split_oversized, count_tokens, iter_token_chunks
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    # 不依赖 tiktoken 的编码文件：使用内置的估算（CJK 1 token/字，其余约 4 字符/token）
+    monkeypatch.setattr(text_utils, "_get_encoding", lambda: None)
+
+
+def test_spaceless_sentence_is_sliced_without_inserting_spaces():
+    text = "x" * 50000
+
+    pieces = list(_split_oversized(text, 1000))
+
+    assert "".join(pieces) == text
+    assert all(" " not in piece for piece in pieces)
+    assert all(count_tokens(piece) <= 1000 for piece in pieces)
+
+
+def test_mixed_cjk_latin_and_digits_survive_splitting():
+    text = "abc中文123def数字456" * 2000
+
+    pieces = list(_split_oversized(text, 500))
+
+    assert len(pieces) > 1
+    assert "".join(pieces) == text
+    assert all(count_tokens(piece) <= 500 for piece in pieces)
+
+
+def test_long_sentence_with_spaces_is_split_by_words():
+    words = [f"word{i}" for i in range(3000)]
+
+    pieces = list(_split_oversized(" ".join(words), 200))
+
+    assert len(pieces) > 1
+    assert " ".join(pieces).split() == words
+    assert all(count_tokens(piece) <= 200 for piece in pieces)
+
+
+def test_sentences_are_packed_up_to_the_budget():
+    sentences = [f"Sentence number {i} is here." for i in range(100)]
+
+    pieces = list(_split_oversized(" ".join(sentences), 50))
+
+    assert " ".join(pieces) == " ".join(sentences)
+    assert all(count_tokens(piece) <= 50 for piece in pieces)
+
+
+def _paragraph(i, words=60):
+    return " ".join(f"p{i}w{j}" for j in range(words)) + "."
+
+
+def test_chunks_respect_the_budget_and_keep_paragraph_overlap():
+    pages = ["\n\n".join(_paragraph(i) for i in range(20))]
+
+    chunks = list(iter_token_chunks(pages, max_tokens=400, overlap_tokens=150))
+
+    assert len(chunks) > 1
+    assert all(count_tokens(chunk) <= 400 + 10 for chunk in chunks)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        # 上一块的最后一个段落作为重叠出现在下一块开头
+        assert chunk.startswith(previous.split("\n\n")[-1])
+    paragraphs = {p for chunk in chunks for p in chunk.split("\n\n")}
+    assert paragraphs == {_paragraph(i) for i in range(20)}
+
+
+def test_heading_starts_a_new_chunk_without_overlap():
+    pages = ["\n\n".join([_paragraph(0), _paragraph(1), _paragraph(2), "Chapter 2", _paragraph(3)])]
+
+    chunks = list(iter_token_chunks(pages, max_tokens=340, overlap_tokens=150))
+
+    # 当前块已超过 HEADING_FLUSH_RATIO，标题开启新块，且新章节不带上一块的重叠
+    assert chunks == ["\n\n".join([_paragraph(0), _paragraph(1), _paragraph(2)]),
+                      "Chapter 2\n\n" + _paragraph(3)]
+
+
+def test_paragraphs_are_joined_across_pages_and_pages_are_consumed_lazily():
+    consumed = []
+
+    def pages():
+        for page in ["The first half of a sentence that", "continues on the next page.\n\nSecond paragraph."]:
+            consumed.append(page)
+            yield page
+
+    chunks = iter_token_chunks(pages(), max_tokens=1000)
+    assert consumed == []
+
+    assert list(chunks) == ["The first half of a sentence that continues on the next page.\n\nSecond paragraph."]
+
+
+def test_oversized_spaceless_paragraph_is_chunked_intact():
+    text = "长" * 3000 + "x" * 3000
+
+    chunks = list(iter_token_chunks([text], max_tokens=1000, overlap_tokens=0))
+
+    assert "".join(chunks) == text
+    assert all(count_tokens(chunk) <= 1000 for chunk in chunks)
@@ -0,0 +1,149 @@
+import pytest
+
+from duration_model import DurationModel
+from transcript import SegmentTable, TranscriptParser
+
+SCRIPT = """****** opening ******
+Samuel [excited]: Welcome back to the show!
+Alex (平静)：大家好。
+  Sam : Today we talk about habits,
+and how they compound.
+
+Alex: Small changes add up.
+***closing***
+Samuel: Thanks for listening.
+"""
+
+CHUNK_SIZES = [1, 7, len(SCRIPT)]
+
+
+def _table():
+    return SegmentTable(DurationModel(words_per_minute=120))
+
+
+def _feed(text, size, parser=None):
+    parser = parser or TranscriptParser(table=_table())
+    completed = []
+    for i in range(0, len(text), size):
+        completed.extend(parser.feed(text[i:i + size]))
+    return parser, completed
+
+
+def _rows(table):
+    return [(s.speaker, s.host, s.emotion, s.text, s.section) for s in table]
+
+
+EXPECTED = [
+    ("Samuel", 0, "excited", "Welcome back to the show!", "opening"),
+    ("Alex", 1, "平静", "大家好。", "opening"),
+    ("Sam", 0, None, "Today we talk about habits, and how they compound.", "opening"),
+    ("Alex", 1, None, "Small changes add up.", "opening"),
+    ("Samuel", 0, None, "Thanks for listening.", "closing"),
+]
+
+
+@pytest.mark.parametrize("size", CHUNK_SIZES)
+def test_parses_speakers_emotions_sections_and_continuations(size):
+    parser, completed = _feed(SCRIPT, size)
+    completed.extend(parser.close())
+
+    assert _rows(parser.table) == EXPECTED
+    assert [s.index for s in completed] == list(range(len(EXPECTED)))
+
+
+@pytest.mark.parametrize("size", CHUNK_SIZES)
+def test_segment_completes_when_the_next_speaker_line_arrives(size):
+    parser, completed = _feed("Samuel: First line.\nAlex: Sec", size)
+
+    # 下一行还没收到换行：第一段可能还有续行，尚未完成；半行的词也计入待定词数
+    assert completed == []
+    assert parser.pending_words == 4
+
+    _, completed = _feed("ond line.\n", size, parser)
+    assert [s.text for s in completed] == ["First line."]
+    assert parser.pending_words == 2
+
+
+@pytest.mark.parametrize("marker", ["****** closing ******", "***closing***", "  *****  closing  ***** ",
+                                    "*** Closing ***"])
+@pytest.mark.parametrize("size", CHUNK_SIZES)
+def test_section_marker_variants_end_the_segment(marker, size):
+    parser, completed = _feed(f"Samuel: Before the end.\n{marker}\nAlex: Goodbye.\n", size)
+    parser.close()
+
+    assert [s.text for s in completed] == ["Before the end."]
+    assert [s.section.lower() for s in parser.table] == ["", "closing"]
+
+
+@pytest.mark.parametrize("size", CHUNK_SIZES)
+def test_drop_partial_line(size):
+    parser, _ = _feed("Samuel: A full line.\nAlex: half a li", size)
+
+    assert parser.drop_partial_line() == "Alex: half a li"
+    # 只剩尚未完成的第一段
+    assert parser.pending_words == 3
+    parser.close()
+    assert [s.text for s in parser.table] == ["A full line."]
+
+
+@pytest.mark.parametrize("size", CHUNK_SIZES)
+def test_last_line_without_newline_is_kept_on_close(size):
+    parser, _ = _feed("Samuel: One.\nAlex: Two", size)
+    parser.close()
+
+    assert [(s.speaker, s.text) for s in parser.table] == [("Samuel", "One."), ("Alex", "Two")]
+
+
+def test_unknown_speaker_lines_before_the_first_speaker_are_ignored():
+    parser, _ = _feed("Here is your script:\n\nSamuel: Hi.\n", len(SCRIPT))
+    parser.close()
+
+    assert [(s.speaker, s.text) for s in parser.table] == [("Samuel", "Hi.")]
+
+
+def test_custom_hosts():
+    parser = TranscriptParser(hosts=(("Edith",), ("Chloe",)), table=_table())
+    parser.feed("Edith : Hello.\nChloe : Hi!\nSamuel: not a host\n")
+    parser.close()
+
+    assert [(s.speaker, s.host, s.text) for s in parser.table] == [
+        ("Edith", 0, "Hello."), ("Chloe", 1, "Hi! Samuel: not a host")]
+
+
+def test_table_round_trip():
+    model = DurationModel(words_per_minute=120, emotion_factors={"excited": [0.5, 100]})
+    table = SegmentTable(model)
+    rows = [("Samuel", 0, "excited", "one two three four", 0),
+            ("Alex", 1, None, "five six", table.section_id("closing")),
+            ("Samuel", 0, "excited", "seven", 0)]
+    for row in rows:
+        table.append(*row)
+
+    assert len(table) == 3
+    assert [(s.speaker, s.host, s.emotion, s.text) for s in table] == [row[:4] for row in rows]
+    assert [s.section for s in table] == ["", "closing", ""]
+    assert [s.words for s in table] == [4, 2, 1]
+    assert [s.duration for s in table] == [1.0, 1.0, 0.25]
+    assert table.total_words == 7
+    assert table.total_duration == 2.25
+    assert table.speaker_names() == ["Samuel", "Alex", "Samuel"]
+    # 说话者与情绪去重存储
+    assert table.speakers == ["Samuel", "Alex"]
+    assert table.emotions == ["excited"]
+    assert table[-1].text == "seven"
+    with pytest.raises(IndexError):
+        table[3]
+
+    table.truncate(1)
+    assert len(table) == 1
+    assert table.total_words == 4
+    assert table.speaker_names() == ["Samuel"]
+
+
+def test_truncate_parser_and_continue():
+    parser, _ = _feed("Samuel: Keep me.\nAlex: Drop me.\nSamuel: And me", len(SCRIPT))
+    parser.truncate(1)
+    parser.feed("Alex: Replacement.\n")
+    parser.close()
+
+    assert [s.text for s in parser.table] == ["Keep me.", "Replacement."]
@@ -0,0 +1,49 @@
+from duration_model import DurationModel
+from transcript import SegmentTable
+from tts_planner import SegmentSpan, plan_tts_requests
+
+VOICES = ("voice-a", "voice-b")
+
+
+def _words(n):
+    return " ".join(["word"] * n)
+
+
+def _table(*lines):
+    table = SegmentTable(DurationModel(words_per_minute=120))
+    for speaker, host, emotion, words in lines:
+        table.append(speaker, host, emotion, _words(words))
+    return table
+
+
+def test_segments_alone_in_a_request_get_exact_boundaries():
+    planner = plan_tts_requests(_table(("Samuel", 0, None, 20), ("Alex", 1, None, 30)), VOICES)
+
+    spans = planner.segment_timestamps([(0.0, 10000.0), (10700.0, 25000.0)])
+
+    assert spans == [SegmentSpan(0.0, 10000.0, False), SegmentSpan(10700.0, 25000.0, False)]
+
+
+def test_merged_segments_are_marked_as_estimates():
+    planner = plan_tts_requests(_table(("Samuel", 0, "兴奋", 10), ("Samuel", 0, "激动", 30),
+                                       ("Alex", 1, None, 20)), VOICES)
+    assert len(planner.requests) == 2
+
+    first, second, third = planner.segment_timestamps([(0.0, 20000.0), (20700.0, 30000.0)])
+
+    assert first.estimated and second.estimated and not third.estimated
+    # 合并请求内部的边界按预计时长分摊，两端仍与请求边界一致
+    assert first.start == 0.0 and second.end == 20000.0
+    assert first.end == second.start == 5000.0
+    assert (third.start, third.end) == (20700.0, 30000.0)
+
+
+def test_split_segment_spans_its_requests():
+    table = SegmentTable(DurationModel(words_per_minute=120))
+    table.append("Samuel", 0, None, "First sentence here. Second sentence there.")
+    planner = plan_tts_requests(table, VOICES, max_chars=25)
+    assert len(planner.requests) == 2
+
+    (span,) = planner.segment_timestamps([(0.0, 1000.0), (1300.0, 2500.0)])
+
+    assert span == SegmentSpan(0.0, 2500.0, False)
@@ -0,0 +1,181 @@
+import re
+from functools import lru_cache
+from typing import Iterable, Iterator, List, Tuple
+
+# 无 tiktoken 时的估算：CJK 字符约 1 token/字，其余约 4 字符/token
+_CJK_PATTERN = re.compile(r'[　-〿㐀-䶿一-鿿＀-￯]')
+TOKEN_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """按需加载 tiktoken 编码器，未安装或加载失败时返回 None"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding(TOKEN_ENCODING)
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """估算文本的 token 数"""
+    encoding = _get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+# 默认块大小与相邻块重叠（token）
+CHUNK_TOKENS = 6000
+CHUNK_OVERLAP_TOKENS = 200
+# 遇到章节标题时，当前块达到该比例即提前结束，让新章节从新块开始
+HEADING_FLUSH_RATIO = 0.75
+
+_HEADING_PATTERN = re.compile(
+    r'^(chapter|part|section|book)\s+[\w\divxlc]+\b'
+    r'|^第[一二三四五六七八九十百零〇\d]+[章节部篇卷]'
+    r'|^\d+(\.\d+)*\.?\s+[A-Za-z一-鿿]',
+    re.IGNORECASE,
+)
+_SENTENCE_END = re.compile(r'[.!?。！？…]["”’」』)]?$')
+_SENTENCE_SPLIT = re.compile(r'(?<=[.!?。！？…])\s+|(?<=[。！？])')
+
+
+def _is_heading(line: str) -> bool:
+    """短行且形如章节标题（Chapter 3 / 第三章 / 2.1 标题 / 全大写）"""
+    if len(line) > 80 or len(line.split()) > 8 or _SENTENCE_END.search(line):
+        return False
+    letters = [c for c in line if c.isalpha()]
+    return bool(_HEADING_PATTERN.match(line)) or (len(letters) >= 4 and all(c.isupper() for c in letters))
+
+
+def _join_lines(lines: List[str]) -> str:
+    """合并同一段落的多行：去掉行尾连字符，CJK 行之间不加空格"""
+    parts: List[str] = []
+    for line in lines:
+        if parts and parts[-1].endswith('-') and line[:1].islower():
+            parts[-1] = parts[-1][:-1]
+        elif parts and not (_CJK_PATTERN.match(parts[-1][-1]) and _CJK_PATTERN.match(line[0])):
+            parts.append(' ')
+        parts.append(line)
+    return ''.join(parts)
+
+
+def iter_paragraphs(pages: Iterable[str]) -> Iterator[Tuple[str, bool]]:
+    """把逐页文本流切分为段落，产出 (段落, 是否为标题)
+
+    段落在空行、标题行，或以句末标点结尾的明显短行处断开；跨页的段落会被接上。
+    """
+    lines: List[str] = []
+    avg_len = 0.0
+    for page in pages:
+        for raw_line in page.splitlines():
+            line = raw_line.strip()
+            if not line:
+                if lines:
+                    yield _join_lines(lines), False
+                    lines = []
+                continue
+            if _is_heading(line):
+                if lines:
+                    yield _join_lines(lines), False
+                    lines = []
+                yield line, True
+                continue
+            lines.append(line)
+            avg_len = avg_len * 0.9 + len(line) * 0.1 if avg_len else len(line)
+            if _SENTENCE_END.search(line) and len(line) < avg_len * 0.6:
+                yield _join_lines(lines), False
+                lines = []
+    if lines:
+        yield _join_lines(lines), False
+
+
+def _slice_by_tokens(units: List[str], joiner: str, max_tokens: int, step: int) -> Iterator[str]:
+    """把词（joiner 为空格）或字符（joiner 为空串）序列切成不超过 max_tokens 的片段
+
+    先按整句的平均密度取 step 个单位，片段仍超出预算时（密度不均，如中英文混排）按比例缩短。
+    """
+    start = 0
+    while start < len(units):
+        size = min(step, len(units) - start)
+        while True:
+            piece = joiner.join(units[start:start + size])
+            tokens = count_tokens(piece)
+            if tokens <= max_tokens or size == 1:
+                break
+            size = max(1, min(size - 1, size * max_tokens // (tokens + 1)))
+        yield piece
+        start += size
+
+
+def _split_oversized(text: str, max_tokens: int) -> Iterator[str]:
+    """把超出块大小的段落按句子（必要时按词，没有空格时按字符）切开"""
+    pieces: List[str] = []
+    piece_tokens = 0
+    for sentence in _SENTENCE_SPLIT.split(text):
+        if not sentence:
+            continue
+        tokens = count_tokens(sentence)
+        # 没有空格的超长句（长串字符、中英文数字混排）直接按字符切片，片段之间原本就没有空格
+        spaceless = tokens > max_tokens and ' ' not in sentence
+        if tokens > max_tokens:
+            units = list(sentence) if spaceless else sentence.split()
+            step = max(1, len(units) * max_tokens // (tokens + 1))
+            sub = list(_slice_by_tokens(units, '' if spaceless else ' ', max_tokens, step))
+        else:
+            sub = [sentence]
+        for i, s in enumerate(sub):
+            t = count_tokens(s)
+            if pieces and piece_tokens + t > max_tokens:
+                yield _join_lines(pieces)
+                pieces, piece_tokens = [], 0
+            if spaceless and i > 0 and pieces:
+                pieces[-1] += s
+            else:
+                pieces.append(s)
+            piece_tokens += t
+    if pieces:
+        yield _join_lines(pieces)
+
+
+def iter_token_chunks(pages: Iterable[str], max_tokens: int = CHUNK_TOKENS,
+                      overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> Iterator[str]:
+    """按 token 预算流式分块，尽量在章节、标题、段落处断开
+
+    pages 可以是逐页产出的生成器，只会被惰性消费；相邻块之间保留约 overlap_tokens
+    的段落重叠，新章节开始的块不带重叠。块内段落以空行分隔。
+    """
+    current: List[Tuple[str, int]] = []
+    current_tokens = 0
+
+    def flush(keep_overlap: bool) -> str:
+        nonlocal current, current_tokens
+        chunk = '\n\n'.join(text for text, _ in current)
+        tail: List[Tuple[str, int]] = []
+        tail_tokens = 0
+        if keep_overlap:
+            for text, tokens in reversed(current):
+                if tail_tokens + tokens > overlap_tokens:
+                    break
+                tail.insert(0, (text, tokens))
+                tail_tokens += tokens
+        current, current_tokens = tail, tail_tokens
+        return chunk
+
+    for paragraph, is_heading in iter_paragraphs(pages):
+        tokens = count_tokens(paragraph)
+        pieces = [(paragraph, tokens)] if tokens <= max_tokens else \
+            [(p, count_tokens(p)) for p in _split_oversized(paragraph, max_tokens)]
+        for text, tokens in pieces:
+            heading_break = is_heading and current_tokens >= max_tokens * HEADING_FLUSH_RATIO
+            if current and (current_tokens + tokens > max_tokens or heading_break):
+                yield flush(keep_overlap=not is_heading)
+                if current_tokens + tokens > max_tokens:
+                    # 重叠部分放不下时丢弃重叠
+                    current, current_tokens = [], 0
+            current.append((text, tokens))
+            current_tokens += tokens
+    if current:
+        yield flush(keep_overlap=False)
@@ -0,0 +1,228 @@
+import re
+from array import array
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from duration_model import DurationModel, get_duration_model
+
+# 两位主播在各个人设中的名字；A/B 是脚本模板中的占位名。下标即主播位置（决定使用哪个声音）
+DEFAULT_HOSTS: Tuple[Tuple[str, ...], ...] = (
+    ("Samuel", "Sam", "Edith", "A"),
+    ("Alex", "Chloe", "B"),
+)
+
+# 分节标记行：****** opening ****** / ****** content of X ******
+_SECTION = r'^[ \t]*\*{3,}[ \t]*(?P<section>.*?)[ \t]*\*{3,}[ \t]*$'
+# 说话行：名字，可选的 [情绪] 或 (情绪)，冒号（中英文均可）后是台词
+_LINE = r'^[ \t]*(?P<speaker>{names})[ \t]*(?:\[(?P<emotion>[^\]\n]*)\]|\((?P<emotion_paren>[^)\n]*)\))?[ \t]*[:：][ \t]*(?P<text>.*?)[ \t]*$'
+# 其余非空行视为上一段台词的延续
+_CONTINUATION = r'^[ \t]*(?P<continuation>\S.*?)[ \t]*$'
+# 两次匹配之间的空行
+_BLANK_LINE = re.compile(r'\n[ \t]*\n')
+
+
+def compile_grammar(hosts: Sequence[Sequence[str]] = DEFAULT_HOSTS) -> Tuple["re.Pattern", Dict[str, int]]:
+    """把主播名字编译进一条多行正则，返回 (正则, 名字 -> 主播位置)"""
+    host_of = {name: host for host, names in enumerate(hosts) for name in names}
+    # 长名字优先，避免 "Sam" 抢先匹配 "Samuel"
+    names = "|".join(re.escape(name) for name in sorted(host_of, key=len, reverse=True))
+    pattern = "|".join((_SECTION, _LINE.replace("{names}", names), _CONTINUATION))
+    return re.compile(pattern, re.MULTILINE), host_of
+
+
+class Segment:
+    """段落表中一行的只读视图"""
+    __slots__ = ("speaker", "host", "emotion", "text", "words", "duration", "section", "index")
+
+    def __init__(self, table: "SegmentTable", index: int):
+        self.index = index
+        self.speaker = table.speakers[table.speaker_ids[index]]
+        self.host = table.hosts[index]
+        emotion_id = table.emotion_ids[index]
+        self.emotion = table.emotions[emotion_id - 1] if emotion_id else None
+        self.text = table.texts[index]
+        self.words = table.word_counts[index]
+        self.duration = table.durations[index]
+        self.section = table.sections[table.section_ids[index]]
+
+    def __repr__(self) -> str:
+        return f"Segment({self.speaker!r}, {self.emotion!r}, {self.words} words, {self.duration:.1f}s)"
+
+
+class SegmentTable:
+    """按列存储的对话段落表
+
+    说话者、情绪和分节名各自去重后按编号存入紧凑的 array，字数和预计时长也存为 array，
+    台词文本单独一列。后续的 TTS 分批与计时直接读这些列，不需要再扫描文本。
+    预计时长由时长模型按说话者和情绪估算（默认使用进程内共享、可校准的模型）。
+    """
+    __slots__ = ("speakers", "emotions", "sections", "speaker_ids", "hosts", "emotion_ids", "section_ids",
+                 "texts", "word_counts", "durations", "duration_model", "_speaker_index", "_emotion_index",
+                 "_section_index")
+
+    def __init__(self, duration_model: Optional[DurationModel] = None):
+        self.duration_model = duration_model or get_duration_model()
+        self.speakers: List[str] = []
+        self.emotions: List[str] = []
+        self.sections: List[str] = [""]
+        self.speaker_ids = array("H")
+        self.hosts = array("B")
+        self.emotion_ids = array("H")  # 0 表示没有情绪标注
+        self.section_ids = array("H")
+        self.texts: List[str] = []
+        self.word_counts = array("I")
+        self.durations = array("d")
+        self._speaker_index: Dict[str, int] = {}
+        self._emotion_index: Dict[str, int] = {}
+        self._section_index: Dict[str, int] = {"": 0}
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def __getitem__(self, index: int) -> Segment:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        return Segment(self, index)
+
+    def __iter__(self) -> Iterator[Segment]:
+        return (Segment(self, i) for i in range(len(self)))
+
+    def section_id(self, title: str) -> int:
+        if title not in self._section_index:
+            self._section_index[title] = len(self.sections)
+            self.sections.append(title)
+        return self._section_index[title]
+
+    def append(self, speaker: str, host: int, emotion: Optional[str], text: str, section_id: int = 0) -> int:
+        """追加一个段落，返回其下标"""
+        if speaker not in self._speaker_index:
+            self._speaker_index[speaker] = len(self.speakers)
+            self.speakers.append(speaker)
+        emotion_id = 0
+        if emotion:
+            if emotion not in self._emotion_index:
+                self.emotions.append(emotion)
+                self._emotion_index[emotion] = len(self.emotions)
+            emotion_id = self._emotion_index[emotion]
+        words = len(text.split())
+        self.speaker_ids.append(self._speaker_index[speaker])
+        self.hosts.append(host)
+        self.emotion_ids.append(emotion_id)
+        self.section_ids.append(section_id)
+        self.texts.append(text)
+        self.word_counts.append(words)
+        self.durations.append(self.duration_model.estimate(words, speaker, emotion))
+        return len(self.texts) - 1
+
+    def truncate(self, length: int):
+        """只保留前 length 个段落"""
+        for column in (self.speaker_ids, self.hosts, self.emotion_ids, self.section_ids, self.texts,
+                       self.word_counts, self.durations):
+            del column[length:]
+
+    @property
+    def total_words(self) -> int:
+        return sum(self.word_counts)
+
+    @property
+    def total_duration(self) -> float:
+        """预计总朗读时长（秒，不含段间停顿）"""
+        return sum(self.durations)
+
+    def speaker_names(self) -> List[str]:
+        return [self.speakers[i] for i in self.speaker_ids]
+
+
+class TranscriptParser:
+    """单遍增量解析对话脚本，结果写入 SegmentTable
+
+    每次 feed 只对新到的完整行整体执行一次编译好的语法（finditer），一段台词的多行内容
+    先收集在列表里、段落结束时一次拼接。段落在下一位说话者开口、遇到空行或 ****** 分节标记
+    时视为完整，因此流式生成脚本时，每段台词结束后即可开始合成语音。
+    """
+
+    def __init__(self, hosts: Sequence[Sequence[str]] = DEFAULT_HOSTS, table: Optional[SegmentTable] = None):
+        self.grammar, self.host_of = compile_grammar(hosts)
+        self.table = table if table is not None else SegmentTable()
+        self._buffer = ""
+        self._section_id = 0
+        self._speaker: Optional[str] = None
+        self._emotion: Optional[str] = None
+        self._parts: List[str] = []
+
+    def _flush(self, completed: List[int]):
+        if self._speaker and self._parts:
+            text = " ".join(self._parts)
+            if text:
+                completed.append(self.table.append(self._speaker, self.host_of[self._speaker], self._emotion,
+                                                   text, self._section_id))
+        self._parts = []
+
+    def _parse(self, block: str, completed: List[int]):
+        # 每块都从新的一行开始（上一块以换行结尾），开头补一个换行以识别块首的空行
+        position, gap_prefix = 0, "\n"
+        for match in self.grammar.finditer(block):
+            # 两次匹配之间出现了空行：结束当前段落
+            if _BLANK_LINE.search(gap_prefix + block[position:match.start()]):
+                self._flush(completed)
+            gap_prefix = ""
+            position = match.end()
+            if match.group("section") is not None:
+                self._flush(completed)
+                self._section_id = self.table.section_id(match.group("section"))
+            elif match.group("speaker") is not None:
+                self._flush(completed)
+                self._speaker = match.group("speaker")
+                self._emotion = match.group("emotion") or match.group("emotion_paren") or None
+                if match.group("text"):
+                    self._parts.append(match.group("text"))
+            elif self._speaker:
+                self._parts.append(match.group("continuation"))
+        if _BLANK_LINE.search(gap_prefix + block[position:]):
+            self._flush(completed)
+
+    def feed(self, text: str) -> List[Segment]:
+        """输入一段新文本，返回因此变得完整的段落"""
+        completed: List[int] = []
+        self._buffer += text
+        end = self._buffer.rfind("\n")
+        if end >= 0:
+            self._parse(self._buffer[:end + 1], completed)
+            self._buffer = self._buffer[end + 1:]
+        return [self.table[i] for i in completed]
+
+    @property
+    def pending_words(self) -> int:
+        """尚未成为完整段落的词数（当前段落已收到的行和半行）"""
+        return sum(len(part.split()) for part in self._parts) + len(self._buffer.split())
+
+    def drop_partial_line(self) -> str:
+        """丢弃尚未收到换行的半行文本（提前结束生成时使用），返回被丢弃的内容"""
+        partial, self._buffer = self._buffer, ""
+        return partial
+
+    def truncate(self, length: int):
+        """只保留前 length 个完整段落，丢弃其后的段落以及尚未完成的段落和半行，之后可以继续输入"""
+        self.table.truncate(length)
+        self._buffer = ""
+        self._speaker = None
+        self._emotion = None
+        self._parts = []
+
+    def close(self) -> List[Segment]:
+        """输入结束，返回剩余的段落"""
+        completed: List[int] = []
+        if self._buffer:
+            self._parse(self._buffer, completed)
+            self._buffer = ""
+        self._flush(completed)
+        return [self.table[i] for i in completed]
+
+
+def parse_transcript(transcript: str, hosts: Sequence[Sequence[str]] = DEFAULT_HOSTS) -> SegmentTable:
+    """解析完整的对话脚本为段落表"""
+    parser = TranscriptParser(hosts)
+    parser.feed(transcript.strip() + "\n")
+    parser.close()
+    return parser.table
@@ -0,0 +1,185 @@
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+from duration_model import CalibrationSample
+from podcast_audio import voice_settings_for
+from transcript import Segment, SegmentTable
+
+# 单次 TTS 请求的最大字符数（ElevenLabs 单次上限之内，且不至于让首段音频等待过久）
+MAX_REQUEST_CHARS = 1500
+# 短于此字符数的台词（如 "Right."、"Exactly!" 之类的插话）不单独请求，
+# 即使语音参数不同也并入同一说话者相邻的请求
+SHORT_LINE_CHARS = 40
+
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?。！？…])["\')\]]*\s+')
+
+
+def split_text(text: str, max_chars: int = MAX_REQUEST_CHARS) -> List[str]:
+    """把过长的台词按句末切成不超过 max_chars 的几块；单句仍超长时按空白切分"""
+    if len(text) <= max_chars:
+        return [text]
+    pieces: List[str] = []
+    for sentence in _SENTENCE_BREAK.split(text):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars + 1)
+            if cut <= 0:
+                cut = max_chars
+            pieces.append(sentence[:cut].strip())
+            sentence = sentence[cut:].strip()
+        if sentence:
+            pieces.append(sentence)
+
+    chunks: List[str] = []
+    for piece in pieces:
+        if chunks and len(chunks[-1]) + 1 + len(piece) <= max_chars:
+            chunks[-1] += " " + piece
+        else:
+            chunks.append(piece)
+    return chunks
+
+
+@dataclass
+class TTSPart:
+    """请求中的一段文本：来自哪个段落，以及按时长模型预计的朗读秒数（用于分摊时间戳）"""
+    segment: int
+    text: str
+    weight: float
+
+
+@dataclass
+class SegmentSpan:
+    """段落在成品中的 (开始, 结束) 毫秒时间戳
+
+    estimated 为 True 时段落与其他段落合并在同一请求中，边界是按预计时长分摊出来的估计值，
+    只适合显示或定位，不能当作实测时长（如用于校准时长模型）；为 False 时段落独占其请求，
+    开始与结束都落在请求边界上，是准确值。
+    """
+    start: float
+    end: float
+    estimated: bool
+
+
+@dataclass
+class TTSRequest:
+    """一次 TTS 请求：同一位主播、同一组语音参数，包含一个或多个段落（或段落的一部分）"""
+    speaker: str
+    voice: str
+    stability: float
+    similarity_boost: float
+    parts: List[TTSPart] = field(default_factory=list)
+
+    @property
+    def text(self) -> str:
+        return " ".join(part.text for part in self.parts)
+
+    @property
+    def chars(self) -> int:
+        return len(self.text)
+
+    @property
+    def segments(self) -> List[int]:
+        return sorted({part.segment for part in self.parts})
+
+
+class TTSPlanner:
+    """把段落表合并为尽量少的 TTS 请求
+
+    同一说话者的相邻段落在语音参数相同时合并为一个请求；短台词即使参数不同也并入相邻请求
+    （请求采用字数更多一方的参数）；每个请求不超过 max_chars，过长的段落按句末拆开。
+    add() 可以在流式解析时逐段调用，返回已经确定、可以立即合成的请求。
+    合成后用 segment_timestamps() 把每个请求在成品中的时间戳分摊回各段落（合并请求内的边界
+    只是按预计时长得到的估计值），用 request_samples() 得到以请求为单位的实测时长，供时长模型校准。
+    """
+
+    def __init__(self, table: SegmentTable, voices: Sequence[str], max_chars: int = MAX_REQUEST_CHARS,
+                 short_line_chars: int = SHORT_LINE_CHARS):
+        self.table = table
+        self.voices = voices
+        self.max_chars = max_chars
+        self.short_line_chars = short_line_chars
+        self.requests: List[TTSRequest] = []
+        self._open: Optional[TTSRequest] = None
+
+    def _mergeable(self, request: TTSRequest, voice: str, settings: Tuple[float, float], text: str) -> bool:
+        if request.voice != voice or request.chars + 1 + len(text) > self.max_chars:
+            return False
+        if (request.stability, request.similarity_boost) == settings:
+            return True
+        return len(text) < self.short_line_chars or request.chars < self.short_line_chars
+
+    def add(self, segment: Segment) -> List[TTSRequest]:
+        """加入一个段落，返回因此确定下来的请求"""
+        ready: List[TTSRequest] = []
+        voice = self.voices[segment.host]
+        settings = voice_settings_for(segment.emotion)
+        chunks = split_text(segment.text, self.max_chars)
+        for chunk in chunks:
+            weight = segment.duration * len(chunk) / max(1, sum(len(c) for c in chunks))
+            request = self._open
+            if request is not None and self._mergeable(request, voice, settings, chunk):
+                if len(chunk) > request.chars:
+                    request.stability, request.similarity_boost = settings
+            else:
+                if request is not None:
+                    ready.append(request)
+                request = TTSRequest(segment.speaker, voice, *settings)
+                self.requests.append(request)
+                self._open = request
+            request.parts.append(TTSPart(segment.index, chunk, weight))
+            if request.chars >= self.max_chars - self.short_line_chars:
+                ready.append(request)
+                self._open = None
+        return ready
+
+    def close(self) -> List[TTSRequest]:
+        """输入结束，返回最后一个尚未确定的请求"""
+        ready = [self._open] if self._open is not None else []
+        self._open = None
+        return ready
+
+    def speaker_names(self) -> List[str]:
+        return [request.speaker for request in self.requests]
+
+    def segment_timestamps(self, request_timestamps: Sequence[Tuple[float, float]]) -> List[SegmentSpan]:
+        """由各请求的 (开始, 结束) 毫秒时间戳得到每个段落的时间戳
+
+        只有请求边界是准确的：段落独占的请求直接使用请求的时间戳；与其他段落合并的请求内，
+        时长按各部分的预计朗读时长比例分摊，结果标记为估计值。拆开的段落取首块开始到末块结束。
+        """
+        spans: List[Optional[SegmentSpan]] = [None] * len(self.table)
+        for request, (start, end) in zip(self.requests, request_timestamps):
+            total = sum(part.weight for part in request.parts)
+            shared = len(request.segments) > 1
+            position = start
+            for i, part in enumerate(request.parts):
+                if i == len(request.parts) - 1:
+                    share = end - position
+                else:
+                    share = (part.weight / total if total > 0 else 1.0 / len(request.parts)) * (end - start)
+                span = spans[part.segment]
+                if span is None:
+                    spans[part.segment] = SegmentSpan(position, position + share, shared)
+                else:
+                    span.end = position + share
+                    span.estimated = span.estimated or shared
+                position += share
+        return [span or SegmentSpan(0.0, 0.0, True) for span in spans]
+
+    def request_samples(self, request_timestamps: Sequence[Tuple[float, float]]) -> List[CalibrationSample]:
+        """由各请求的 (开始, 结束) 毫秒时间戳得到每个请求的实测时长，用于校准时长模型"""
+        return [
+            CalibrationSample(request.speaker,
+                              [(len(part.text.split()), self.table[part.segment].emotion) for part in request.parts],
+                              (end - start) / 1000.0)
+            for request, (start, end) in zip(self.requests, request_timestamps)
+        ]
+
+
+def plan_tts_requests(table: SegmentTable, voices: Sequence[str], max_chars: int = MAX_REQUEST_CHARS) -> TTSPlanner:
+    """为完整的段落表规划 TTS 请求"""
+    planner = TTSPlanner(table, voices, max_chars)
+    for segment in table:
+        planner.add(segment)
+    planner.close()
+    return planner